@@ -0,0 +1,81 @@
+"""
+Benchmark of the banding of runners' ages by dashathon.merging.merging_methods, over the ages of the llimllib Boston
+Marathon files of dashathon/data/external_data repeated up to `--rows` runners.
+
+`append_age_banding` is timed against the `band_age` call and pd.Series made for every runner that it used to apply,
+which is only timed over the first `--reference-rows` runners as it takes minutes over all of them. The age ranges of
+`process_all_data` are timed against the merge with dashathon/merging/age_map.csv, one row per age from 1 to 94, that
+it used to do.
+
+Run from the repository root::
+
+    python -m dashathon.benchmarks.benchmark_age_banding --rows 500000 --reference-rows 50000
+"""
+import argparse
+import os
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+from dashathon.merging.merging_methods import AGE_RANGE_LABELS, AGE_RANGE_MAX_AGE, AGE_RANGE_MIN_AGE, \
+    append_age_banding, band_age, band_ages
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(PACKAGE_DIR, 'data', 'external_data')
+
+
+def append_age_banding_reference(df):
+    """
+    Method appending a banding of the age field as `append_age_banding` did before it used `band_ages`.
+
+    :param pandas.DataFrame df: DataFrame with an 'age' field
+    :return: DataFrame with the fields 'age_bucket' and 'age_range' appended
+    :rtype: pandas.DataFrame
+    """
+    return pd.concat((
+        df,
+        df['age'].apply(lambda cell: pd.Series(band_age(cell), index=['age_bucket', 'age_range']))
+    ), axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=500000, help='Number of runners')
+    parser.add_argument('--reference-rows', type=int, default=50000, help='Number of runners banded with apply')
+    args = parser.parse_args()
+
+    ages = pd.concat([pd.read_csv(os.path.join(DATA_DIR, 'llimllib_boston_results_{}.csv'.format(year)),
+                                  usecols=['age'])['age'] for year in [2013, 2014]], ignore_index=True)
+    df = pd.DataFrame({'age': ages.iloc[np.arange(args.rows) % len(ages)].to_numpy()})
+    age_map = pd.read_csv(os.path.join(PACKAGE_DIR, 'merging', 'age_map.csv'))
+    df_reference = df.iloc[:args.reference_rows]
+    print('runners={} distinct ages={}'.format(len(df), df['age'].nunique()))
+
+    timings = []
+    start = perf_counter()
+    expected = append_age_banding_reference(df_reference)
+    timings.append(('append_age_banding', 'apply', len(df_reference), perf_counter() - start))
+    start = perf_counter()
+    banded = append_age_banding(df)
+    timings.append(('append_age_banding', 'band_ages', len(df), perf_counter() - start))
+    assert banded.iloc[:args.reference_rows].equals(expected)
+
+    start = perf_counter()
+    expected = pd.merge(df, age_map, on='age', how='left')
+    timings.append(('age_range', 'merge', len(df), perf_counter() - start))
+    start = perf_counter()
+    ranged = df.copy()
+    has_age_range = ranged['age'].isin(range(AGE_RANGE_MIN_AGE, AGE_RANGE_MAX_AGE + 1)).to_numpy()
+    ranged['age_range'] = np.where(has_age_range, band_ages(ranged['age'], AGE_RANGE_LABELS)[1], np.nan)
+    timings.append(('age_range', 'band_ages', len(df), perf_counter() - start))
+    assert ranged.equals(expected)
+
+    print('{:>20} {:>10} {:>8} {:>10} {:>12}'.format('step', 'method', 'runners', 'seconds', 'ns/runner'))
+    for step, method, num_runners, elapsed in timings:
+        print('{:>20} {:>10} {:>8} {:>10.4f} {:>12.1f}'.format(step, method, num_runners, elapsed,
+                                                              elapsed / num_runners * 1e9))
+
+
+if __name__ == '__main__':
+    main()
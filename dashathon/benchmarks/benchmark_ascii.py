@@ -0,0 +1,94 @@
+"""
+Benchmark of the conversion of city, state, and country names into ascii, over the names of every runner in the scraped
+Chicago Marathon files and the Boston Marathon files of dashathon/data.
+
+Each name is converted by the original implementation (NFD normalization, then one character at a time), by
+`convert_to_ascii` one name at a time, starting with an empty cache, and by `convert_column_to_ascii` over the whole
+column.
+
+Run from the repository root::
+
+    python -m dashathon.benchmarks.benchmark_ascii
+"""
+import argparse
+import glob
+import os
+import unicodedata
+from time import perf_counter
+
+import pandas as pd
+
+from dashathon.scraping.output_methods import read_records
+from dashathon.scraping.scraping_methods import LATIN_CHAR_MAP, convert_to_ascii, convert_column_to_ascii
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+
+def convert_to_ascii_reference(string):
+    """
+    Method converting a string into ascii as `convert_to_ascii` did before it used a translation table.
+
+    :param str string: String to be converted into ascii
+    :return: String converted into ascii
+    :rtype: str
+    """
+    string = ''.join(c for c in unicodedata.normalize('NFD', string) if unicodedata.category(c) != 'Mn')
+    string_ascii = ''
+    for s in string:
+        if ord(s) < 128:
+            string_ascii += s
+        elif s in LATIN_CHAR_MAP.keys():
+            string_ascii += LATIN_CHAR_MAP[s]
+        else:
+            string_ascii += ''
+    return string_ascii
+
+
+def read_names():
+    """
+    Method to read the city, state, and country of every runner of the scraped Chicago Marathon files and of the Boston
+    Marathon files.
+
+    :return: Names, with repeats, in file order
+    :rtype: pandas.Series
+    """
+    columns = []
+    for path in sorted(glob.glob(os.path.join(DATA_DIR, 'scraped_data', 'chicago_marathon_*.csv'))):
+        headers, rows = read_records(path)
+        columns.extend([row[headers.index(header)] for row in rows if len(row) == len(headers)]
+                       for header in ['city', 'state', 'country'])
+    for path in sorted(glob.glob(os.path.join(DATA_DIR, 'external_data', 'llimllib_boston_results_*.csv'))):
+        columns.extend(pd.read_csv(path, usecols=['city', 'state', 'country'], dtype=str).T.values)
+    return pd.Series([name for column in columns for name in column if isinstance(name, str)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+
+    names = read_names()
+    print('names={} distinct={} non-ascii={}'.format(len(names), names.nunique(),
+                                                    sum(any(ord(c) > 127 for c in name) for name in names)))
+    start = perf_counter()
+    expected = [convert_to_ascii_reference(name) for name in names]
+    reference_seconds = perf_counter() - start
+
+    convert_to_ascii.cache_clear()
+    start = perf_counter()
+    converted = [convert_to_ascii(name) for name in names]
+    seconds = perf_counter() - start
+
+    convert_to_ascii.cache_clear()
+    start = perf_counter()
+    converted_column = convert_column_to_ascii(names)
+    column_seconds = perf_counter() - start
+
+    assert converted == expected and converted_column.tolist() == expected
+    print('{:>24} {:>10} {:>12}'.format('method', 'seconds', 'us/name'))
+    for method, elapsed in [('reference', reference_seconds), ('convert_to_ascii', seconds),
+                            ('convert_column_to_ascii', column_seconds)]:
+        print('{:>24} {:>10.3f} {:>12.3f}'.format(method, elapsed, elapsed / len(names) * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark of runner-detail scraping throughput against a local stand-in results server.
+
+Run from the repository root::
+
+    python -m dashathon.benchmarks.benchmark_concurrency --runners 200 --latency 0.1 --workers 1 2 4 8 16
+
+The first row (1 worker, 0.5s delay) corresponds to the original serial scraping loop. With --capacity, the server
+fails runner pages with HTTP 500 errors while more than that many are in progress. With --autotune, every pool size is
+also run with an AdaptiveLimiter using the pool size as its ceiling::
+
+    python -m dashathon.benchmarks.benchmark_concurrency --delay 0 --workers 4 8 16 --capacity 6 --autotune
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+from time import perf_counter
+
+from dashathon.tests.fixture_server import start_fixture_server, stop_fixture_server
+from dashathon.scraping.concurrency_methods import AdaptiveLimiter
+from dashathon.scraping.scraping_methods import scrape_chicago_marathon
+
+headers_chicago = ['year', 'bib', 'age_group', 'gender', 'city', 'state', 'country', 'overall', 'rank_gender',
+                   'rank_age_group', '5k', '10k', '15k', '20k', 'half', '25k', '30k', '35k', '40k', 'finish']
+
+
+def time_scrape(base_url, num_runners, num_workers, delay, limiter=None):
+    """
+    Method to time `scrape_chicago_marathon` over `num_runners` runners served by the fixture server.
+
+    :param str base_url: Root URL of the fixture server
+    :param int num_runners: Number of runners in the input file
+    :param int num_workers: Number of concurrent workers
+    :param float delay: Pause taken by each worker after a runner
+    :param limiter: Bound on the requests in flight, passed to `scrape_chicago_marathon`
+    :return: Runners scraped per second
+    :rtype: float
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path_input = os.path.join(temp_dir, 'input.csv')
+        with open(path_input, 'w', encoding='utf-8') as f:
+            for idp in range(num_runners):
+                f.write(base_url + 'chicago/?content=detail&idp=' + str(idp) + '|Portland|OR\n')
+
+        start = perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            scrape_chicago_marathon(path_input=path_input, path_output=os.path.join(temp_dir, 'output.csv'),
+                                    path_error=os.path.join(temp_dir, 'error.csv'), gender='M',
+                                    headers=headers_chicago, num_workers=num_workers, delay=delay, limiter=limiter)
+        elapsed = perf_counter() - start
+    return num_runners / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runners', type=int, default=200, help='Number of runners to scrape per configuration')
+    parser.add_argument('--latency', type=float, default=0.1, help='Server latency per request in seconds')
+    parser.add_argument('--delay', type=float, default=0.5, help='Pause taken by each worker after a runner')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16],
+                        help='Worker pool sizes to benchmark')
+    parser.add_argument('--capacity', type=int, default=None,
+                        help='Number of runner pages the server handles at once before failing requests')
+    parser.add_argument('--autotune', action='store_true', help='Also run every pool size with an AdaptiveLimiter')
+    args = parser.parse_args()
+
+    server = start_fixture_server(latency=args.latency, max_concurrent_requests=args.capacity)
+    try:
+        print('runners={} latency={}s delay={}s capacity={}'.format(args.runners, args.latency, args.delay,
+                                                                     args.capacity))
+        print('{:>8} {:>9} {:>14} {:>9} {:>8} {:>7}'.format('workers', 'limiter', 'runners/sec', 'speedup', 'errors',
+                                                          'level'))
+        baseline = None
+        for num_workers in args.workers:
+            for autotune in [False, True] if args.autotune else [False]:
+                limiter = AdaptiveLimiter(max_per_host=num_workers) if autotune else None
+                num_errors = server.status_counts[500]
+                rate = time_scrape(server.base_url, args.runners, num_workers, args.delay, limiter=limiter)
+                baseline = baseline or rate
+                level = list(limiter.get_levels().values())[0] if autotune else num_workers
+                print('{:>8} {:>9} {:>14.2f} {:>8.1f}x {:>8} {:>7}'.format(
+                    num_workers, 'aimd' if autotune else 'fixed', rate, rate / baseline,
+                    server.status_counts[500] - num_errors, level))
+    finally:
+        stop_fixture_server(server)
+
+
+if __name__ == '__main__':
+    main()
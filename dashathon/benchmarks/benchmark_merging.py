@@ -0,0 +1,60 @@
+"""
+Benchmark of the import and transformation of the marathon data of every city by
+dashathon.merging.merging_methods.process_cities_data, one file after another, and with pools of 1, 2, and 4 processes.
+
+Cities whose files are missing from dashathon/data are left out, e.g. Boston without the rojour files, and NYC without
+the andreanr files.
+
+Run from the repository root::
+
+    python -m dashathon.benchmarks.benchmark_merging --processes 1 2 4
+"""
+import argparse
+import os
+from time import perf_counter
+
+from dashathon.merging import merging_methods as merge
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+# Files that must exist for each city to be processed
+CITY_FILES = {
+    merge.process_boston_data: [os.path.join('external_data', 'llimllib_boston_results_{}.csv'.format(year))
+                                for year in [2013, 2014]] +
+                               [os.path.join('external_data', 'rojour_boston_results_{}.csv'.format(year))
+                                for year in [2015, 2016, 2017]],
+    merge.process_nyc_data: [os.path.join('external_data', 'andreanr_nyc_results_{}.csv'.format(year))
+                             for year in [2015, 2016, 2017, 2018]],
+    merge.process_chicago_data: [os.path.join('scraped_data', 'chicago_marathon_{}_{}.csv'.format(year, gender))
+                                 for year in [2014, 2015, 2016, 2017] for gender in ['M', 'W']],
+    merge.process_london_data: [os.path.join('scraped_data', 'london_marathon_{}_{}{}.csv'.format(year, gender, elite))
+                                for year in [2014, 2015, 2016, 2017] for gender in ['M', 'W']
+                                for elite in ['', '_elite']],
+    merge.process_berlin_data: [os.path.join('scraped_data', 'london_marathon_{}_{}{}.csv'.format(year, gender, elite))
+                                for year in [2014, 2015] for gender in ['M', 'W'] for elite in ['', '_elite']],
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4], help='Sizes of the pools of processes')
+    args = parser.parse_args()
+
+    process_methods = [process_method for process_method, paths in CITY_FILES.items()
+                       if all(os.path.exists(os.path.join(DATA_DIR, path)) for path in paths)]
+    print('cities: {}'.format(', '.join(process_method.__name__ for process_method in process_methods)))
+    print('{:>10} {:>10} {:>10}'.format('processes', 'seconds', 'runners'))
+
+    expected = None
+    for num_processes in [None] + args.processes:
+        start = perf_counter()
+        results = merge.process_cities_data(num_processes=num_processes, process_methods=process_methods)
+        elapsed = perf_counter() - start
+        if expected is None:
+            expected = results
+        assert all(df.equals(df_expected) for df, df_expected in zip(results, expected))
+        print('{:>10} {:>10.2f} {:>10}'.format(num_processes or '-', elapsed, sum(len(df) for df in results)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark of how runner page parsing scales with the number of cores, using the recorded pages in the test fixtures.
+
+The same saved pages are parsed by a pool of threads, as when worker threads parse the pages they download, and by a
+pool of processes, as with the `num_parse_processes` argument of the scrape_*_marathon methods. Threads share one core
+for parsing because of the GIL, while processes can use one core each.
+
+Run from the repository root::
+
+    python -m dashathon.benchmarks.benchmark_parse_scaling --pages 3000 --workers 1 2 4 8
+"""
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
+from time import perf_counter
+
+from dashathon.tests.fixture_server import read_fixture
+from dashathon.scraping.scraping_methods import parse_chicago_runner_details, parse_london_runner_details, \
+    parse_berlin_runner_details
+
+PARSERS = {
+    'chicago': partial(parse_chicago_runner_details, gender='M', city='Portland', state='OR'),
+    'london': partial(parse_london_runner_details, year=2017, gender='M'),
+    'berlin': partial(parse_berlin_runner_details, year=2016, gender='M'),
+}
+
+
+def parse_page(race_html):
+    """
+    Method to parse one saved page with the parser of its race.
+
+    :param (str, bytes) race_html: Race and raw HTML of a runner's results page
+    :return: Runner record
+    :rtype: tuple
+    """
+    race, html = race_html
+    return PARSERS[race](html)
+
+
+def time_pool(executor, num_workers, pages):
+    """
+    Method to time parsing every page with a pool of workers, once the workers have started.
+
+    :param executor: Pool of threads or processes
+    :param int num_workers: Number of workers of the pool
+    :param list[(str, bytes)] pages: Race and raw HTML of each page
+    :return: Pages parsed per second
+    :rtype: float
+    """
+    # Start every worker before timing
+    list(executor.map(parse_page, pages[:num_workers]))
+    start = perf_counter()
+    records = list(executor.map(parse_page, pages, chunksize=16))
+    elapsed = perf_counter() - start
+    assert len(records) == len(pages)
+    return len(pages) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=3000, help='Number of pages parsed per configuration')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8], help='Pool sizes to benchmark')
+    args = parser.parse_args()
+
+    saved_pages = [(race, read_fixture(race + '_runner_details.html')) for race in PARSERS]
+    pages = [saved_pages[index % len(saved_pages)] for index in range(args.pages)]
+
+    print('cores={} pages={}'.format(os.cpu_count(), args.pages))
+    print('{:>8} {:>16} {:>18} {:>9}'.format('workers', 'threads pages/s', 'processes pages/s', 'speedup'))
+    baseline = None
+    for num_workers in args.workers:
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            thread_rate = time_pool(executor, num_workers, pages)
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            process_rate = time_pool(executor, num_workers, pages)
+        baseline = baseline or thread_rate
+        print('{:>8} {:>16.0f} {:>18.0f} {:>8.1f}x'.format(num_workers, thread_rate, process_rate,
+                                                           process_rate / baseline))
+
+
+if __name__ == '__main__':
+    main()
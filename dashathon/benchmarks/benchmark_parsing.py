@@ -0,0 +1,63 @@
+"""
+Benchmark of the cost of parsing one runner's results page, using the recorded pages in the test fixtures. Each page
+is parsed by the scanning fast path of parsing_methods.parse_page, as when scraping, and by the tree parser alone.
+
+Run from the repository root::
+
+    python -m dashathon.benchmarks.benchmark_parsing --repeat 200
+"""
+import argparse
+from time import perf_counter
+
+import dashathon.scraping.parsing_methods as parsing
+from dashathon.tests.fixture_server import read_fixture
+from dashathon.scraping.scraping_methods import parse_chicago_runner_details, parse_london_runner_details, \
+    parse_berlin_runner_details, _parse_chicago_page, _parse_london_page, _parse_berlin_page
+
+PARSERS = {
+    'chicago': lambda html: parse_chicago_runner_details(html, gender='M', city='Portland', state='OR'),
+    'london': lambda html: parse_london_runner_details(html, year=2017, gender='M'),
+    'berlin': lambda html: parse_berlin_runner_details(html, year=2016, gender='M'),
+}
+
+TREE_PARSERS = {
+    'chicago': lambda html: _parse_chicago_page(parsing.parse_html(html), gender='M', city='Portland', state='OR'),
+    'london': lambda html: _parse_london_page(parsing.parse_html(html), year=2017, gender='M'),
+    'berlin': lambda html: _parse_berlin_page(parsing.parse_html(html), year=2016, gender='M'),
+}
+
+
+def time_parse(parser, html, repeat):
+    """
+    Method to time a parse_*_runner_details method over the same page.
+
+    :param parser: Function mapping raw HTML to a runner record
+    :param bytes html: Raw HTML of a runner's results page
+    :param int repeat: Number of times the page is parsed
+    :return: Milliseconds per page
+    :rtype: float
+    """
+    start = perf_counter()
+    for _ in range(repeat):
+        parser(html)
+    return (perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=200, help='Number of times each page is parsed')
+    args = parser.parse_args()
+
+    print('{:>8} {:>10} {:>10} {:>10}'.format('race', 'ms/page', 'tree', 'fast path'))
+    for race, race_parser in PARSERS.items():
+        html = read_fixture(race + '_runner_details.html')
+        counts = parsing.get_fast_path_counts()
+        milliseconds = time_parse(race_parser, html, args.repeat)
+        counts = parsing.get_fast_path_counts() - counts
+        print('{:>8} {:>10.2f} {:>10.2f} {:>9.0f}%'.format(race, milliseconds,
+                                                         time_parse(TREE_PARSERS[race], html, args.repeat),
+                                                         100 * counts['hits'] / args.repeat))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+End-to-end benchmark of the scraping pipeline against a local stand-in results server.
+
+For each race, the search form is submitted and every results page is walked by scrape_*_marathon_urls, then every
+runner is scraped by scrape_*_marathon, exactly as in the scrape_*_data scripts. With --pipelined, the results pages
+are instead walked by iter_*_marathon_urls while runners are scraped, so the two stages overlap. The server adds a
+fixed latency to every response and can fail a share of runner pages with HTTP 500 errors.
+
+Run from the repository root::
+
+    python -m dashathon.benchmarks.benchmark_pipeline --runners 500 --latency 0.05 --error-rate 0.01 --workers 8
+    python -m dashathon.benchmarks.benchmark_pipeline --runners 500 --latency 0.05 --workers 8 --pipelined
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+from time import perf_counter
+
+import pandas as pd
+
+from dashathon.tests.fixture_server import RACES, start_fixture_server, stop_fixture_server
+from dashathon.scraping.output_methods import read_records
+from dashathon.scraping.record_methods import HEADERS_CHICAGO, HEADERS_LONDON, HEADERS_BERLIN
+import dashathon.scraping.scraping_methods as scrape
+
+
+def run_pipeline(race, base_url, num_results_per_page, num_workers, delay, temp_dir, pipelined=False,
+                 num_page_workers=1):
+    """
+    Method to scrape every runner of a race from the fixture server.
+
+    :param str race: One of `RACES`
+    :param str base_url: Root URL of the fixture server
+    :param int num_results_per_page: Number of results per page requested from the search form
+    :param int num_workers: Number of concurrent workers scraping runners
+    :param float delay: Pause taken by each worker after a runner
+    :param str temp_dir: Directory for the input, output, and error files
+    :param bool pipelined: If True, runners are scraped while the results pages are walked. No time is then reported
+                           for finding URLs on its own.
+    :param int num_page_workers: Number of results pages downloaded concurrently
+    :return: Seconds spent finding URLs, seconds spent scraping runners, rows written to the output file, and rows
+             written to the error log
+    :rtype: (float, float, int, int)
+    """
+    url = base_url + race + '/'
+    path_input, path_output, path_error = [os.path.join(temp_dir, race + suffix) for suffix in
+                                           ['_urls.csv', '.csv', '_error_log.csv']]
+
+    start = perf_counter()
+    if race == 'chicago':
+        url_pages = scrape.iter_chicago_marathon_urls(url=url, year=2016, event='ALL_EVENT_GROUP_2016', gender='M',
+                                                      num_results_per_page=num_results_per_page,
+                                                      num_page_workers=num_page_workers)
+    elif race == 'london':
+        url_pages = scrape.iter_london_marathon_urls(url=url, event='MAS', year=2017, gender='M',
+                                                     num_results_per_page=num_results_per_page,
+                                                     num_page_workers=num_page_workers)
+    else:
+        url_pages = scrape.iter_berlin_marathon_urls(url=url, event='MAL', year=2016, gender='M',
+                                                     num_results_per_page=num_results_per_page,
+                                                     num_page_workers=num_page_workers)
+    if pipelined:
+        kwargs = dict(url_pages=url_pages)
+    else:
+        columns = ['urls', 'city', 'state'] if race == 'chicago' else ['urls']
+        kwargs = dict(df_urls=pd.DataFrame([runner for runners in url_pages for runner in runners], columns=columns))
+    urls_seconds = perf_counter() - start
+
+    start = perf_counter()
+    kwargs.update(path_input=path_input, path_output=path_output, path_error=path_error, gender='M',
+                  num_workers=num_workers, delay=delay)
+    if race == 'chicago':
+        scrape.scrape_chicago_marathon(headers=HEADERS_CHICAGO, **kwargs)
+    elif race == 'london':
+        scrape.scrape_london_marathon(year=2017, headers=HEADERS_LONDON, **kwargs)
+    else:
+        scrape.scrape_berlin_marathon(year=2016, headers=HEADERS_BERLIN, **kwargs)
+    details_seconds = perf_counter() - start
+    if pipelined:
+        urls_seconds, details_seconds = 0.0, urls_seconds + details_seconds
+
+    return urls_seconds, details_seconds, len(read_records(path_output)[1]), len(read_records(path_error)[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--races', nargs='+', choices=RACES, default=RACES, help='Races to scrape')
+    parser.add_argument('--runners', type=int, default=200, help='Number of runners listed per race')
+    parser.add_argument('--page-size', type=int, default=25, help='Number of results per page')
+    parser.add_argument('--latency', type=float, default=0.05, help='Server latency per request in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of runner pages failing with HTTP 500')
+    parser.add_argument('--workers', type=int, default=1, help='Number of concurrent workers scraping runners')
+    parser.add_argument('--delay', type=float, default=0.0, help='Pause taken by each worker after a runner')
+    parser.add_argument('--pipelined', action='store_true', help='Scrape runners while results pages are walked')
+    parser.add_argument('--page-workers', type=int, default=1, help='Number of results pages downloaded concurrently')
+    args = parser.parse_args()
+
+    server = start_fixture_server(latency=args.latency, num_runners=args.runners, error_rate=args.error_rate)
+    try:
+        print('runners={} page_size={} latency={}s error_rate={} workers={} delay={}s pipelined={} '
+              'page_workers={}'.format(args.runners, args.page_size, args.latency, args.error_rate, args.workers,
+                                       args.delay, args.pipelined, args.page_workers))
+        print('{:>8} {:>10} {:>12} {:>13} {:>8} {:>8}'.format('race', 'urls (s)', 'details (s)', 'runners/sec',
+                                                              'scraped', 'errors'))
+        for race in args.races:
+            with tempfile.TemporaryDirectory() as temp_dir, contextlib.redirect_stdout(io.StringIO()):
+                urls_seconds, details_seconds, num_scraped, num_errors = run_pipeline(
+                    race, server.base_url, args.page_size, args.workers, args.delay, temp_dir, args.pipelined,
+                    args.page_workers)
+            print('{:>8} {:>10.2f} {:>12.2f} {:>13.2f} {:>8} {:>8}'.format(
+                race, urls_seconds, details_seconds, args.runners / (urls_seconds + details_seconds), num_scraped,
+                num_errors))
+        print('server responses by status: ' + str(dict(server.status_counts)))
+    finally:
+        stop_fixture_server(server)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Benchmark of the cross-race scheduler against one local stand-in results server per race.
+
+The same jobs are scraped twice: one after another with `run_job`, as in the scrape_*_data scripts, and then with
+`run_jobs`, which runs the jobs of different hosts in parallel.
+
+Run from the repository root::
+
+    python -m dashathon.benchmarks.benchmark_scheduler --runners 200 --latency 0.05 --workers 4
+"""
+import argparse
+import contextlib
+import io
+import tempfile
+from time import perf_counter
+
+from dashathon.tests.fixture_server import start_fixture_server, stop_fixture_server
+from dashathon.scraping.http_methods import SessionPool
+from dashathon.scraping.scheduler_methods import RACES, ScrapeJob, run_job, run_jobs
+
+# Events understood by the fixture server's search form of each race
+FIXTURE_EVENTS = {'chicago': 'ALL_EVENT_GROUP_2016', 'london': 'MAS', 'berlin': 'MAL'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runners', type=int, default=200, help='Number of runners listed per job')
+    parser.add_argument('--latency', type=float, default=0.05, help='Server latency per request in seconds')
+    parser.add_argument('--workers', type=int, default=4, help='Number of concurrent workers per job')
+    parser.add_argument('--page-size', type=int, default=100, help='Number of results per page')
+    args = parser.parse_args()
+
+    servers = {race: start_fixture_server(latency=args.latency, num_runners=args.runners) for race in RACES}
+    jobs = [ScrapeJob(race, 2016, gender, FIXTURE_EVENTS[race], url=servers[race].base_url + race + '/',
+                      num_results_per_page=args.page_size) for gender in ['M', 'W'] for race in RACES]
+    try:
+        print('jobs={} runners/job={} latency={}s workers/job={}'.format(len(jobs), args.runners, args.latency,
+                                                                         args.workers))
+        print('{:>10} {:>10} {:>13}'.format('mode', 'seconds', 'runners/sec'))
+        for mode in ['sequential', 'scheduled']:
+            with tempfile.TemporaryDirectory() as directory, contextlib.redirect_stdout(io.StringIO()):
+                start = perf_counter()
+                if mode == 'sequential':
+                    session = SessionPool(max_connections_per_host=args.workers)
+                    for job in jobs:
+                        run_job(job, directory=directory, num_workers=args.workers, delay=0, session=session)
+                    session.close()
+                else:
+                    run_jobs(jobs, directory=directory, max_requests_per_host=args.workers, num_workers=args.workers,
+                             delay=0)
+                elapsed = perf_counter() - start
+            print('{:>10} {:>10.2f} {:>13.2f}'.format(mode, elapsed, len(jobs) * args.runners / elapsed))
+    finally:
+        for server in servers.values():
+            stop_fixture_server(server)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark of one job scraped by several worker processes sharing its work queue journal, as several hosts would from a
+shared disk, against a local stand-in results server.
+
+The job's runners are listed once, then scraped by 1, 2, and 4 processes, each with its own worker id, pool of worker
+threads, and output file. The worker that finishes last merges the outputs.
+
+Run from the repository root::
+
+    python -m dashathon.benchmarks.benchmark_sharding --runners 400 --latency 0.05 --workers 4
+"""
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import tempfile
+from time import perf_counter
+
+from dashathon.tests.fixture_server import start_fixture_server, stop_fixture_server
+from dashathon.scraping.output_methods import read_records
+from dashathon.scraping.scheduler_methods import HEADERS_BERLIN
+from dashathon.scraping.scraping_methods import scrape_berlin_marathon, scrape_berlin_marathon_urls
+
+
+def scrape_worker(directory, worker_id, num_workers):
+    """
+    Method to scrape the benchmark job as one worker sharing its journal.
+
+    :param str directory: Directory holding the job's files
+    :param str worker_id: Name of the worker
+    :param int num_workers: Number of runners scraped concurrently by the worker
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        scrape_berlin_marathon(path_input=os.path.join(directory, 'berlin_urls.csv'),
+                               path_output=os.path.join(directory, 'berlin.csv'),
+                               path_error=os.path.join(directory, 'berlin_error_log.csv'), year=2016, gender='M',
+                               headers=HEADERS_BERLIN, num_workers=num_workers, delay=0, worker_id=worker_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runners', type=int, default=400, help='Number of runners listed by the job')
+    parser.add_argument('--latency', type=float, default=0.05, help='Server latency per request in seconds')
+    parser.add_argument('--workers', type=int, default=4, help='Number of concurrent requests per process')
+    args = parser.parse_args()
+
+    server = start_fixture_server(latency=args.latency, num_runners=args.runners)
+    context = multiprocessing.get_context('spawn')
+    try:
+        df_urls = scrape_berlin_marathon_urls(url=server.base_url + 'berlin/', event='MAL', year=2016, gender='M')
+        print('runners={} latency={}s workers/process={}'.format(args.runners, args.latency, args.workers))
+        print('{:>10} {:>10} {:>13} {:>8}'.format('processes', 'seconds', 'runners/sec', 'merged'))
+        for num_processes in [1, 2, 4]:
+            with tempfile.TemporaryDirectory() as directory:
+                df_urls.to_csv(os.path.join(directory, 'berlin_urls.csv'), header=False, index=False, sep='|')
+                processes = [context.Process(target=scrape_worker, args=(directory, 'worker-' + str(i), args.workers))
+                             for i in range(num_processes)]
+                start = perf_counter()
+                for process in processes:
+                    process.start()
+                for process in processes:
+                    process.join()
+                elapsed = perf_counter() - start
+                num_merged = len(read_records(os.path.join(directory, 'berlin.csv'))[1])
+            print('{:>10} {:>10.2f} {:>13.2f} {:>8}'.format(num_processes, elapsed, args.runners / elapsed,
+                                                            num_merged))
+    finally:
+        stop_fixture_server(server)
+
+
+if __name__ == '__main__':
+    main()
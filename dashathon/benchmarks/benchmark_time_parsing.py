@@ -0,0 +1,98 @@
+"""
+Benchmark of the conversion of split times into seconds by dashathon.merging.merging_methods, one value at a time with
+`apply` against one pass over each column.
+
+Times 'HH:MM:SS' are read from the split columns of the NYC Marathon files of 2015-2018 in dashathon/data/external_data.
+If those files are missing, the split times of the llimllib Boston Marathon files, in decimal minutes, are formatted as
+'HH:MM:SS', with their '-' placeholders kept, and repeated up to `--rows` runners, about the size of the four NYC files.
+Times in decimal minutes are the split times of the llimllib Boston Marathon files, repeated up to the same size.
+
+Run from the repository root::
+
+    python -m dashathon.benchmarks.benchmark_time_parsing --rows 200000
+"""
+import argparse
+import os
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+from dashathon.merging.merging_methods import convert_minutes_to_seconds, convert_string_to_seconds, \
+    convert_string_column_to_seconds
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'external_data')
+
+HEADERS_NYC_SPLITS = ['splint_10k', 'splint_15k', 'splint_20k', 'splint_25k', 'splint_30k', 'splint_35k', 'splint_40k',
+                      'splint_5k', 'splint_half', 'official_time']
+HEADERS_LLIMLLIB_SPLITS = ['5k', '10k', '20k', 'half', '25k', '30k', '35k', '40k', 'official', 'pace']
+
+
+def read_llimllib_minutes(num_rows):
+    """
+    Method to read the split times of the llimllib Boston Marathon files, repeated up to a number of runners.
+
+    :param int num_rows: Number of runners
+    :return: Split times in decimal minutes, with NaN for placeholders
+    :rtype: pandas.DataFrame
+    """
+    df = pd.concat([pd.read_csv(os.path.join(DATA_DIR, 'llimllib_boston_results_{}.csv'.format(year)),
+                                usecols=HEADERS_LLIMLLIB_SPLITS, na_values='-') for year in [2013, 2014]],
+                   ignore_index=True).astype(float)
+    return df.iloc[np.arange(num_rows) % len(df)].reset_index(drop=True)
+
+
+def read_nyc_times(num_rows):
+    """
+    Method to read the split times of the NYC Marathon files of 2015-2018, or to make as many from the llimllib Boston
+    Marathon files if the NYC files are missing.
+
+    :param int num_rows: Number of runners made up if the NYC files are missing
+    :return: Split times in a string format 'HH:MM:SS', and the source of the times
+    :rtype: (pandas.DataFrame, str)
+    """
+    paths = [os.path.join(DATA_DIR, 'andreanr_nyc_results_{}.csv'.format(year)) for year in range(2015, 2019)]
+    if all(os.path.exists(path) for path in paths):
+        df = pd.concat([pd.read_csv(path, usecols=HEADERS_NYC_SPLITS, dtype=str) for path in paths], ignore_index=True)
+        return df, 'NYC 2015-2018 files'
+
+    df_minutes = read_llimllib_minutes(num_rows).drop('pace', axis=1)
+    df = pd.DataFrame(index=df_minutes.index)
+    for header in df_minutes.columns:
+        header_nyc = 'official_time' if header == 'official' else 'splint_' + header
+        seconds = (df_minutes[header] * 60).round()
+        df[header_nyc] = ['-' if np.isnan(s) else '{:02d}:{:02d}:{:02d}'.format(int(s // 3600), int(s % 3600 // 60),
+                                                                                int(s % 60)) for s in seconds]
+    return df, 'llimllib Boston files as HH:MM:SS (NYC files missing)'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200000, help='Number of runners made up if NYC files are missing')
+    args = parser.parse_args()
+
+    df_times, source = read_nyc_times(args.rows)
+    df_minutes = read_llimllib_minutes(len(df_times))
+    print('source: {}'.format(source))
+    print('runners={} string cells={} minute cells={}'.format(len(df_times), df_times.size, df_minutes.size))
+    print('{:>10} {:>10} {:>10} {:>12} {:>8}'.format('times', 'method', 'seconds', 'ns/cell', 'speedup'))
+
+    for times, df, convert_value, convert_column in [
+            ('HH:MM:SS', df_times, convert_string_to_seconds, convert_string_column_to_seconds),
+            ('minutes', df_minutes, convert_minutes_to_seconds, convert_minutes_to_seconds)]:
+        start = perf_counter()
+        expected = pd.DataFrame({header: df[header].apply(convert_value) for header in df.columns})
+        apply_seconds = perf_counter() - start
+
+        start = perf_counter()
+        converted = pd.DataFrame({header: convert_column(df[header]) for header in df.columns})
+        column_seconds = perf_counter() - start
+
+        assert converted.equals(expected)
+        for method, elapsed in [('apply', apply_seconds), ('column', column_seconds)]:
+            print('{:>10} {:>10} {:>10.3f} {:>12.1f} {:>8.1f}'.format(times, method, elapsed, elapsed / df.size * 1e9,
+                                                                      apply_seconds / elapsed))
+
+
+if __name__ == '__main__':
+    main()
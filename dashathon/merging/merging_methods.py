@@ -1,14 +1,42 @@
+import csv
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
 import pandas as pd
 import numpy as np
+from pandas.api.types import infer_dtype
+
+# Code points of the last 8 characters of a time 'HH:MM:SS', and their weights in seconds
+_TIME_WIDTH = 8
+_TIME_COLONS = [2, 5]
+_TIME_DIGITS = [0, 1, 3, 4, 6, 7]
+_TIME_DIGIT_SECONDS = np.array([36000, 3600, 600, 60, 10, 1])
+
+# Oldest age of every band of `band_age` but the last, which has no upper bound
+AGE_BAND_MAX_AGES = np.array([19, 24, 29, 34, 39, 44, 49, 54, 59, 64, 69, 74, 79])
+
+# Banded level and age banding of every band of `band_age`
+AGE_BAND_LEVELS = np.arange(1, len(AGE_BAND_MAX_AGES) + 2)
+AGE_BAND_LABELS = np.array(['<= 19', '20-24', '25-29', '30-34', '35-39', '40-44', '45-49', '50-54', '55-59', '60-64',
+                            '65-69', '70-74', '75-79', '80+'], dtype=object)
+
+# Age bandings of the combined data of `process_all_data`, which are only given to the ages of 1 to 94, as listed in
+# age_map.csv
+AGE_RANGE_LABELS = np.concatenate([['<=19'], AGE_BAND_LABELS[1:]])
+AGE_RANGE_MIN_AGE = 1
+AGE_RANGE_MAX_AGE = 94
+
+# Fields read from the scraped London and Berlin Marathon files
+HEADERS_LONDON_BERLIN = ['year', 'bib', 'age_group', 'gender', 'country', 'overall', 'rank_gender', 'rank_age_group',
+                         '5k', '10k', '15k', '20k', 'half', '25k', '30k', '35k', '40k', 'finish']
 
 
 def convert_minutes_to_seconds(time_minutes):
     """
-    Convert time expressed in (float) minutes into (float) seconds.
+    Convert time expressed in (float) minutes into (float) seconds. Also converts a whole column, or several, at once.
 
-    :param float time_minutes: Time expressed in minutes.
+    :param float|pandas.Series|pandas.DataFrame time_minutes: Time expressed in minutes.
     :return: Time expressed in seconds.
-    :rtype: float
+    :rtype: float|pandas.Series|pandas.DataFrame
     """
     time_seconds = time_minutes * 60
     return time_seconds
@@ -37,8 +65,7 @@ def transform_llimllib_boston_data(df, year):
     df = df.astype(dtypes_new)
 
     # Convert split time from decimal minutes to seconds
-    for header in headers_split + ['pace']:
-        df[header] = df[header].apply(convert_minutes_to_seconds)
+    df[headers_split + ['pace']] = convert_minutes_to_seconds(df[headers_split + ['pace']])
 
     # Add year field
     df['year'] = year
@@ -70,6 +97,55 @@ def convert_string_to_seconds(time_str):
         return np.nan
 
 
+def convert_string_column_to_seconds(column):
+    """
+    Convert a column of times in a string format 'HH:MM:SS' into seconds, as `convert_string_to_seconds` would one
+    value at a time. Times written 'HH:MM:SS' or 'H:MM:SS' are read all at once from the characters of the column, and
+    strings without two colons, like the placeholder '-' or blanks, become NaN. Any other value is left to
+    `convert_string_to_seconds`.
+
+    Example::
+
+        convert_string_column_to_seconds(pd.Series(['00:41:41', '-']))  # 2501.0, NaN
+
+    :param pandas.Series column: Times in a string format 'HH:MM:SS'
+    :return: Times expressed in seconds, as int64 if every time could be read, and as float64 otherwise
+    :rtype: pandas.Series
+    """
+    values = column.to_numpy()
+    if column.empty or infer_dtype(values, skipna=True) != 'string' or \
+            '\x00' in ''.join(values[column.notna().to_numpy()] if column.hasnans else values):
+        # Columns mixing strings with numbers, and strings with null characters, which numpy drops from the end of
+        # strings, are converted one value at a time
+        return column.apply(convert_string_to_seconds)
+
+    # One row of code points per string, padded with zeros to at least 8 characters. Missing values become 'nan'.
+    texts = column.to_numpy(dtype=str)
+    texts = texts.view(np.uint32).reshape(len(texts), -1)
+    codes = np.zeros((len(texts), max(texts.shape[1], _TIME_WIDTH)), dtype=np.uint32)
+    codes[:, :texts.shape[1]] = texts
+    lengths = (codes != 0).sum(axis=1)
+
+    # First 8 characters of each string, with '0' in front of the strings of 7 characters
+    window = np.where((lengths == _TIME_WIDTH - 1)[:, np.newaxis],
+                      np.column_stack([np.full(len(codes), ord('0'), dtype=np.uint32), codes[:, :_TIME_WIDTH - 1]]),
+                      codes[:, :_TIME_WIDTH])
+    digits = window[:, _TIME_DIGITS].astype(np.int64) - ord('0')
+    is_time = (((lengths == _TIME_WIDTH - 1) | (lengths == _TIME_WIDTH))
+               & (window[:, _TIME_COLONS] == ord(':')).all(axis=1) & ((digits >= 0) & (digits <= 9)).all(axis=1))
+    time_seconds = digits @ _TIME_DIGIT_SECONDS
+    if is_time.all():
+        return pd.Series(time_seconds, index=column.index, name=column.name)
+
+    time_seconds = np.where(is_time, time_seconds, np.nan)
+    is_other = ~is_time & ((codes == ord(':')).sum(axis=1) == 2)
+    if is_other.any():
+        time_seconds[is_other] = column[is_other].apply(convert_string_to_seconds).to_numpy(dtype=float)
+    if np.isnan(time_seconds).any():
+        return pd.Series(time_seconds, index=column.index, name=column.name)
+    return pd.Series(time_seconds.astype(np.int64), index=column.index, name=column.name)
+
+
 def transform_rojour_boston_data(df, year):
     """
     Transform 2015-2107 Boston Marathon data from rojour's Github repo into a standard form for downstream processing.
@@ -89,7 +165,7 @@ def transform_rojour_boston_data(df, year):
     # The split times in the Kaggle data are formatted as strings hh:mm:ss. We want these times in total seconds.
     headers_split = ['5K', '10K', '15K', '20K', 'Half', '25K', '30K', '35K', '40K', 'Official Time']
     for header in headers_split:
-        df[header] = df[header].apply(convert_string_to_seconds)
+        df[header] = convert_string_column_to_seconds(df[header])
 
     if year == 2015:
         df.dropna(subset=['Official Time'])
@@ -184,6 +260,25 @@ def band_age(age):
     return bid, bstr
 
 
+def band_ages(ages, labels=AGE_BAND_LABELS):
+    """
+    Banding method that maps many ages at once to the bands of `band_age`, with a binary search of each age among the
+    bands' oldest ages.
+
+    Example::
+
+        band_ages(pd.Series([15, 42, 81]))  # (array([1, 6, 14]), array(['<= 19', '40-44', '80+'], dtype=object))
+
+    :param pandas.Series ages: Ages of runners. Missing ages are banded as '80+', like `band_age` does.
+    :param numpy.ndarray labels: Age banding of every band, in order
+    :return: (banded_levels, age_bandings) where: banded_levels are the banded levels of the ages, and age_bandings are
+    the bandings of the ages
+    :rtype: (numpy.ndarray, numpy.ndarray)
+    """
+    bands = np.searchsorted(AGE_BAND_MAX_AGES, np.asarray(ages, dtype=float), side='left')
+    return AGE_BAND_LEVELS[bands], labels[bands]
+
+
 def append_age_banding(df):
     """
     Method that appends a banding of the age field, which is consistent with the method `band_age`.
@@ -194,9 +289,10 @@ def append_age_banding(df):
     :return: DataFrame of transformed marathon data that includes a banding of age consistent with method `band_age`
     :rtype: pandas.DataFrame
     """
+    age_buckets, age_ranges = band_ages(df['age'])
     return pd.concat((
         df,
-        df['age'].apply(lambda cell: pd.Series(band_age(cell), index=['age_bucket', 'age_range']))
+        pd.DataFrame({'age_bucket': age_buckets, 'age_range': age_ranges}, index=df.index)
     ), axis=1)
 
 
@@ -219,55 +315,107 @@ def combine_boston_data(list_dfs):
 
 def pipe_reader(input_file):
     """
-    Read datasets without pandas read_csv when we have a pipe delimiter dataset
-    with commas inside columns
+    Read a pipe delimited dataset with commas inside columns, keeping every value as a string. Values that contain
+    delimiters or quotes are read as quoted by the scrapers' RecordWriter.
 
     :param str input_file: File path
     :return: The pipe delimited file as a DataFrame
     :rtype: pandas.DataFrame
     """
-    with open(input_file, 'r') as f:
-        temp_file = f.read()
-    temp_file = temp_file.split('\n')
-    lis = []
-    for row in temp_file:
-        row = row.split('|')
-        if len(row) == 20:
-            lis.append(row)
-    temp_df = pd.DataFrame(lis, columns=lis[0])
-    temp_df = temp_df.drop(0, axis=0)
+    # Rows with more fields than the header are malformed. These were left by older versions of the scrapers, which
+    # split values containing spaces into separate fields.
+    kwargs = dict(sep='|', dtype=str, keep_default_na=False, error_bad_lines=False, warn_bad_lines=False)
+    try:
+        temp_df = pd.read_csv(input_file, **kwargs)
+    except pd.errors.ParserError:
+        # Older versions of the scrapers didn't quote values, so a stray quote (e.g. '"COAHUILA') is read as written
+        temp_df = pd.read_csv(input_file, quoting=csv.QUOTE_NONE, **kwargs)
+    temp_df.index = range(1, len(temp_df) + 1)
     return temp_df
 
 
-def process_boston_data():
+def _start_process_pool(num_processes):
+    # Pool of processes all started at once, rather than as tasks are submitted
+    executor = ProcessPoolExecutor(max_workers=num_processes)
+    for future in [executor.submit(int) for _ in range(num_processes)]:
+        future.result()
+    return executor
+
+
+def _map_files(method, args, executor=None):
+    # Files are read one after another, or all at once by the processes of executor, with results in the order of args
+    if executor is None:
+        return [method(arg) for arg in args]
+    return list(executor.map(method, args))
+
+
+def read_boston_data(year):
+    """
+    Method to import and transform one year of Boston Marathon data, from llimllib's Github repo until 2014, and from
+    rojour's Github repo after.
+
+    :param int year: Year of Boston Marathon
+    :return: DataFrame of transformed marathon data
+    :rtype: pandas.DataFrame
+    """
+    if year <= 2014:
+        df = pd.read_csv('dashathon/data/external_data/llimllib_boston_results_{}.csv'.format(year), delimiter=',')
+        return transform_llimllib_boston_data(df=df, year=year)
+    df = pd.read_csv('dashathon/data/external_data/rojour_boston_results_{}.csv'.format(year), delimiter=',')
+    return transform_rojour_boston_data(df=df, year=year)
+
+
+def read_nyc_data(year):
+    """
+    Method to import one year of NYC Marathon data from andreanr's Github repo, without the records missing split times
+    or age, and with split times converted to seconds.
+
+    :param int year: Year of NYC Marathon
+    :return: DataFrame of transformed marathon data
+    :rtype: pandas.DataFrame
+    """
+    andreanr_nyc_results = pd.read_csv('dashathon/data/external_data/andreanr_nyc_results_{}.csv'.format(year))
+
+    # Removing records with missing split times
+    headers_nyc_splits = ['splint_10k', 'splint_15k', 'splint_20k', 'splint_25k', 'splint_30k', 'splint_35k',
+                          'splint_40k', 'splint_5k', 'splint_half', 'official_time']
+    andreanr_nyc_results = andreanr_nyc_results.dropna(subset=headers_nyc_splits + ['age'])
+
+    # Consistent age
+    andreanr_nyc_results.age = andreanr_nyc_results.age.astype('int64')
+
+    # Converting HH:MM:SS to seconds
+    for header in headers_nyc_splits:
+        andreanr_nyc_results[header] = convert_string_column_to_seconds(andreanr_nyc_results[header])
+
+    return andreanr_nyc_results
+
+
+def read_london_berlin_data(input_file):
+    """
+    Method to import one file of scraped London or Berlin Marathon data.
+
+    :param str input_file: File path
+    :return: DataFrame of the fields `HEADERS_LONDON_BERLIN` of the file
+    :rtype: pandas.DataFrame
+    """
+    return pd.read_csv(input_file, sep='|', usecols=HEADERS_LONDON_BERLIN)
+
+
+def process_boston_data(executor=None):
     """
     Method to import, transform, and combine Boston Marathon data.
 
+    :param concurrent.futures.Executor executor: Pool of processes importing and transforming each year at once. If
+           None, years are imported one after another.
     :return: DataFrame of transformed and combined Boston Marathon data.
     :rtype: pandas.DataFrame
     """
-    # Read in data
-    llimllib_boston_results_2013 = pd.read_csv('dashathon/data/external_data/llimllib_boston_results_2013.csv',
-                                               delimiter=',')
-    llimllib_boston_results_2014 = pd.read_csv('dashathon/data/external_data/llimllib_boston_results_2014.csv',
-                                               delimiter=',')
-    rojour_boston_results_2015 = pd.read_csv('dashathon/data/external_data/rojour_boston_results_2015.csv',
-                                             delimiter=',')
-    rojour_boston_results_2016 = pd.read_csv('dashathon/data/external_data/rojour_boston_results_2016.csv',
-                                             delimiter=',')
-    rojour_boston_results_2017 = pd.read_csv('dashathon/data/external_data/rojour_boston_results_2017.csv',
-                                             delimiter=',')
-
-    # Transform data
-    boston_results_2013 = transform_llimllib_boston_data(df=llimllib_boston_results_2013, year=2013)
-    boston_results_2014 = transform_llimllib_boston_data(df=llimllib_boston_results_2014, year=2014)
-    boston_results_2015 = transform_rojour_boston_data(df=rojour_boston_results_2015, year=2015)
-    boston_results_2016 = transform_rojour_boston_data(df=rojour_boston_results_2016, year=2016)
-    boston_results_2017 = transform_rojour_boston_data(df=rojour_boston_results_2017, year=2017)
+    # Read in and transform data
+    boston_results_by_year = _map_files(read_boston_data, [2013, 2014, 2015, 2016, 2017], executor)
 
     # Combine Boston data
-    boston_results = combine_boston_data(list_dfs=[boston_results_2013, boston_results_2014, boston_results_2015,
-                                                   boston_results_2016, boston_results_2017])
+    boston_results = combine_boston_data(list_dfs=boston_results_by_year)
 
     # Append host city to distinguish among other marathon results
     boston_results['host_city'] = 'Boston'
@@ -278,33 +426,19 @@ def process_boston_data():
     return boston_results
 
 
-def process_nyc_data():
+def process_nyc_data(executor=None):
     """
     Method to import, transform, and combine NYC Marathon data.
 
+    :param concurrent.futures.Executor executor: Pool of processes importing and transforming each year at once. If
+           None, years are imported one after another.
     :return: DataFrame of transformed and combine NYC Marathon data.
     :rtype: pandas.DataFrame
     """
-    andreanr_nyc_results_2015 = pd.read_csv('dashathon/data/external_data/andreanr_nyc_results_2015.csv')
-    andreanr_nyc_results_2016 = pd.read_csv('dashathon/data/external_data/andreanr_nyc_results_2016.csv')
-    andreanr_nyc_results_2017 = pd.read_csv('dashathon/data/external_data/andreanr_nyc_results_2017.csv')
-    andreanr_nyc_results_2018 = pd.read_csv('dashathon/data/external_data/andreanr_nyc_results_2018.csv')
+    andreanr_nyc_results_by_year = _map_files(read_nyc_data, [2015, 2016, 2017, 2018], executor)
 
     # Merging all nyc datasets first
-    andreanr_nyc_results = andreanr_nyc_results_2015.append([andreanr_nyc_results_2016, andreanr_nyc_results_2017,
-                                                             andreanr_nyc_results_2018], ignore_index=True)
-
-    # Removing records with missing split times
-    headers_nyc_splits = ['splint_10k', 'splint_15k', 'splint_20k', 'splint_25k', 'splint_30k', 'splint_35k',
-                          'splint_40k', 'splint_5k', 'splint_half', 'official_time']
-    andreanr_nyc_results = andreanr_nyc_results.dropna(subset=headers_nyc_splits + ['age'])
-
-    # Consistent age
-    andreanr_nyc_results.age = andreanr_nyc_results.age.astype('int64')
-
-    # Converting HH:MM:SS to seconds
-    for header in headers_nyc_splits:
-        andreanr_nyc_results[header] = andreanr_nyc_results[header].apply(convert_string_to_seconds)
+    andreanr_nyc_results = andreanr_nyc_results_by_year[0].append(andreanr_nyc_results_by_year[1:], ignore_index=True)
 
     # Assuming na values for absent columns in nyc data
     andreanr_nyc_results['citizen'] = None
@@ -334,24 +468,20 @@ def process_nyc_data():
     return andreanr_nyc_results
 
 
-def process_chicago_data():
+def process_chicago_data(executor=None):
     """
     Method to import, transform, and combine Chicago Marathon data.
 
+    :param concurrent.futures.Executor executor: Pool of processes importing each file at once. If None, files are
+           imported one after another.
     :return: DataFrame of transformed and combined Chicago Marathon data.
     :rtype: pandas.DataFrame
     """
-    chi14m = pipe_reader('dashathon/data/scraped_data/chicago_marathon_2014_M.csv')
-    chi14w = pipe_reader('dashathon/data/scraped_data/chicago_marathon_2014_W.csv')
-    chi15m = pipe_reader('dashathon/data/scraped_data/chicago_marathon_2015_M.csv')
-    chi15w = pipe_reader('dashathon/data/scraped_data/chicago_marathon_2015_W.csv')
-    chi16m = pipe_reader('dashathon/data/scraped_data/chicago_marathon_2016_M.csv')
-    chi16w = pipe_reader('dashathon/data/scraped_data/chicago_marathon_2016_W.csv')
-    chi17m = pipe_reader('dashathon/data/scraped_data/chicago_marathon_2017_M.csv')
-    chi17w = pipe_reader('dashathon/data/scraped_data/chicago_marathon_2017_W.csv')
+    chicago_results_by_file = _map_files(pipe_reader, ['dashathon/data/scraped_data/chicago_marathon_{}_{}.csv'.format(
+        year, gender) for year in [2014, 2015, 2016, 2017] for gender in ['M', 'W']], executor)
 
     # Merging all chicago datasets first
-    chicago_results = chi14m.append([chi14w, chi15m, chi15w, chi16m, chi16w, chi17m, chi17w], ignore_index=True)
+    chicago_results = chicago_results_by_file[0].append(chicago_results_by_file[1:], ignore_index=True)
 
     # Bringing around required datatypes
     chicago_results[['year', 'bib', 'rank_gender', 'rank_age_group', 'overall']] = chicago_results[
@@ -375,82 +505,21 @@ def process_chicago_data():
     return chicago_results
 
 
-def process_london_data():
+def process_london_data(executor=None):
     """
     Method to import, transform, and combine London Marathon data.
 
+    :param concurrent.futures.Executor executor: Pool of processes importing each file at once. If None, files are
+           imported one after another.
     :return: DataFrame of transformed and combined London Marathon data.
     :rtype: pandas.DataFrame
     """
     # Reading in the datasets
-    lon14m = pd.read_csv('dashathon/data/scraped_data/london_marathon_2014_M.csv',
-                         sep='|', usecols=['year', 'bib', 'age_group', 'gender', 'country', 'overall', 'rank_gender',
-                                           'rank_age_group', '5k', '10k', '15k', '20k', 'half', '25k', '30k', '35k',
-                                           '40k',
-                                           'finish'])
-    lon14me = pd.read_csv('dashathon/data/scraped_data/london_marathon_2014_M_elite.csv', sep='|',
-                          usecols=['year', 'bib', 'age_group', 'gender', 'country', 'overall', 'rank_gender',
-                                   'rank_age_group', '5k', '10k', '15k', '20k', 'half', '25k', '30k', '35k', '40k',
-                                   'finish'])
-    lon14w = pd.read_csv('dashathon/data/scraped_data/london_marathon_2014_W.csv', sep='|',
-                         usecols=['year', 'bib', 'age_group', 'gender', 'country', 'overall', 'rank_gender',
-                                  'rank_age_group', '5k', '10k', '15k', '20k', 'half', '25k', '30k', '35k', '40k',
-                                  'finish'])
-    lon14we = pd.read_csv('dashathon/data/scraped_data/london_marathon_2014_W_elite.csv', sep='|',
-                          usecols=['year', 'bib', 'age_group', 'gender', 'country', 'overall', 'rank_gender',
-                                   'rank_age_group', '5k', '10k', '15k', '20k', 'half', '25k', '30k', '35k', '40k',
-                                   'finish'])
-    lon15m = pd.read_csv('dashathon/data/scraped_data/london_marathon_2015_M.csv', sep='|',
-                         usecols=['year', 'bib', 'age_group', 'gender', 'country', 'overall', 'rank_gender',
-                                  'rank_age_group', '5k', '10k', '15k', '20k', 'half', '25k', '30k', '35k', '40k',
-                                  'finish'])
-    lon15me = pd.read_csv('dashathon/data/scraped_data/london_marathon_2015_M_elite.csv', sep='|',
-                          usecols=['year', 'bib', 'age_group', 'gender', 'country', 'overall', 'rank_gender',
-                                   'rank_age_group', '5k', '10k', '15k', '20k', 'half', '25k', '30k', '35k', '40k',
-                                   'finish'])
-    lon15w = pd.read_csv('dashathon/data/scraped_data/london_marathon_2015_W.csv', sep='|',
-                         usecols=['year', 'bib', 'age_group', 'gender', 'country', 'overall', 'rank_gender',
-                                  'rank_age_group', '5k', '10k', '15k', '20k', 'half', '25k', '30k', '35k', '40k',
-                                  'finish'])
-    lon15we = pd.read_csv('dashathon/data/scraped_data/london_marathon_2015_W_elite.csv', sep='|',
-                          usecols=['year', 'bib', 'age_group', 'gender', 'country', 'overall', 'rank_gender',
-                                   'rank_age_group', '5k', '10k', '15k', '20k', 'half', '25k', '30k', '35k', '40k',
-                                   'finish'])
-    lon16m = pd.read_csv('dashathon/data/scraped_data/london_marathon_2016_M.csv', sep='|',
-                         usecols=['year', 'bib', 'age_group', 'gender', 'country', 'overall', 'rank_gender',
-                                  'rank_age_group', '5k', '10k', '15k', '20k', 'half', '25k', '30k', '35k', '40k',
-                                  'finish'])
-    lon16me = pd.read_csv('dashathon/data/scraped_data/london_marathon_2016_M_elite.csv', sep='|',
-                          usecols=['year', 'bib', 'age_group', 'gender', 'country', 'overall', 'rank_gender',
-                                   'rank_age_group', '5k', '10k', '15k', '20k', 'half', '25k', '30k', '35k', '40k',
-                                   'finish'])
-    lon16w = pd.read_csv('dashathon/data/scraped_data/london_marathon_2016_W.csv', sep='|',
-                         usecols=['year', 'bib', 'age_group', 'gender', 'country', 'overall', 'rank_gender',
-                                  'rank_age_group', '5k', '10k', '15k', '20k', 'half', '25k', '30k', '35k', '40k',
-                                  'finish'])
-    lon16we = pd.read_csv('dashathon/data/scraped_data/london_marathon_2016_W_elite.csv', sep='|',
-                          usecols=['year', 'bib', 'age_group', 'gender', 'country', 'overall', 'rank_gender',
-                                   'rank_age_group', '5k', '10k', '15k', '20k', 'half', '25k', '30k', '35k', '40k',
-                                   'finish'])
-    lon17m = pd.read_csv('dashathon/data/scraped_data/london_marathon_2017_M.csv', sep='|',
-                         usecols=['year', 'bib', 'age_group', 'gender', 'country', 'overall', 'rank_gender',
-                                  'rank_age_group', '5k', '10k', '15k', '20k', 'half', '25k', '30k', '35k', '40k',
-                                  'finish'])
-    lon17me = pd.read_csv('dashathon/data/scraped_data/london_marathon_2017_M_elite.csv', sep='|',
-                          usecols=['year', 'bib', 'age_group', 'gender', 'country', 'overall', 'rank_gender',
-                                   'rank_age_group', '5k', '10k', '15k', '20k', 'half', '25k', '30k', '35k', '40k',
-                                   'finish'])
-    lon17w = pd.read_csv('dashathon/data/scraped_data/london_marathon_2017_W.csv', sep='|',
-                         usecols=['year', 'bib', 'age_group', 'gender', 'country', 'overall', 'rank_gender',
-                                  'rank_age_group', '5k', '10k', '15k', '20k', 'half', '25k', '30k', '35k', '40k',
-                                  'finish'])
-    lon17we = pd.read_csv('dashathon/data/scraped_data/london_marathon_2017_W_elite.csv', sep='|',
-                          usecols=['year', 'bib', 'age_group', 'gender', 'country', 'overall', 'rank_gender',
-                                   'rank_age_group', '5k', '10k', '15k', '20k', 'half', '25k', '30k', '35k', '40k',
-                                   'finish'])
-
-    london_results = lon14m.append([lon14me, lon14w, lon14we, lon15m, lon15me, lon15w, lon15we, lon16m, lon16me, lon16w,
-                                    lon16we, lon17m, lon17me, lon17w, lon17we], ignore_index=True)
+    london_results_by_file = _map_files(read_london_berlin_data, [
+        'dashathon/data/scraped_data/london_marathon_{}_{}{}.csv'.format(year, gender, elite)
+        for year in [2014, 2015, 2016, 2017] for gender in ['M', 'W'] for elite in ['', '_elite']], executor)
+
+    london_results = london_results_by_file[0].append(london_results_by_file[1:], ignore_index=True)
 
     london_results['city'] = None
     london_results['state'] = None
@@ -459,47 +528,20 @@ def process_london_data():
     return london_results
 
 
-def process_berlin_data():
+def process_berlin_data(executor=None):
     """
     Method to import, transform, and combine Berlin Marathon data.
 
+    :param concurrent.futures.Executor executor: Pool of processes importing each file at once. If None, files are
+           imported one after another.
     :return: DataFrame of transformed and combined Berlin Marathon data.
     :rtype: pandas.DataFrame
     """
-    ber14m = pd.read_csv('dashathon/data/scraped_data/london_marathon_2014_M.csv', sep='|',
-                         usecols=['year', 'bib', 'age_group', 'gender', 'country', 'overall', 'rank_gender',
-                                  'rank_age_group', '5k', '10k', '15k', '20k', 'half', '25k', '30k', '35k', '40k',
-                                  'finish'])
-    ber14w = pd.read_csv('dashathon/data/scraped_data/london_marathon_2014_M_elite.csv', sep='|',
-                         usecols=['year', 'bib', 'age_group', 'gender', 'country', 'overall', 'rank_gender',
-                                  'rank_age_group', '5k', '10k', '15k', '20k', 'half', '25k', '30k', '35k', '40k',
-                                  'finish'])
-    ber15m = pd.read_csv('dashathon/data/scraped_data/london_marathon_2014_W.csv', sep='|',
-                         usecols=['year', 'bib', 'age_group', 'gender', 'country', 'overall', 'rank_gender',
-                                  'rank_age_group', '5k', '10k', '15k', '20k', 'half', '25k', '30k', '35k', '40k',
-                                  'finish'])
-    ber15w = pd.read_csv('dashathon/data/scraped_data/london_marathon_2014_W_elite.csv', sep='|',
-                         usecols=['year', 'bib', 'age_group', 'gender', 'country', 'overall', 'rank_gender',
-                                  'rank_age_group', '5k', '10k', '15k', '20k', 'half', '25k', '30k', '35k', '40k',
-                                  'finish'])
-    ber16m = pd.read_csv('dashathon/data/scraped_data/london_marathon_2015_M.csv', sep='|',
-                         usecols=['year', 'bib', 'age_group', 'gender', 'country', 'overall', 'rank_gender',
-                                  'rank_age_group', '5k', '10k', '15k', '20k', 'half', '25k', '30k', '35k', '40k',
-                                  'finish'])
-    ber16w = pd.read_csv('dashathon/data/scraped_data/london_marathon_2015_M_elite.csv', sep='|',
-                         usecols=['year', 'bib', 'age_group', 'gender', 'country', 'overall', 'rank_gender',
-                                  'rank_age_group', '5k', '10k', '15k', '20k', 'half', '25k', '30k', '35k', '40k',
-                                  'finish'])
-    ber17m = pd.read_csv('dashathon/data/scraped_data/london_marathon_2015_W.csv', sep='|',
-                         usecols=['year', 'bib', 'age_group', 'gender', 'country', 'overall', 'rank_gender',
-                                  'rank_age_group', '5k', '10k', '15k', '20k', 'half', '25k', '30k', '35k', '40k',
-                                  'finish'])
-    ber17w = pd.read_csv('dashathon/data/scraped_data/london_marathon_2015_W_elite.csv', sep='|',
-                         usecols=['year', 'bib', 'age_group', 'gender', 'country', 'overall', 'rank_gender',
-                                  'rank_age_group', '5k', '10k', '15k', '20k', 'half', '25k', '30k', '35k', '40k',
-                                  'finish'])
-
-    berlin_results = ber14m.append([ber14w, ber15m, ber15w, ber16m, ber16w, ber17m, ber17w], ignore_index=True)
+    berlin_results_by_file = _map_files(read_london_berlin_data, [
+        'dashathon/data/scraped_data/london_marathon_{}_{}{}.csv'.format(year, gender, elite)
+        for year in [2014, 2015] for gender in ['M', 'W'] for elite in ['', '_elite']], executor)
+
+    berlin_results = berlin_results_by_file[0].append(berlin_results_by_file[1:], ignore_index=True)
 
     berlin_results['city'] = None
     berlin_results['state'] = None
@@ -508,19 +550,61 @@ def process_berlin_data():
     return berlin_results
 
 
-def process_all_data():
+def process_cities_data(num_processes=None, process_methods=None):
+    """
+    Method to import, transform, and combine the Marathon data of every city.
+
+    With `num_processes`, every city is processed at once, each from its own thread, and the files of all the cities
+    are imported and transformed by a shared pool of processes. Each city's files are then combined in this process.
+
+    Example::
+
+        boston_results, nyc_results, chicago_results, london_results, berlin_results = process_cities_data(4)
+
+    :param int num_processes: Number of processes importing and transforming files at once. If None, cities and their
+           files are processed one after another.
+    :param list process_methods: Methods processing the data of each city, given the pool of processes. Defaults to
+           the methods of Boston, NYC, Chicago, London, and Berlin.
+    :return: DataFrames of transformed and combined Marathon data, in the order of `process_methods`
+    :rtype: list[pandas.DataFrame]
+    """
+    if process_methods is None:
+        process_methods = [process_boston_data, process_nyc_data, process_chicago_data, process_london_data,
+                           process_berlin_data]
+    if not num_processes:
+        return [process_method() for process_method in process_methods]
+
+    # Worker processes are started before the cities' threads, so no thread is running when they are forked
+    with _start_process_pool(num_processes) as executor, \
+            ThreadPoolExecutor(max_workers=len(process_methods)) as city_executor:
+        futures = [city_executor.submit(process_method, executor) for process_method in process_methods]
+        return [future.result() for future in futures]
+
+
+def process_all_data(num_processes=None):
     """
     Method to import, transform, and combine all Marathon data.
 
+    :param int num_processes: Number of processes importing and transforming files at once (see
+           `process_cities_data`). If None, files are processed one after another.
     :return: DataFrame of all transformed and combined Marathon data.
     :rtype: pandas.DataFrame
     """
-    boston_results = process_boston_data()
-    nyc_results = process_nyc_data()
-    chicago_results = process_chicago_data()
-    london_results = process_london_data()
-    berlin_results = process_berlin_data()
+    return combine_all_data(*process_cities_data(num_processes))
+
 
+def combine_all_data(boston_results, nyc_results, chicago_results, london_results, berlin_results):
+    """
+    Method to combine the transformed Marathon data of every city.
+
+    :param pandas.DataFrame boston_results: DataFrame of transformed and combined Boston Marathon data
+    :param pandas.DataFrame nyc_results: DataFrame of transformed and combined NYC Marathon data
+    :param pandas.DataFrame chicago_results: DataFrame of transformed and combined Chicago Marathon data
+    :param pandas.DataFrame london_results: DataFrame of transformed and combined London Marathon data
+    :param pandas.DataFrame berlin_results: DataFrame of transformed and combined Berlin Marathon data
+    :return: DataFrame of all transformed and combined Marathon data.
+    :rtype: pandas.DataFrame
+    """
     dashathon_data = boston_results.append([nyc_results, chicago_results], ignore_index=True)
 
     london_berlin_results = london_results.append(berlin_results, ignore_index=True)
@@ -549,8 +633,9 @@ def process_all_data():
 
     # Creating a new age_range column on basis of age
     dashathon_data = dashathon_data.drop(columns={'age_range'})
-    age_map = pd.read_csv('dashathon/merging/age_map.csv')
-    dashathon_data = pd.merge(dashathon_data, age_map, on='age', how='left')
+    has_age_range = dashathon_data['age'].isin(range(AGE_RANGE_MIN_AGE, AGE_RANGE_MAX_AGE + 1)).to_numpy()
+    dashathon_data['age_range'] = np.where(has_age_range, band_ages(dashathon_data['age'], AGE_RANGE_LABELS)[1],
+                                           np.nan)
 
     # Make gender consistent across all datasets
     dashathon_data['gender'] = dashathon_data['gender'].replace('W', 'F')
@@ -0,0 +1,116 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+
+
+class PageCache:
+    """
+    On-disk cache of downloaded results pages, stored gzip-compressed under a key derived from the request.
+
+    Each page is saved at `directory/<2 hex digits>/<sha256 of the request>.gz`, where the request is its method, URL,
+    and any form data, so the pages of a search form submission are cached as well as runner pages. Pages are written to
+    a temporary file first and then renamed, so concurrent workers and interrupted runs never leave partial pages.
+
+    In replay mode, the cache is the only source of pages: `SessionPool.open` raises an error for any page that isn't
+    cached instead of downloading it. This allows scraped pages to be parsed again offline, e.g. after a parser change.
+
+    Example::
+
+        # Download pages while filling the cache
+        session = SessionPool(cache=PageCache('page_cache'))
+
+        # Parse the same pages again offline
+        session = SessionPool(cache=PageCache('page_cache', replay=True))
+
+    :param str directory: Directory holding the cached pages. It is created if it does not exist.
+    :param bool replay: If True, pages are only ever read from the cache
+    :param int compress_level: gzip compression level, from 1 (fastest) to 9 (smallest)
+    """
+
+    def __init__(self, directory, replay=False, compress_level=6):
+        self.directory = directory
+        self.replay = replay
+        self.compress_level = compress_level
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def get_key(url, method='GET', data=None):
+        """
+        Method to return the cache key of a request.
+
+        Example::
+
+            PageCache.get_key('http://results.scc-events.com/2016/?content=detail&idp=...')
+
+        :param str url: URL of the page
+        :param str method: HTTP method of the request
+        :param data: Form data sent with the request, if any
+        :type data: str or bytes
+        :return: Hex digest identifying the request
+        :rtype: str
+        """
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        key = hashlib.sha256(method.upper().encode('ascii') + b' ' + url.encode('utf-8'))
+        if data:
+            key.update(b'\n' + data)
+        return key.hexdigest()
+
+    def get_path(self, key):
+        """
+        Method to return the path of the file holding a cached page.
+
+        :param str key: Cache key returned by `get_key`
+        :return: Path of the file
+        :rtype: str
+        """
+        return os.path.join(self.directory, key[:2], key + '.gz')
+
+    def get(self, key):
+        """
+        Method to read a cached page.
+
+        :param str key: Cache key returned by `get_key`
+        :return: Tuple of the page's URL, list of (header, value) pairs, and body, or None if the page isn't cached
+        :rtype: (str, list[(str, str)], bytes)
+        """
+        try:
+            with gzip.open(self.get_path(key), 'rb') as f:
+                metadata = json.loads(f.readline().decode('utf-8'))
+                body = f.read()
+        except FileNotFoundError:
+            return None
+        return metadata['url'], [tuple(header) for header in metadata['headers']], body
+
+    def put(self, key, url, headers, body):
+        """
+        Method to cache a page.
+
+        :param str key: Cache key returned by `get_key`
+        :param str url: URL of the page
+        :param list[(str, str)] headers: Response headers of the page
+        :param bytes body: Body of the page
+        """
+        path = self.get_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        metadata = json.dumps({'url': url, 'headers': headers}).encode('utf-8')
+
+        file_descriptor, path_temp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(file_descriptor, 'wb') as f:
+                with gzip.GzipFile(fileobj=f, mode='wb', compresslevel=self.compress_level, mtime=0) as f_gzip:
+                    f_gzip.write(metadata + b'\n')
+                    f_gzip.write(body)
+            os.replace(path_temp, path)
+        except BaseException:
+            os.remove(path_temp)
+            raise
+
+    def __contains__(self, key):
+        return os.path.isfile(self.get_path(key))
+
+    def __len__(self):
+        return sum(file_name.endswith('.gz') for _, _, file_names in os.walk(self.directory)
+                   for file_name in file_names)
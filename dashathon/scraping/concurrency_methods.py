@@ -0,0 +1,306 @@
+import random
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from time import monotonic, sleep
+from urllib.parse import urlsplit
+
+
+def get_host(url):
+    """
+    Method to return the host (including any port) of a URL, which is the unit used for politeness limits.
+
+    Example::
+
+        get_host('http://results.scc-events.com/2016/?content=detail')
+
+    :param str url: URL of a web page
+    :return: Host of the URL, e.g. 'results.scc-events.com'
+    :rtype: str
+    """
+    return urlsplit(url).netloc.lower()
+
+
+def start_process_pool(num_processes):
+    """
+    Method to start a pool of processes with every process already running.
+
+    A ProcessPoolExecutor only starts its processes as tasks are submitted, and on Linux they are forked from the
+    process as it is at that moment. Starting them all at once, before the caller starts any worker thread, keeps the
+    threads' locks out of the forked processes.
+
+    Example::
+
+        with start_process_pool(4) as executor:
+            ...
+
+    :param int num_processes: Number of processes
+    :return: Pool of processes
+    :rtype: concurrent.futures.ProcessPoolExecutor
+    """
+    executor = ProcessPoolExecutor(max_workers=num_processes)
+    for future in [executor.submit(int) for _ in range(num_processes)]:
+        future.result()
+    return executor
+
+
+class HostLimiter:
+    """
+    Bound the number of requests in flight against each host.
+
+    Each host gets its own semaphore, so workers scraping different hosts never wait on each other while workers
+    scraping the same host share at most `max_per_host` slots.
+
+    Example::
+
+        limiter = HostLimiter(max_per_host=4)
+        with limiter.slot(url):
+            html = fetch(url)
+
+    :param int max_per_host: Maximum number of concurrent requests per host
+    """
+
+    def __init__(self, max_per_host=1):
+        if max_per_host < 1:
+            raise ValueError('max_per_host must be at least 1')
+        self.max_per_host = max_per_host
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def _get_semaphore(self, host):
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._semaphores[host]
+
+    @contextmanager
+    def slot(self, url):
+        """
+        Context manager that holds one of the host's slots for the duration of the block.
+
+        :param str url: URL about to be requested
+        """
+        semaphore = self._get_semaphore(get_host(url))
+        semaphore.acquire()
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+    def record(self, url, latency, success):
+        """
+        Method to record the outcome of a request. The number of slots of a `HostLimiter` is fixed, so outcomes are
+        ignored. See `AdaptiveLimiter`.
+
+        :param str url: URL that was requested
+        :param float latency: Seconds the request took
+        :param bool success: Whether the request succeeded
+        """
+        pass
+
+
+class AdaptiveLimiter:
+    """
+    Bound the number of requests in flight against each host, tuning the bound from the host's responses with
+    additive increase, multiplicative decrease (AIMD).
+
+    Each host starts with `initial_per_host` slots. Every successful request adds `1 / level` slots, i.e. about one slot
+    per round of requests. A failed request, or one slower than `latency_tolerance` times the fastest recent request,
+    multiplies the level by `decrease`, at most once per round trip, so a burst of failures only cuts it once. The
+    level always stays between `min_per_host` and the ceiling `max_per_host`.
+
+    Example::
+
+        limiter = AdaptiveLimiter(max_per_host=16)
+        with limiter.slot(url):
+            start = monotonic()
+            html = fetch_runner_page(url, session)
+        limiter.record(url, latency=monotonic() - start, success=html is not None)
+        limiter.get_levels()  # {'results.scc-events.com': 6}
+
+    :param int max_per_host: Ceiling on the number of concurrent requests per host
+    :param int min_per_host: Floor on the number of concurrent requests per host
+    :param int initial_per_host: Number of concurrent requests per host before any response is seen
+    :param float decrease: Factor applied to the level when the host is overloaded
+    :param float latency_tolerance: Ratio to the fastest recent latency above which a request counts as overloaded
+    """
+
+    def __init__(self, max_per_host=8, min_per_host=1, initial_per_host=1, decrease=0.5, latency_tolerance=3.0):
+        if not 1 <= min_per_host <= initial_per_host <= max_per_host:
+            raise ValueError('Expected 1 <= min_per_host <= initial_per_host <= max_per_host')
+        if not 0 < decrease < 1:
+            raise ValueError('decrease must be between 0 and 1')
+        self.max_per_host = max_per_host
+        self.min_per_host = min_per_host
+        self.initial_per_host = initial_per_host
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self._levels = {}
+        self._in_flight = {}
+        self._base_latencies = {}
+        self._last_decreases = {}
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def slot(self, url):
+        """
+        Context manager that holds one of the host's slots for the duration of the block, waiting while the host has
+        as many requests in flight as its current level.
+
+        :param str url: URL about to be requested
+        """
+        host = get_host(url)
+        with self._condition:
+            while self._in_flight.get(host, 0) >= int(self._levels.get(host, self.initial_per_host)):
+                self._condition.wait()
+            self._in_flight[host] = self._in_flight.get(host, 0) + 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._in_flight[host] -= 1
+                self._condition.notify_all()
+
+    def record(self, url, latency, success):
+        """
+        Method to record the outcome of a request, raising or cutting the host's level.
+
+        :param str url: URL that was requested
+        :param float latency: Seconds the request took
+        :param bool success: Whether the request succeeded
+        """
+        host = get_host(url)
+        now = monotonic()
+        with self._condition:
+            level = self._levels.get(host, self.initial_per_host)
+            base_latency = self._base_latencies.get(host)
+            if success:
+                # Let the fastest latency drift up slowly, so a host that becomes slower for good isn't seen as
+                # overloaded forever.
+                base_latency = latency if base_latency is None else min(latency, base_latency * 1.01)
+                self._base_latencies[host] = base_latency
+
+            if not success or latency > self.latency_tolerance * base_latency:
+                if now - self._last_decreases.get(host, float('-inf')) >= latency:
+                    level = max(self.min_per_host, level * self.decrease)
+                    self._last_decreases[host] = now
+            else:
+                level = min(self.max_per_host, level + 1 / level)
+            self._levels[host] = level
+            self._condition.notify_all()
+
+    def get_levels(self):
+        """
+        Method to report the number of concurrent requests currently allowed against each host seen so far.
+
+        :return: Mapping of host to level
+        :rtype: dict
+        """
+        with self._condition:
+            return {host: int(level) for host, level in self._levels.items()}
+
+
+def get_backoff_delay(attempt, base_delay=1.0, max_delay=60.0):
+    """
+    Method to return how long to wait before retrying a failed request, using exponential backoff with jitter. The
+    wait doubles with each attempt, up to `max_delay`, and a random half of it is jittered so that runners failing
+    together are not all retried at the same moment.
+
+    Example::
+
+        get_backoff_delay(0)  # Between 0.5 and 1 second
+        get_backoff_delay(3)  # Between 4 and 8 seconds
+
+    :param int attempt: Number of retries already made, starting at 0
+    :param float base_delay: Wait in seconds before the first retry, before jitter
+    :param float max_delay: Largest wait in seconds, before jitter
+    :return: Wait in seconds
+    :rtype: float
+    """
+    delay = min(max_delay, base_delay * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class CircuitBreaker:
+    """
+    Pause all requests against a host that keeps failing, e.g. a results website returning HTTP 500 errors under load.
+
+    After `max_failures` consecutive failed requests to a host, its circuit opens and `wait` blocks every request to
+    that host for `reset_seconds`. A single trial request is then let through: if it succeeds the circuit closes,
+    otherwise it opens again for another `reset_seconds`. Hosts are tracked independently. Every request let through by
+    `wait` must have its outcome recorded, even if it raises, or the host's other requests keep waiting for it.
+
+    Example::
+
+        breaker = CircuitBreaker(max_failures=5, reset_seconds=30)
+        breaker.wait(url)
+        html = None
+        try:
+            html = fetch_runner_page(url, session)
+        finally:
+            breaker.record(url, success=html is not None)
+
+    :param int max_failures: Number of consecutive failures that opens a host's circuit
+    :param float reset_seconds: Seconds a circuit stays open before a trial request is let through
+    """
+
+    def __init__(self, max_failures=5, reset_seconds=30.0):
+        if max_failures < 1:
+            raise ValueError('max_failures must be at least 1')
+        self.max_failures = max_failures
+        self.reset_seconds = reset_seconds
+        self.trip_count = 0
+        self._failures = {}
+        self._open_until = {}
+        self._trial_hosts = set()
+        self._lock = threading.Lock()
+
+    def is_open(self, url):
+        """
+        Method to check whether requests to the URL's host are currently paused.
+
+        :param str url: URL about to be requested
+        :return: True if the host's circuit is open
+        :rtype: bool
+        """
+        with self._lock:
+            return monotonic() < self._open_until.get(get_host(url), 0)
+
+    def wait(self, url):
+        """
+        Method to block until a request to the URL's host is allowed. While a host's trial request is in flight, other
+        requests to that host keep waiting for its outcome.
+
+        :param str url: URL about to be requested
+        """
+        host = get_host(url)
+        while True:
+            with self._lock:
+                open_until = self._open_until.get(host)
+                if open_until is None:
+                    return
+                wait_seconds = open_until - monotonic()
+                if wait_seconds <= 0 and host not in self._trial_hosts:
+                    self._trial_hosts.add(host)
+                    return
+            sleep(min(max(wait_seconds, 0.05), 1.0))
+
+    def record(self, url, success):
+        """
+        Method to record the outcome of a request, opening or closing the host's circuit.
+
+        :param str url: URL that was requested
+        :param bool success: Whether the request succeeded
+        """
+        host = get_host(url)
+        with self._lock:
+            trial = host in self._trial_hosts
+            self._trial_hosts.discard(host)
+            if success:
+                self._failures[host] = 0
+                self._open_until.pop(host, None)
+                return
+            self._failures[host] = self._failures.get(host, 0) + 1
+            if trial or (host not in self._open_until and self._failures[host] >= self.max_failures):
+                self._open_until[host] = monotonic() + self.reset_seconds
+                self.trip_count += 1
@@ -0,0 +1,215 @@
+import http.client
+import threading
+from collections import deque
+from urllib.parse import urljoin, urlsplit
+
+import mechanize
+
+
+class BoundedHistory(mechanize.History):
+    """
+    Browser history that only keeps the most recent `max_length` pages.
+
+    mechanize keeps every visited (request, response) pair by default, so a paginator that walks hundreds of results
+    pages holds every one of them in memory. Responses evicted from this history are closed.
+
+    :param int max_length: Maximum number of pages kept in the history
+    """
+
+    def __init__(self, max_length=1):
+        super().__init__()
+        self._history = deque(maxlen=max_length)
+
+    def add(self, request, response):
+        if self._history.maxlen == 0:
+            if response is not None:
+                response.close()
+            return
+        if len(self._history) == self._history.maxlen:
+            _, evicted_response = self._history[0]
+            if evicted_response is not None:
+                evicted_response.close()
+        self._history.append((request, response))
+
+    def clear(self):
+        self._history.clear()
+
+    def close(self):
+        for request, response in self._history:
+            if response is not None:
+                response.close()
+        self._history.clear()
+
+    def __copy__(self):
+        ans = self.__class__(self._history.maxlen)
+        ans._history.extend(self._history)
+        return ans
+
+
+class SessionPool:
+    """
+    Shared pool of keep-alive HTTP connections used to download results pages.
+
+    Creating a `mechanize.Browser` per runner pays for a new TCP connection on every request because mechanize always
+    sends `Connection: close`. The pool instead keeps up to `max_connections_per_host` idle connections open per host
+    and reuses them across requests and threads. Cookies are shared between the pool and any browser it creates.
+
+    Example::
+
+        session = SessionPool(max_connections_per_host=4)
+        html = session.fetch('http://results.scc-events.com/2016/?content=detail&idp=...')
+
+        br = session.browser()
+        br.open('http://results.scc-events.com/2016/')
+
+    :param int max_connections_per_host: Maximum number of idle connections kept open per host
+    :param int max_history: Number of pages kept in the history of browsers created by `browser`
+    :param float timeout: Socket timeout in seconds
+    :param PageCache cache: Optional cache of downloaded pages. In replay mode, pages are only read from the cache.
+    :param int max_redirects: Maximum number of redirects followed per request
+    """
+
+    def __init__(self, max_connections_per_host=4, max_history=1, timeout=60, cache=None, max_redirects=5):
+        self.max_connections_per_host = max_connections_per_host
+        self.max_history = max_history
+        self.timeout = timeout
+        self.cache = cache
+        self.max_redirects = max_redirects
+        self.cookiejar = mechanize.CookieJar()
+        self._idle_connections = {}
+        self._lock = threading.Lock()
+
+    def browser(self):
+        """
+        Method to create a `mechanize.Browser` that ignores robots.txt, shares the pool's cookies, and keeps a bounded
+        history. Used by the scrape_*_marathon_urls paginators to fill in search forms.
+
+        :return: Configured browser
+        :rtype: mechanize.Browser
+        """
+        br = mechanize.Browser(history=BoundedHistory(self.max_history))
+        br.set_handle_robots(False)
+        br.set_cookiejar(self.cookiejar)
+        return br
+
+    def _get_connection(self, scheme, host):
+        with self._lock:
+            idle = self._idle_connections.get((scheme, host))
+            if idle:
+                return idle.pop(), True
+        connection_class = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        return connection_class(host, timeout=self.timeout), False
+
+    def _release_connection(self, scheme, host, connection):
+        with self._lock:
+            idle = self._idle_connections.setdefault((scheme, host), [])
+            if len(idle) < self.max_connections_per_host:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def open(self, url):
+        """
+        Method to download a page over a pooled keep-alive connection, following redirects. If the pool has a cache,
+        cached pages are returned without being downloaded and downloaded pages are added to the cache.
+
+        Example::
+
+            resp = session.open(br.click())  # Submit the browser's selected form
+            br.set_response(resp)
+
+        :param url: URL of the page, or a request such as the form submission returned by `mechanize.Browser.click`
+        :type url: str or mechanize.Request
+        :return: Response with the page fully read into memory, usable with `mechanize.Browser.set_response`
+        :raises mechanize.HTTPError: If the server returns an HTTP error status
+        :raises mechanize.URLError: If the connection fails, or if the page isn't cached in replay mode
+        """
+        request = mechanize.Request(url) if isinstance(url, str) else url
+        url = request.get_full_url()
+        method = request.get_method()
+        data = request.data
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+
+        if self.cache is not None:
+            cache_key = self.cache.get_key(url, method, data)
+            cached_page = self.cache.get(cache_key)
+            if cached_page is not None:
+                cached_url, cached_headers, body = cached_page
+                return mechanize.make_response(body, cached_headers, cached_url, 200, 'OK')
+            if self.cache.replay:
+                raise mechanize.URLError('Page is not cached: ' + method + ' ' + url)
+
+        for _ in range(self.max_redirects + 1):
+            status, reason, headers, body = self._request(request, method, url, data)
+            if status not in (301, 302, 303, 307, 308) or not dict(headers).get('Location'):
+                break
+            # Follow the redirect. As browsers do, a redirected form submission is fetched with GET unless the status
+            # asks for the method to be kept.
+            url = urljoin(url, dict(headers)['Location'])
+            if status not in (307, 308):
+                method, data = 'GET', None
+            request = mechanize.Request(url, data=data, method=method)
+
+        response = mechanize.make_response(body, headers, url, status, reason)
+        if status >= 400:
+            raise mechanize.HTTPError(url, status, reason, response.info(), None)
+        if self.cache is not None and status == 200:
+            self.cache.put(cache_key, url, headers, body)
+        return response
+
+    def _request(self, request, method, url, data):
+        parts = urlsplit(url)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+
+        self.cookiejar.add_cookie_header(request)
+        request_headers = dict(request.header_items())
+        request_headers['Connection'] = 'keep-alive'
+
+        # A reused connection may have been closed by the server while idle, in which case it's retried once on a fresh
+        # connection.
+        while True:
+            connection, reused = self._get_connection(parts.scheme, parts.netloc)
+            try:
+                connection.request(method, path, body=data, headers=request_headers)
+                response = connection.getresponse()
+                body = response.read()
+                break
+            except (http.client.HTTPException, OSError) as e:
+                connection.close()
+                if not reused:
+                    raise mechanize.URLError(e)
+
+        if response.will_close:
+            connection.close()
+        else:
+            self._release_connection(parts.scheme, parts.netloc, connection)
+
+        headers = response.getheaders()
+        self.cookiejar.extract_cookies(mechanize.make_response(b'', headers, url, response.status, response.reason),
+                                       request)
+        return response.status, response.reason, headers, body
+
+    def fetch(self, url):
+        """
+        Method to download the body of a page over a pooled keep-alive connection.
+
+        :param str url: URL of the page
+        :return: Body of the page
+        :rtype: bytes
+        :raises mechanize.HTTPError: If the server returns an HTTP error status
+        :raises mechanize.URLError: If the connection fails
+        """
+        return self.open(url).read()
+
+    def close(self):
+        """
+        Method to close every idle connection in the pool.
+        """
+        with self._lock:
+            connections = [connection for idle in self._idle_connections.values() for connection in idle]
+            self._idle_connections.clear()
+        for connection in connections:
+            connection.close()
@@ -0,0 +1,128 @@
+import os
+import threading
+from urllib.parse import urlsplit, parse_qs
+
+from dashathon.scraping.output_methods import read_records
+from dashathon.scraping.queue_methods import DONE
+
+
+def get_runner_idp(url):
+    """
+    Method to return the identifier of a runner in the URL of their results page. Identifiers are unique across the
+    events and years of a results website.
+
+    Example::
+
+        get_runner_idp('http://results.scc-events.com/2016/?content=detail&idp=99999905C9AF460000404FFD&lang=EN')
+        # '99999905C9AF460000404FFD'
+
+    :param str url: URL of an individual runner's results
+    :return: Identifier of the runner, or None if the URL has none
+    :rtype: str
+    """
+    idps = parse_qs(urlsplit(url).query).get('idp')
+    return idps[0] if idps else None
+
+
+def _get_bib_key(race, year, bib):
+    # Runners without a bib can't be told apart by bib
+    if year is None or bib is None:
+        return None
+    year, bib = str(year).strip(), str(bib).strip()
+    if year in ['', 'nan', 'NaN'] or bib in ['', 'nan', 'NaN']:
+        return None
+    return race, year, bib
+
+
+class RunnerIndex:
+    """
+    Index of runners already scraped, keyed by (race, year, bib) and (race, idp).
+
+    Bibs are loaded from existing output files and idps from work queue journals, and both are added as runners are
+    scraped. `scrape_*_marathon` uses the index to skip runners whose idp is known without fetching their page, and to
+    drop runners whose (year, bib) is already in the output file, so regenerating path_input or topping up a year
+    never writes duplicate rows.
+
+    Example::
+
+        index = RunnerIndex()
+        index.load_output('chicago_marathon_2017_M.csv', race='chicago')
+        index.contains('chicago', year=2017, bib='54250')  # True if the runner was scraped
+    """
+
+    def __init__(self):
+        self._bibs = set()
+        self._idps = set()
+        self._lock = threading.Lock()
+
+    def add(self, race, year=None, bib=None, idp=None):
+        """
+        Method to add a scraped runner to the index.
+
+        :param str race: Race of the runner, e.g. 'chicago'
+        :param int year: Year of the race. Required with bib.
+        :param str bib: Bib number of the runner
+        :param str idp: Identifier of the runner in the URL of their results page
+        """
+        bib_key = _get_bib_key(race, year, bib)
+        with self._lock:
+            if bib_key is not None:
+                self._bibs.add(bib_key)
+            if idp is not None:
+                self._idps.add((race, idp))
+
+    def contains(self, race, year=None, bib=None, idp=None):
+        """
+        Method to check whether a runner was already scraped, by idp or by year and bib.
+
+        :param str race: Race of the runner, e.g. 'chicago'
+        :param int year: Year of the race
+        :param str bib: Bib number of the runner
+        :param str idp: Identifier of the runner in the URL of their results page
+        :return: True if either key is in the index
+        :rtype: bool
+        """
+        bib_key = _get_bib_key(race, year, bib)
+        with self._lock:
+            return (idp is not None and (race, idp) in self._idps) or (bib_key is not None and bib_key in self._bibs)
+
+    def load_output(self, path_output, race):
+        """
+        Method to add every runner of an output file of a scrape_*_marathon method. Files written by older versions,
+        e.g. with a space before the year, are read as well.
+
+        :param str path_output: Path of the output file
+        :param str race: Race of the file, e.g. 'chicago'
+        :return: Number of runners read
+        :rtype: int
+        """
+        if not os.path.isfile(path_output):
+            return 0
+        headers, rows = read_records(path_output)
+        if 'year' not in headers or 'bib' not in headers:
+            return 0
+        year_index, bib_index = headers.index('year'), headers.index('bib')
+        num_runners = 0
+        for row in rows:
+            if len(row) == len(headers):
+                self.add(race, year=row[year_index], bib=row[bib_index])
+                num_runners += 1
+        return num_runners
+
+    def load_journal(self, queue, race):
+        """
+        Method to add every runner completed in a work queue journal. Runners logged in an error file are not added.
+
+        :param WorkQueue queue: Open work queue journal
+        :param str race: Race of the journal, e.g. 'chicago'
+        :return: Number of runners read
+        :rtype: int
+        """
+        rows = queue.get_rows(status=DONE)
+        for row in rows:
+            self.add(race, idp=get_runner_idp(row.split('|')[0]))
+        return len(rows)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._bibs) + len(self._idps)
@@ -0,0 +1,232 @@
+import csv
+import glob
+import os
+import re
+import tempfile
+from math import isnan
+from time import monotonic
+
+# Scraped files are pipe-delimited. Fields containing a '|' or a quote are quoted, so every row keeps the same number of
+# fields.
+DELIMITER = '|'
+
+
+def _format_value(value):
+    if isinstance(value, float) and isnan(value):
+        return 'NaN'
+    if isinstance(value, str):
+        # Keep one row per line, so files can still be read line by line
+        return ' '.join(value.splitlines())
+    return value
+
+
+class RecordWriter:
+    """
+    Buffered writer of pipe-delimited rows to a scrape_*_marathon output file.
+
+    Rows are held in memory and written to disk in one batch every `flush_rows` rows or `flush_seconds` seconds,
+    whichever comes first, instead of opening and appending to the file for every runner. Each row can carry a token,
+    e.g. a work queue item id. Tokens are passed to `on_flush` once their rows are safely on disk, so work is only
+    logged as complete after it has been written.
+
+    Example::
+
+        writer = RecordWriter('chicago_marathon_2017_M.csv', headers=headers_chicago, flush_rows=100,
+                              on_flush=queue.complete)
+        writer.write(scrape_chicago_runner_details(url, gender='M', city='New York', state='NY'), token=item_id)
+        writer.close()
+
+    :param str path: Path of the output file. Rows are appended if it exists.
+    :param list[str] headers: Header row written when the file is created
+    :param int flush_rows: Maximum number of buffered rows
+    :param float flush_seconds: Maximum number of seconds a row is buffered, checked on each `write` or
+                                `flush_if_due` call
+    :param on_flush: Function called with the list of tokens of the rows written by each flush
+    """
+
+    def __init__(self, path, headers=None, flush_rows=100, flush_seconds=5.0, on_flush=None):
+        self.path = path
+        self.headers = headers
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.on_flush = on_flush
+        self.rows_written = 0
+        self._rows = []
+        self._tokens = []
+        self._last_flush = monotonic()
+
+        if not os.path.isfile(path):
+            with open(path, 'w', encoding='utf-8', newline='') as f:
+                if headers is not None:
+                    csv.writer(f, delimiter=DELIMITER, lineterminator='\n').writerow(headers)
+
+    def write(self, row, token=None):
+        """
+        Method to buffer one row, flushing the buffer if it is full or old enough.
+
+        :param row: Sequence of values, e.g. a record returned by a scrape_*_runner_details method. NaN values are
+                    written as 'NaN'.
+        :param token: Value passed to `on_flush` once the row has been written. If None, nothing is passed.
+        """
+        self._rows.append([_format_value(value) for value in row])
+        if token is not None:
+            self._tokens.append(token)
+        if len(self._rows) >= self.flush_rows:
+            self.flush()
+        else:
+            self.flush_if_due()
+
+    def flush_if_due(self):
+        """
+        Method to flush the buffer if its oldest row has been held for at least `flush_seconds`.
+        """
+        if self._rows and monotonic() - self._last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        """
+        Method to write every buffered row to the output file, then pass their tokens to `on_flush`.
+        """
+        if self._rows:
+            with open(self.path, 'a', encoding='utf-8', newline='') as f:
+                csv.writer(f, delimiter=DELIMITER, lineterminator='\n').writerows(self._rows)
+            self.rows_written += len(self._rows)
+            self._rows = []
+        tokens, self._tokens = self._tokens, []
+        if tokens and self.on_flush is not None:
+            self.on_flush(tokens)
+        self._last_flush = monotonic()
+
+    def truncate(self):
+        """
+        Method to flush any buffered rows, then empty the file down to its header row, e.g. once an error log has been
+        read back for retrying.
+        """
+        self.flush()
+        with open(self.path, 'w', encoding='utf-8', newline='') as f:
+            if self.headers is not None:
+                csv.writer(f, delimiter=DELIMITER, lineterminator='\n').writerow(self.headers)
+
+    def close(self):
+        """
+        Method to flush any buffered rows.
+        """
+        self.flush()
+
+
+def split_record(line, num_fields=None):
+    """
+    Method to split one line of a pipe-delimited file into its values.
+
+    Lines written by `RecordWriter` may contain quoted values. Older scraped files were written without any escaping,
+    so a stray quote in a value (e.g. '"COAHUILA') is read literally, as it was written.
+
+    Example::
+
+        split_record('2017|New York|"Pipe|Town"|NY', num_fields=4)  # ['2017', 'New York', 'Pipe|Town', 'NY']
+
+    :param str line: Line of the file, without its line ending
+    :param int num_fields: Expected number of values. If None, quoted values are always unquoted.
+    :return: Values of the line
+    :rtype: list[str]
+    """
+    row = line.split(DELIMITER)
+    if '"' not in line:
+        return row
+    quoted_row = next(csv.reader([line], delimiter=DELIMITER))
+    if num_fields is None or len(quoted_row) == num_fields:
+        return quoted_row
+    return row
+
+
+def read_records(path):
+    """
+    Method to read the rows of a pipe-delimited file written by `RecordWriter`, or by older versions of the scrapers.
+
+    Example::
+
+        headers, rows = read_records('chicago_marathon_2017_M.csv')
+
+    :param str path: Path of the file
+    :return: Header row and list of data rows, as strings. Blank lines are skipped.
+    :rtype: (list[str], list[list[str]])
+    """
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        lines = [line.rstrip('\r\n') for line in f]
+    lines = [line for line in lines if line]
+    if not lines:
+        return [], []
+    headers = split_record(lines[0])
+    return headers, [split_record(line, num_fields=len(headers)) for line in lines[1:]]
+
+
+def get_worker_path(path, worker_id):
+    """
+    Method to return the path of the file written by one worker in place of `path`, when several workers share a work
+    queue.
+
+    Example::
+
+        get_worker_path('chicago_marathon_2017_M.csv', 'scraper-2:4242')
+        # 'chicago_marathon_2017_M.worker-scraper-2_4242.csv'
+
+    :param str path: Path of the file shared by the workers, e.g. the output file of a scrape_*_marathon method
+    :param str worker_id: Name of the worker
+    :return: Path of the worker's file
+    :rtype: str
+    """
+    stem, extension = os.path.splitext(path)
+    return stem + '.worker-' + re.sub(r'[^\w.-]', '_', worker_id) + extension
+
+
+def get_worker_paths(path):
+    """
+    Method to find the files written by every worker in place of `path`.
+
+    :param str path: Path of the file shared by the workers
+    :return: Paths of the workers' files, sorted
+    :rtype: list[str]
+    """
+    stem, extension = os.path.splitext(path)
+    return sorted(glob.glob(glob.escape(stem) + '.worker-*' + glob.escape(extension)))
+
+
+def merge_worker_outputs(path, headers=None):
+    """
+    Method to merge the output files of every worker sharing a work queue into one file. The rows already in `path`
+    come first, followed by the rows of each worker's file. A runner scraped by two workers, e.g. after a lease expired
+    while its first worker was still scraping it, is only kept once, by (year, bib). Workers' files are kept, so
+    merging again as workers write more rows gives the same file.
+
+    Example::
+
+        merge_worker_outputs('chicago_marathon_2017_M.csv')
+
+    :param str path: Path of the merged file
+    :param list[str] headers: Header row of the merged file. Defaults to the header row of the first file read.
+    :return: Number of rows in the merged file
+    :rtype: int
+    """
+    merged_rows = []
+    seen_keys = set()
+    for path_input in ([path] if os.path.isfile(path) else []) + get_worker_paths(path):
+        file_headers, rows = read_records(path_input)
+        headers = headers or file_headers
+        key_indexes = [file_headers.index(header) for header in ['year', 'bib'] if header in file_headers]
+        for row in rows:
+            if len(row) != len(file_headers):
+                continue
+            key = tuple(row[i].strip() for i in key_indexes) if len(key_indexes) == 2 else tuple(row)
+            if key not in seen_keys:
+                seen_keys.add(key)
+                merged_rows.append(row)
+
+    # Replace the merged file at once, so it can be read, or merged by another worker, at any time
+    handle, path_temp = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(os.path.abspath(path)))
+    with open(handle, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, delimiter=DELIMITER, lineterminator='\n')
+        if headers:
+            writer.writerow(headers)
+        writer.writerows(merged_rows)
+    os.replace(path_temp, path)
+    return len(merged_rows)
@@ -0,0 +1,398 @@
+import re
+import threading
+from collections import Counter
+from html import unescape
+
+import lxml.html
+from lxml import etree
+
+from dashathon.scraping.record_methods import convert_time_to_seconds
+
+# Classes of the cells holding a runner's info on a detail page, e.g. <td class="f-age_class">
+INFO_FIELDS = ['__fullname', 'age_class', 'start_no', 'start_no_text', 'event_name', 'event_date', 'place_all',
+               'place_age', 'place_nosex']
+
+# Row classes of the Chicago Marathon split table, in the order of record_methods.SPLITS
+CHICAGO_SPLIT_CLASSES = ['05', '10', '15', '20', '52', '25', '30', '35', '40', 'finish_netto']
+
+
+def _has_class(css_class):
+    # XPath equivalent of the CSS selector '.css_class', i.e. matching one of the space-separated classes exactly
+    return "contains(concat(' ', normalize-space(@class), ' '), ' " + css_class + " ')"
+
+
+# Selectors are compiled once at import, rather than on every page.
+_INFO_CELLS = {field: etree.XPath('//td[' + _has_class('f-' + field) + '][1]') for field in INFO_FIELDS}
+_LIST_TABLES = etree.XPath('//table[' + _has_class('list-table') + ']')
+_TABLE_ROWS = etree.XPath('.//tr')
+_ROW_HEADER_CELLS = etree.XPath('./th | ./td')
+_ROW_NAMES = etree.XPath('.//th[1]')
+_ROW_CELLS = etree.XPath('.//td')
+_CHICAGO_SPLIT_HEADERS = etree.XPath('//thead//th')
+_CHICAGO_SPLIT_ROWS = [etree.XPath('//tr[' + _has_class('f-time_' + split_class) + ']')
+                       for split_class in CHICAGO_SPLIT_CLASSES]
+
+
+# Tags of the tables holding a runner's info and split times, which are the only tokens read by `scan_page`
+_TABLE_TOKENS = re.compile(r'<(/?)(table|thead|tr|th|td)(?=[\s>])([^>]*)>', re.IGNORECASE)
+_CLASS_ATTRIBUTE = re.compile(r'\bclass\s*=\s*(?:"([^"]*)"|\'([^\']*)\')', re.IGNORECASE)
+
+# Number of pages parsed by the fast path ('hits') and by the tree parser after a layout mismatch ('misses'), in this
+# process, and whether the last page parsed by each thread was a hit
+_fast_path_counts = Counter()
+_fast_path_lock = threading.Lock()
+_last_parse = threading.local()
+
+
+class LayoutMismatch(Exception):
+    """
+    Raised when a page scanned by `scan_page` doesn't have the simple layout the fast path can read, e.g. a cell holding
+    markup, or lacks a cell or row the selectors of this module look for. `parse_page` then reads the page from its
+    tree, which raises the error of the tree parser if the page really lacks it.
+    """
+    pass
+
+
+class ScannedTable:
+    """
+    Rows of a table found by `scan_page`. Each row is a list of (tag, text) cells, where text is None for cells holding
+    markup.
+    """
+
+    def __init__(self):
+        self.rows = []
+
+
+class ScannedPage:
+    """
+    Info cells and tables of a runner's results page found by `scan_page`, read by the same methods as the root of a
+    tree returned by `parse_html`.
+    """
+
+    def __init__(self):
+        self.info = {}
+        self.list_tables = []
+        self.rows = []
+        self.thead_headers = []
+
+
+def _get_classes(attributes):
+    match = _CLASS_ATTRIBUTE.search(attributes)
+    if match is None:
+        return []
+    return (match.group(1) if match.group(1) is not None else match.group(2)).split()
+
+
+def _get_text(text):
+    # Cells holding markup are only read by the tree parser
+    if text is None:
+        raise LayoutMismatch('Cell holds markup')
+    return text
+
+
+def _decode(html):
+    if isinstance(html, bytes):
+        # Results pages are served as UTF-8. Other encodings are left for lxml to detect.
+        try:
+            html = html.decode('utf-8')
+        except UnicodeDecodeError:
+            pass
+    return html
+
+
+def scan_page(html):
+    """
+    Method to find the info cells and tables of a runner's results page without building a tree.
+
+    A single pass of a tokenizer over the page only stops at table, row, and cell tags, and the text of each cell is
+    read up to its closing tag. Every other element is skipped over by the regular expression engine without being
+    parsed. Pages with nested tables are not scanned, and cells holding markup are only flagged, so reading them
+    raises `LayoutMismatch`, as does looking for a cell or row the page lacks.
+
+    Example::
+
+        page = scan_page(fetch_runner_page(url))
+        get_info(page, 'age_class')
+
+    :param bytes html: Raw HTML of a results page
+    :return: Cells of the page, or None if the page can't be scanned
+    :rtype: ScannedPage
+    """
+    html = _decode(html)
+    if isinstance(html, bytes):
+        return None
+    page = ScannedPage()
+    table = None
+    row = None
+    table_depth = 0
+    in_thead = False
+    for match in _TABLE_TOKENS.finditer(html):
+        closing, tag, attributes = match.group(1), match.group(2).lower(), match.group(3)
+        if tag == 'table':
+            table_depth += -1 if closing else 1
+            if table_depth > 1:
+                return None
+            table = None
+            if not closing and 'list-table' in _get_classes(attributes):
+                table = ScannedTable()
+                page.list_tables.append(table)
+        elif tag == 'thead':
+            in_thead = not closing
+        elif tag == 'tr':
+            row = None
+            if not closing:
+                row = (_get_classes(attributes), [])
+                page.rows.append(row)
+                if table is not None:
+                    table.rows.append(row)
+        elif not closing:
+            if row is None:
+                return None
+            end = html.find('<', match.end())
+            text = None
+            if end >= 0 and html[end:end + len(tag) + 2].lower() == '</' + tag:
+                text = html[match.end():end]
+                if '&' in text:
+                    text = unescape(text)
+            row[1].append((tag, text))
+            if tag == 'th' and in_thead:
+                page.thead_headers.append(text)
+            elif tag == 'td':
+                for css_class in _get_classes(attributes):
+                    if css_class.startswith('f-'):
+                        page.info.setdefault(css_class[2:], text)
+    return page
+
+
+def parse_page(html, parse_root):
+    """
+    Method to parse a runner's results page with `parse_root`, reading the page found by `scan_page` when it has the
+    expected layout, and the tree returned by `parse_html` otherwise. Both give the same records, but scanning skips
+    the cost of building the tree. The number of pages read each way is counted by `get_fast_path_counts`.
+
+    Only `LayoutMismatch` sends a scanned page to the tree parser. Any other error raised by `parse_root` is raised
+    as is, so bugs of the fast path aren't hidden by the slow path.
+
+    Example::
+
+        parse_page(html, lambda root: get_info(root, 'age_class'))
+
+    :param bytes html: Raw HTML of a results page
+    :param parse_root: Function reading a record from the root of a page with the methods of this module
+    :return: Value returned by parse_root
+    """
+    page = scan_page(html)
+    if page is not None:
+        try:
+            result = parse_root(page)
+        except LayoutMismatch:
+            pass
+        else:
+            _record_fast_path(True)
+            return result
+    _record_fast_path(False)
+    return parse_root(parse_html(html))
+
+
+def _record_fast_path(hit):
+    _last_parse.hit = hit
+    with _fast_path_lock:
+        _fast_path_counts['hits' if hit else 'misses'] += 1
+
+
+def get_fast_path_counts():
+    """
+    Method to return the number of pages read by `parse_page` without building a tree ('hits') and with the tree
+    parser ('misses'), in this process.
+
+    :return: Counts of hits and misses
+    :rtype: collections.Counter
+    """
+    with _fast_path_lock:
+        return Counter(_fast_path_counts)
+
+
+def was_fast_path_hit():
+    """
+    Method to return whether the last page read by `parse_page` in the current thread was read without building a tree.
+
+    :return: True for a hit, False for a miss, or None if the thread has not read a page
+    :rtype: bool
+    """
+    return getattr(_last_parse, 'hit', None)
+
+
+def parse_html(html):
+    """
+    Method to parse a downloaded results page into an lxml tree. The page is parsed by libxml2, so only the elements
+    later selected by this module's methods (the info cells and split table) are turned into Python objects.
+
+    Example::
+
+        root = parse_html(fetch_runner_page(url))
+
+    :param bytes html: Raw HTML of a results page
+    :return: Root element of the page
+    :rtype: lxml.html.HtmlElement
+    """
+    return lxml.html.document_fromstring(_decode(html))
+
+
+def get_cell_text(element):
+    """
+    Method to return the text of an element and its descendants, as in BeautifulSoup's `Tag.text`.
+
+    :param lxml.html.HtmlElement element: Element of a parsed page
+    :return: Text of the element
+    :rtype: str
+    """
+    return element.text_content()
+
+
+def get_info(root, field):
+    """
+    Method to return the text of the first info cell of a given field on a runner's results page.
+
+    Example::
+
+        get_info(root, 'age_class')  # Text of <td class="f-age_class">
+
+    :param root: Root element returned by `parse_html`, or page returned by `scan_page`
+    :type root: lxml.html.HtmlElement or ScannedPage
+    :param str field: One of `INFO_FIELDS`
+    :return: Text of the cell
+    :rtype: str
+    :raises IndexError: If the parsed page has no such cell
+    :raises LayoutMismatch: If the scanned page has no such cell
+    """
+    if isinstance(root, ScannedPage):
+        if field not in root.info:
+            raise LayoutMismatch('No info cell: ' + field)
+        return _get_text(root.info[field])
+    return get_cell_text(_INFO_CELLS[field](root)[0])
+
+
+def get_list_tables(root):
+    """
+    Method to return the tables of class 'list-table' on a London or Berlin Marathon results page, which hold the
+    runner's info and split times.
+
+    :param root: Root element returned by `parse_html`, or page returned by `scan_page`
+    :type root: lxml.html.HtmlElement or ScannedPage
+    :return: Tables in page order
+    :rtype: list[lxml.html.HtmlElement] or list[ScannedTable]
+    """
+    if isinstance(root, ScannedPage):
+        return root.list_tables
+    return _LIST_TABLES(root)
+
+
+def get_table_split_times(splits_table, time_headers):
+    """
+    Method to read the split times out of the splits table of a London or Berlin Marathon results page.
+
+    Example::
+
+        get_table_split_times(get_list_tables(root)[3], time_headers=['time'])  # {'5k': 948.0, ...}
+
+    :param splits_table: Table whose first row holds the column headers and whose other rows each hold one split
+    :type splits_table: lxml.html.HtmlElement or ScannedTable
+    :param list[str] time_headers: Lowercase headers that may label the column of split times, in order of preference
+    :return: Mapping of lowercase split labels to split times in seconds. The first time is kept for repeated labels.
+    :rtype: dict
+    """
+    if isinstance(splits_table, ScannedTable):
+        return _get_scanned_table_split_times(splits_table, time_headers)
+    split_rows = _TABLE_ROWS(splits_table)
+    headers = [get_cell_text(header_cell).lower() for header_cell in _ROW_HEADER_CELLS(split_rows[0])]
+    time_header = next((header for header in time_headers if header in headers), None)
+    if time_header is None:
+        return {}
+    time_index = headers.index(time_header)
+
+    split_times = {}
+    for split_row in split_rows:
+        split_row_name = get_cell_text(_ROW_NAMES(split_row)[0])
+        # First element of split_row contains metadata that we don't want to scrap.
+        if split_row_name == 'Split':
+            continue
+        cols = [split_row_name] + [get_cell_text(cell).strip() for cell in _ROW_CELLS(split_row)]
+        time_string = cols[time_index] if time_index < len(cols) else ''
+        split_times.setdefault(split_row_name.lower(), convert_time_to_seconds(time_string))
+
+    return split_times
+
+
+def _get_scanned_table_split_times(splits_table, time_headers):
+    # Same as get_table_split_times, over the rows of a scanned table
+    if not splits_table.rows:
+        raise LayoutMismatch('Table has no rows')
+    headers = [_get_text(text).lower() for _, text in splits_table.rows[0][1]]
+    time_header = next((header for header in time_headers if header in headers), None)
+    if time_header is None:
+        return {}
+    time_index = headers.index(time_header)
+
+    split_times = {}
+    for _, cells in splits_table.rows:
+        row_names = [text for tag, text in cells if tag == 'th']
+        if not row_names:
+            raise LayoutMismatch('Split row has no header cell')
+        split_row_name = _get_text(row_names[0])
+        if split_row_name == 'Split':
+            continue
+        cols = [split_row_name] + [_get_text(text).strip() for tag, text in cells if tag == 'td']
+        time_string = cols[time_index] if time_index < len(cols) else ''
+        split_times.setdefault(split_row_name.lower(), convert_time_to_seconds(time_string))
+
+    return split_times
+
+
+def get_chicago_split_times(root):
+    """
+    Method to read the split times out of the splits table of a Chicago Marathon results page.
+
+    Example::
+
+        get_chicago_split_times(root)  # {'05k': 6160.0, ...}
+
+    :param root: Root element returned by `parse_html`, or page returned by `scan_page`
+    :type root: lxml.html.HtmlElement or ScannedPage
+    :return: Mapping of lowercase split labels to split times in seconds. The first time is kept for repeated labels.
+    :rtype: dict
+    """
+    if isinstance(root, ScannedPage):
+        return _get_scanned_chicago_split_times(root)
+    headers = [get_cell_text(header_cell).strip().lower() for header_cell in _CHICAGO_SPLIT_HEADERS(root)]
+
+    split_times = {}
+    for split_rows in _CHICAGO_SPLIT_ROWS:
+        splits_row = split_rows(root)
+
+        # Expecting the 'Finish' split time to share CSS tag with 'Finish Time',
+        # which excludes other info. In this case, only keep the former data.
+        split_row = splits_row[1] if len(splits_row) > 1 else splits_row[0]
+
+        cols = dict(zip(headers, [get_cell_text(cell).strip() for cell in _ROW_HEADER_CELLS(split_row)]))
+        split_times.setdefault(cols['split'].lower(), convert_time_to_seconds(cols['time']))
+
+    return split_times
+
+
+def _get_scanned_chicago_split_times(page):
+    # Same as get_chicago_split_times, over the rows of a scanned page
+    headers = [_get_text(text).strip().lower() for text in page.thead_headers]
+
+    split_times = {}
+    for split_class in CHICAGO_SPLIT_CLASSES:
+        splits_row = [cells for classes, cells in page.rows if 'f-time_' + split_class in classes]
+        if not splits_row:
+            raise LayoutMismatch('No split row: f-time_' + split_class)
+        split_row = splits_row[1] if len(splits_row) > 1 else splits_row[0]
+
+        cols = dict(zip(headers, [_get_text(text).strip() for _, text in split_row]))
+        if 'split' not in cols or 'time' not in cols:
+            raise LayoutMismatch('Split row has no split or time cell')
+        split_times.setdefault(cols['split'].lower(), convert_time_to_seconds(cols['time']))
+
+    return split_times
@@ -0,0 +1,401 @@
+import os
+import socket
+import sqlite3
+import threading
+from time import time
+
+PENDING = 0
+CLAIMED = 1
+DONE = 2
+FAILED = 3
+
+# Seconds a worker sharing a queue holds its claimed items before other workers can claim them, unless it renews them
+DEFAULT_LEASE_SECONDS = 300.0
+
+
+def get_worker_id():
+    """
+    Method to return a name for the current process that is unique across the hosts sharing a work queue.
+
+    Example::
+
+        get_worker_id()  # 'scraper-2:4242'
+
+    :return: Host name and process id
+    :rtype: str
+    """
+    return socket.gethostname() + ':' + str(os.getpid())
+
+
+def compact_url(url, template):
+    """
+    Method to shorten a URL to the query values that differ from a template URL with the same address and the same
+    query keys in the same order. Runner URLs of a job only differ by a few values (idp, event, and start_no), so
+    their tokens are about a tenth of their length.
+
+    Example::
+
+        compact_url('http://results.scc-events.com/2016/?content=detail&idp=99999905C9AF460000404FFD&lang=EN',
+                    'http://results.scc-events.com/2016/?content=detail&idp=99999905C9AF460000404E70&lang=EN')
+        # '?1=99999905C9AF460000404FFD'
+
+    :param str url: URL to shorten
+    :param str template: URL of the job the token is relative to
+    :return: Token starting with '?', or the URL itself if it does not fit the template
+    :rtype: str
+    """
+    if template is None or '?' not in url:
+        return url
+    address, query = url.split('?', 1)
+    template_address, template_query = template.split('?', 1)
+    pairs, template_pairs = query.split('&'), template_query.split('&')
+    if address != template_address or len(pairs) != len(template_pairs):
+        return url
+    changes = []
+    for i, (pair, template_pair) in enumerate(zip(pairs, template_pairs)):
+        if pair.split('=', 1)[0] != template_pair.split('=', 1)[0] or '=' not in pair:
+            return url
+        if pair != template_pair:
+            changes.append(str(i) + '=' + pair.split('=', 1)[1])
+    return '?' + '&'.join(changes)
+
+
+def expand_url(token, template):
+    """
+    Method to rebuild a URL shortened by `compact_url`.
+
+    :param str token: Token returned by `compact_url`
+    :param str template: URL of the job the token is relative to
+    :return: Original URL. Values that are not tokens are returned as is.
+    :rtype: str
+    """
+    if template is None or not token.startswith('?'):
+        return token
+    address, template_query = template.split('?', 1)
+    pairs = template_query.split('&')
+    for change in token[1:].split('&') if len(token) > 1 else []:
+        i, value = change.split('=', 1)
+        pairs[int(i)] = pairs[int(i)].split('=', 1)[0] + '=' + value
+    return address + '?' + '&'.join(pairs)
+
+
+class WorkQueue:
+    """
+    Crash-safe queue of runners left to scrape, stored in an SQLite database.
+
+    Each item is one row of a scrape_*_marathon input file. Claiming and completing an item only touches that item's
+    record via an index, so the cost per runner no longer grows with the size of the queue, unlike re-reading and
+    truncating the tail of the input file. Completed items stay in the database as a journal of the run.
+
+    Items claimed by a run that crashed before completing them are returned to the queue when it is reopened. Items
+    that failed can be returned to the queue with a delay by `retry`, and are only claimed again once it has passed.
+
+    With `shared`, several processes, on one host or on several hosts with the database on a shared disk, claim items
+    from the same queue. The database then uses a rollback journal, so every transaction is serialized by a lock on the
+    database file, as SQLite's write-ahead log only works between processes of one host. Items are claimed under a
+    lease of `lease_seconds` held by `worker_id`. Leases are extended by `renew_leases`, and items whose lease has
+    expired, e.g. because their worker crashed, are claimed again by other workers. Reopening a shared queue only
+    releases the items claimed by the same worker id.
+
+    The runner URL at the start of each row is stored as a token relative to the first URL put in the queue, which is
+    kept once as the queue's URL template (see `compact_url`). Rows are returned with their full URL.
+
+    Example::
+
+        queue = WorkQueue('chicago_marathon_2017_M_urls.sqlite')
+        queue.import_csv('chicago_marathon_2017_M_urls.csv')
+        for item_id, row in queue.claim(4):
+            ...
+            queue.complete([item_id])
+        queue.close()
+
+    :param str path: Path of the SQLite database. It is created if it does not exist.
+    :param bool shared: Whether other processes claim items from the queue at the same time
+    :param str worker_id: Name of the worker holding the leases of the items it claims. Defaults to `get_worker_id()`.
+    :param float lease_seconds: Seconds an item claimed from a shared queue is held before other workers can claim it.
+                                Defaults to `DEFAULT_LEASE_SECONDS` for a shared queue. Items claimed from a queue that
+                                isn't shared are held until they are released.
+    """
+
+    def __init__(self, path, shared=False, worker_id=None, lease_seconds=None):
+        self.path = path
+        self.shared = shared
+        self.worker_id = worker_id or get_worker_id()
+        self.lease_seconds = lease_seconds if lease_seconds is not None or not shared else DEFAULT_LEASE_SECONDS
+        self._last_renewal = time()
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=' + ('DELETE' if shared else 'WAL'))
+        self._connection.execute('PRAGMA synchronous=' + ('FULL' if shared else 'NORMAL'))
+        self._connection.execute('BEGIN IMMEDIATE')
+        self._connection.execute('CREATE TABLE IF NOT EXISTS work_items (id INTEGER PRIMARY KEY, row TEXT NOT NULL, '
+                                 'status INTEGER NOT NULL DEFAULT 0, attempts INTEGER NOT NULL DEFAULT 0, '
+                                 'not_before REAL NOT NULL DEFAULT 0, lease_owner TEXT, '
+                                 'lease_expires REAL NOT NULL DEFAULT 0)')
+        columns = [column[1] for column in self._connection.execute('PRAGMA table_info(work_items)')]
+        if 'attempts' not in columns:
+            # Journals created before retries were scheduled
+            self._connection.execute('ALTER TABLE work_items ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0')
+            self._connection.execute('ALTER TABLE work_items ADD COLUMN not_before REAL NOT NULL DEFAULT 0')
+        if 'lease_owner' not in columns:
+            # Journals created before claims were leased
+            self._connection.execute('ALTER TABLE work_items ADD COLUMN lease_owner TEXT')
+            self._connection.execute('ALTER TABLE work_items ADD COLUMN lease_expires REAL NOT NULL DEFAULT 0')
+        self._connection.execute('CREATE INDEX IF NOT EXISTS work_items_status ON work_items (status, id)')
+        self._connection.execute('CREATE INDEX IF NOT EXISTS work_items_row ON work_items (row)')
+        self._connection.execute('CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, value TEXT)')
+        self._connection.execute('COMMIT')
+        self._url_template = self.get_metadata('url_template')
+        self.release_claimed()
+
+    def _compact_row(self, row):
+        url, sep, rest = row.partition('|')
+        if self._url_template is None and '?' in url:
+            # Another worker sharing the queue may have stored a template first
+            self._connection.execute('INSERT OR IGNORE INTO metadata (key, value) VALUES (?, ?)', ('url_template', url))
+            self._url_template = self._connection.execute('SELECT value FROM metadata WHERE key = ?',
+                                                          ('url_template',)).fetchone()[0]
+        return compact_url(url, self._url_template) + sep + rest
+
+    def _expand_row(self, row):
+        url, sep, rest = row.partition('|')
+        return expand_url(url, self._url_template) + sep + rest
+
+    def put(self, rows, unique=False):
+        """
+        Method to append rows to the queue.
+
+        :param list[str] rows: Rows of a scrape_*_marathon input file, without line endings
+        :param bool unique: If True, rows already in the queue (whatever their status) are skipped. This allows the
+                            same rows to be put again when a run that was discovering them is restarted.
+        :return: Number of rows appended
+        :rtype: int
+        """
+        with self._lock:
+            self._connection.execute('BEGIN IMMEDIATE')
+            compact_rows = [self._compact_row(row) for row in rows]
+            count_before = self._connection.execute('SELECT COUNT(*) FROM work_items').fetchone()[0]
+            if unique:
+                # Journals created before URLs were compacted hold full rows
+                self._connection.executemany('INSERT INTO work_items (row) SELECT ? WHERE NOT EXISTS '
+                                             '(SELECT 1 FROM work_items WHERE row IN (?, ?))',
+                                             [(compact_row, compact_row, row) for compact_row, row in
+                                              zip(compact_rows, rows)])
+            else:
+                self._connection.executemany('INSERT INTO work_items (row) VALUES (?)',
+                                             [(compact_row,) for compact_row in compact_rows])
+            count_after = self._connection.execute('SELECT COUNT(*) FROM work_items').fetchone()[0]
+            self._connection.execute('COMMIT')
+        return count_after - count_before
+
+    def import_csv(self, path_input, unique=False):
+        """
+        Method to append every populated line of an existing scrape_*_marathon input file (e.g. a *_urls.csv file) to
+        the queue.
+
+        :param str path_input: Path of the input file
+        :param bool unique: If True, rows already in the queue are skipped, e.g. when topping up from a regenerated file
+        :return: Number of rows imported
+        :rtype: int
+        """
+        with open(path_input, 'r', errors='ignore', encoding='utf-8') as f:
+            rows = [line.strip() for line in f if line.strip()]
+        # Input files were consumed from the end, so keep that order when claiming.
+        return self.put(rows[::-1], unique=unique)
+
+    def claim(self, num_items=1):
+        """
+        Method to claim up to `num_items` pending items, skipping items whose retry is not due yet. Claimed items are
+        not handed out again unless they are released, e.g. after a crash, or their lease expires.
+
+        :param int num_items: Maximum number of items to claim
+        :return: List of (item_id, row) tuples
+        :rtype: list[(int, str)]
+        """
+        now = time()
+        lease_expires = now + self.lease_seconds if self.lease_seconds is not None else 0
+        with self._lock:
+            self._connection.execute('BEGIN IMMEDIATE')
+            items = self._connection.execute('SELECT id, row FROM work_items WHERE status = ? AND not_before <= ? '
+                                             'ORDER BY id LIMIT ?', (PENDING, now, num_items)).fetchall()
+            if len(items) < num_items:
+                # Items whose worker let their lease expire, e.g. by crashing
+                items += self._connection.execute('SELECT id, row FROM work_items WHERE status = ? AND '
+                                                  'lease_expires > 0 AND lease_expires <= ? ORDER BY id LIMIT ?',
+                                                  (CLAIMED, now, num_items - len(items))).fetchall()
+            self._connection.executemany('UPDATE work_items SET status = ?, lease_owner = ?, lease_expires = ? '
+                                         'WHERE id = ?', [(CLAIMED, self.worker_id, lease_expires, item_id)
+                                                          for item_id, _ in items])
+            self._connection.execute('COMMIT')
+            self._last_renewal = now
+        return [(item_id, self._expand_row(row)) for item_id, row in items]
+
+    def renew_leases(self):
+        """
+        Method to extend the lease of every item claimed by this worker and not completed yet.
+
+        :return: Number of items whose lease was extended
+        :rtype: int
+        """
+        if self.lease_seconds is None:
+            return 0
+        now = time()
+        with self._lock:
+            self._last_renewal = now
+            return self._connection.execute('UPDATE work_items SET lease_expires = ? WHERE status = ? AND '
+                                            'lease_owner = ?', (now + self.lease_seconds, CLAIMED,
+                                                                self.worker_id)).rowcount
+
+    def renew_leases_if_due(self):
+        """
+        Method to extend the leases of this worker's items once a third of the lease has passed since they were
+        claimed or last renewed, so they never expire while the worker is alive.
+        """
+        if self.lease_seconds is not None and time() - self._last_renewal >= self.lease_seconds / 3:
+            self.renew_leases()
+
+    def complete(self, item_ids):
+        """
+        Method to log claimed items as completed.
+
+        :param list[int] item_ids: Identifiers returned by `claim`
+        """
+        with self._lock:
+            self._connection.execute('BEGIN IMMEDIATE')
+            self._connection.executemany('UPDATE work_items SET status = ? WHERE id = ?',
+                                         [(DONE, item_id) for item_id in item_ids])
+            self._connection.execute('COMMIT')
+
+    def retry(self, item_id, delay=0.0):
+        """
+        Method to return a claimed item to the queue after a failed attempt.
+
+        :param int item_id: Identifier returned by `claim`
+        :param float delay: Seconds before the item can be claimed again
+        """
+        with self._lock:
+            self._connection.execute('UPDATE work_items SET status = ?, attempts = attempts + 1, not_before = ? '
+                                     'WHERE id = ?', (PENDING, time() + delay, item_id))
+
+    def get_attempts(self, item_id):
+        """
+        Method to return the number of times an item has been retried.
+
+        :param int item_id: Identifier returned by `claim`
+        :return: Number of calls to `retry` for the item
+        :rtype: int
+        """
+        with self._lock:
+            return self._connection.execute('SELECT attempts FROM work_items WHERE id = ?', (item_id,)).fetchone()[0]
+
+    def get_retry_seconds(self):
+        """
+        Method to return how long until the next delayed item can be claimed.
+
+        :return: Seconds until the earliest delayed pending item is due, or None if no pending item is delayed
+        :rtype: float
+        """
+        now = time()
+        with self._lock:
+            not_before = self._connection.execute('SELECT MIN(not_before) FROM work_items WHERE status = ? AND '
+                                                  'not_before > ?', (PENDING, now)).fetchone()[0]
+        return None if not_before is None else not_before - now
+
+    def fail(self, item_ids):
+        """
+        Method to log claimed items as given up on, e.g. once they are written to an error log.
+
+        :param list[int] item_ids: Identifiers returned by `claim`
+        """
+        with self._lock:
+            self._connection.execute('BEGIN IMMEDIATE')
+            self._connection.executemany('UPDATE work_items SET status = ? WHERE id = ?',
+                                         [(FAILED, item_id) for item_id in item_ids])
+            self._connection.execute('COMMIT')
+
+    def release_claimed(self):
+        """
+        Method to return every claimed but uncompleted item to the queue. Only the items claimed by this worker are
+        returned from a shared queue.
+        """
+        with self._lock:
+            if self.shared:
+                self._connection.execute('UPDATE work_items SET status = ?, lease_expires = 0 WHERE status = ? AND '
+                                         'lease_owner = ?', (PENDING, CLAIMED, self.worker_id))
+            else:
+                self._connection.execute('UPDATE work_items SET status = ?, lease_expires = 0 WHERE status = ?',
+                                         (PENDING, CLAIMED))
+
+    def get_lease_seconds(self):
+        """
+        Method to return how long until the next lease held by another worker expires.
+
+        :return: Seconds until the earliest lease of a claimed item held by another worker expires, or None if no other
+                 worker holds a lease
+        :rtype: float
+        """
+        with self._lock:
+            lease_expires = self._connection.execute('SELECT MIN(lease_expires) FROM work_items WHERE status = ? AND '
+                                                     'lease_expires > 0 AND lease_owner != ?',
+                                                     (CLAIMED, self.worker_id)).fetchone()[0]
+        return None if lease_expires is None else max(lease_expires - time(), 0.0)
+
+    def count(self, status=None):
+        """
+        Method to count the items in the queue.
+
+        :param int status: Only count items with this status (PENDING, CLAIMED, DONE or FAILED). If None, count every
+                           item.
+        :return: Number of items
+        :rtype: int
+        """
+        with self._lock:
+            if status is None:
+                return self._connection.execute('SELECT COUNT(*) FROM work_items').fetchone()[0]
+            return self._connection.execute('SELECT COUNT(*) FROM work_items WHERE status = ?',
+                                            (status,)).fetchone()[0]
+
+    def get_rows(self, status=None):
+        """
+        Method to return the rows of the queue.
+
+        :param int status: Only return rows with this status (PENDING, CLAIMED, DONE or FAILED). If None, return every
+                           row.
+        :return: Rows in the order they were put
+        :rtype: list[str]
+        """
+        with self._lock:
+            if status is None:
+                rows = self._connection.execute('SELECT row FROM work_items ORDER BY id')
+            else:
+                rows = self._connection.execute('SELECT row FROM work_items WHERE status = ? ORDER BY id', (status,))
+            return [self._expand_row(row) for row, in rows]
+
+    def get_metadata(self, key):
+        """
+        Method to read a value stored alongside the queue, e.g. whether every row has been discovered.
+
+        :param str key: Name of the value
+        :return: Stored value, or None if it was never set
+        :rtype: str
+        """
+        with self._lock:
+            row = self._connection.execute('SELECT value FROM metadata WHERE key = ?', (key,)).fetchone()
+        return None if row is None else row[0]
+
+    def set_metadata(self, key, value):
+        """
+        Method to store a value alongside the queue.
+
+        :param str key: Name of the value
+        :param str value: Value to store
+        """
+        with self._lock:
+            self._connection.execute('INSERT OR REPLACE INTO metadata (key, value) VALUES (?, ?)', (key, value))
+
+    def close(self):
+        """
+        Method to close the database connection.
+        """
+        with self._lock:
+            self._connection.close()
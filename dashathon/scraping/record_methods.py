@@ -0,0 +1,79 @@
+from collections import namedtuple
+
+SPLITS = ['5k', '10k', '15k', '20k', 'half', '25k', '30k', '35k', '40k', 'finish']
+
+HEADERS_CHICAGO = ['year', 'bib', 'age_group', 'gender', 'city', 'state', 'country', 'overall', 'rank_gender',
+                   'rank_age_group'] + SPLITS
+HEADERS_LONDON = ['year', 'bib', 'age_group', 'gender', 'country', 'overall', 'rank_gender', 'rank_age_group'] + SPLITS
+HEADERS_BERLIN = ['year', 'bib', 'age_group', 'gender', 'country', 'rank_gender', 'rank_age_group'] + SPLITS
+
+
+def _get_fields(headers):
+    # Split labels such as '5k' aren't valid identifiers, so record fields are prefixed with 'split_'.
+    return [header if header not in SPLITS else 'split_' + header for header in headers]
+
+
+class ChicagoRunner(namedtuple('ChicagoRunner', _get_fields(HEADERS_CHICAGO))):
+    """
+    Details of a single Chicago Marathon runner as returned by `scrape_chicago_runner_details`. Fields follow the
+    order of `headers`, with split times stored as float seconds (NaN when missing).
+    """
+    __slots__ = ()
+    headers = HEADERS_CHICAGO
+
+
+class LondonRunner(namedtuple('LondonRunner', _get_fields(HEADERS_LONDON))):
+    """
+    Details of a single London Marathon runner as returned by `scrape_london_runner_details`. Fields follow the order
+    of `headers`, with split times stored as float seconds (NaN when missing).
+    """
+    __slots__ = ()
+    headers = HEADERS_LONDON
+
+
+class BerlinRunner(namedtuple('BerlinRunner', _get_fields(HEADERS_BERLIN))):
+    """
+    Details of a single Berlin Marathon runner as returned by `scrape_berlin_runner_details`. Fields follow the order
+    of `headers`, with split times stored as float seconds (NaN when missing).
+    """
+    __slots__ = ()
+    headers = HEADERS_BERLIN
+
+
+def convert_time_to_seconds(time_string):
+    """
+    Method to convert a split time scraped from a results page into seconds. Blank and malformed times, such as '-',
+    are converted to NaN.
+
+    Example::
+
+        convert_time_to_seconds('02:15:38')  # 8138.0
+
+    :param str time_string: Split time formatted as 'HH:MM:SS'
+    :return: Split time in seconds
+    :rtype: float
+    """
+    time_parts = time_string.strip().split(':')
+    if len(time_parts) != 3:
+        return float('nan')
+    try:
+        hours, minutes, seconds = time_parts
+        return float(int(hours) * 3600 + int(minutes) * 60 + float(seconds))
+    except ValueError:
+        return float('nan')
+
+
+def select_split_times(split_times, split_labels):
+    """
+    Method to order the split times scraped from a results page by the splits expected in the output.
+
+    Example::
+
+        select_split_times({'05k': 1500.0, 'finish': 12000.0}, ['05k', '10k', 'finish'])  # [1500.0, nan, 12000.0]
+
+    :param dict split_times: Mapping of lowercase split labels, as they appear on the results page, to seconds
+    :param list[str] split_labels: Split labels on the results page, in the order of `SPLITS`
+    :return: Split times in seconds, with NaN for missing splits
+    :rtype: list[float]
+    """
+    return [split_times.get(split_label, float('nan')) for split_label in split_labels]
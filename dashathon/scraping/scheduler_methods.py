@@ -0,0 +1,185 @@
+import os
+import threading
+from collections import namedtuple, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from dashathon.scraping.concurrency_methods import HostLimiter, CircuitBreaker, get_host
+from dashathon.scraping.http_methods import SessionPool
+from dashathon.scraping.record_methods import HEADERS_CHICAGO, HEADERS_LONDON, HEADERS_BERLIN
+import dashathon.scraping.scraping_methods as scrape
+
+RACES = ['chicago', 'london', 'berlin']
+
+# Web form of each race and year, as used by the scrape_*_data scripts
+RACE_URLS = {
+    'chicago': 'http://chicago-history.r.mikatiming.de/2015/',
+    'london': 'http://results-{year}.virginmoneylondonmarathon.com/{year}/',
+    'berlin': 'http://results.scc-events.com/{year}/',
+}
+
+# Events scraped for each race and year, as used by the scrape_*_data scripts
+RACE_EVENTS = {
+    'chicago': {2014: ['MAR_999999107FA3090000000065'], 2015: ['MAR_999999107FA3090000000079'],
+                2016: ['MAR_999999107FA309000000008D'], 2017: ['MAR_999999107FA30900000000A1']},
+    'london': {year: ['MAS', 'ELIT'] for year in [2014, 2015, 2016, 2017]},
+    'berlin': {2014: ['MAL'], 2015: ['MAL'], 2016: ['MAL_99999905C9AF3F0000000945'], 2017: ['MAL']},
+}
+
+
+class ScrapeJob(namedtuple('ScrapeJob', ['race', 'year', 'gender', 'event', 'url', 'num_results_per_page'])):
+    """
+    One (race, year, gender, event) combination to scrape. If `url` is None, the web form used by the scrape_*_data
+    scripts is used. If `num_results_per_page` is None, the URL scrapers probe the largest page size of the website.
+    """
+    __slots__ = ()
+
+    def __new__(cls, race, year, gender, event, url=None, num_results_per_page=None):
+        if race not in RACES:
+            raise ValueError('Unknown race: ' + str(race))
+        if url is None:
+            url = RACE_URLS[race].format(year=year)
+        return super().__new__(cls, race, year, gender, event, url, num_results_per_page)
+
+    @property
+    def name(self):
+        """
+        Name of the job, used as the stem of its files, e.g. 'london_marathon_2017_M_elite'.
+        """
+        suffix = '_elite' if self.event == 'ELIT' else ''
+        return self.race + '_marathon_' + str(self.year) + '_' + self.gender + suffix
+
+
+def get_job_matrix(races=None, years=None, genders=None):
+    """
+    Method to list every job of the scrape_*_data scripts, optionally restricted to some races, years and genders.
+
+    Example::
+
+        get_job_matrix(races=['chicago', 'berlin'], years=[2016, 2017])  # 8 jobs
+
+    :param list[str] races: Races to include. Defaults to every race in `RACES`.
+    :param list[int] years: Years to include. Defaults to 2014 to 2017.
+    :param list[str] genders: Genders to include. Defaults to ['M', 'W'].
+    :return: Jobs ordered by year, then gender, then race
+    :rtype: list[ScrapeJob]
+    """
+    races = races or RACES
+    years = years or [2017, 2016, 2015, 2014]
+    genders = genders or ['M', 'W']
+    return [ScrapeJob(race, year, gender, event) for year in years for gender in genders for race in races
+            for event in RACE_EVENTS[race][year]]
+
+
+def get_job_paths(job, directory='.'):
+    """
+    Method to return the files of a job, named as by the scrape_*_data scripts so their runs can be resumed.
+
+    :param ScrapeJob job: Job to scrape
+    :param str directory: Directory holding the files
+    :return: Paths of the input, output, and error files
+    :rtype: (str, str, str)
+    """
+    stem = os.path.join(directory, job.name)
+    return stem + '_urls.csv', stem + '.csv', stem + '_error_log.csv'
+
+
+def run_job(job, directory='.', **kwargs):
+    """
+    Method to scrape every runner of a job. Results pages are walked while runners are scraped, and the job's work
+    queue journal records its progress, so an interrupted job resumes where it stopped.
+
+    Example::
+
+        run_job(ScrapeJob('berlin', 2016, 'M', 'MAL_99999905C9AF3F0000000945'), num_workers=4)
+
+    :param ScrapeJob job: Job to scrape
+    :param str directory: Directory holding the job's files
+    :param kwargs: Other arguments of the scrape_*_marathon method, e.g. num_workers, session, or limiter. A session
+                   passed here is also used to walk the results pages.
+    """
+    path_input, path_output, path_error = get_job_paths(job, directory)
+    url_kwargs = dict(url=job.url, year=job.year, event=job.event, gender=job.gender,
+                      num_results_per_page=job.num_results_per_page, session=kwargs.get('session'))
+    scrape_kwargs = dict(path_input=path_input, path_output=path_output, path_error=path_error, gender=job.gender,
+                         **kwargs)
+    if job.race == 'chicago':
+        scrape.scrape_chicago_marathon(headers=HEADERS_CHICAGO,
+                                       url_pages=scrape.iter_chicago_marathon_urls(**url_kwargs), **scrape_kwargs)
+    elif job.race == 'london':
+        scrape.scrape_london_marathon(year=job.year, headers=HEADERS_LONDON,
+                                      url_pages=scrape.iter_london_marathon_urls(**url_kwargs), **scrape_kwargs)
+    else:
+        scrape.scrape_berlin_marathon(year=job.year, headers=HEADERS_BERLIN,
+                                      url_pages=scrape.iter_berlin_marathon_urls(**url_kwargs), **scrape_kwargs)
+
+
+def run_jobs(jobs, directory='.', max_jobs_per_host=1, max_requests_per_host=4, num_workers=4, delay=0.5, session=None,
+             **kwargs):
+    """
+    Method to scrape a matrix of jobs, running jobs against different hosts in parallel.
+
+    Jobs are grouped by the host of their web form. Each host runs up to `max_jobs_per_host` jobs at a time, in the
+    order given, and the jobs of a host share one `HostLimiter` and `CircuitBreaker`, so the host never has more than
+    `max_requests_per_host` requests in flight whatever the number of jobs. Each job keeps its own files and work queue
+    journal, so a failed or interrupted job can be resumed on its own by running the same jobs again. A failed job does
+    not stop the others.
+
+    Example::
+
+        failures = run_jobs(get_job_matrix(years=[2017]), directory='scraped_data', num_workers=4)
+
+    :param list[ScrapeJob] jobs: Jobs to scrape
+    :param str directory: Directory holding the files of every job
+    :param int max_jobs_per_host: Number of jobs run at the same time against a single host
+    :param int max_requests_per_host: Number of requests in flight against a single host, across its jobs
+    :param int num_workers: Number of runners scraped concurrently by each job
+    :param float delay: Pause in seconds taken by each worker after scraping a runner
+    :param SessionPool session: Pool of keep-alive connections shared by every job. If None, a pool is created for the
+                                duration of the run.
+    :param kwargs: Other arguments of the scrape_*_marathon methods, e.g. max_retries, or worker_id to share every
+                   job's journal with other hosts
+    :return: Mapping of each failed job to its error
+    :rtype: dict
+    """
+    jobs_by_host = OrderedDict()
+    for job in jobs:
+        jobs_by_host.setdefault(get_host(job.url), []).append(job)
+
+    owns_session = session is None
+    if owns_session:
+        session = SessionPool(max_connections_per_host=max_requests_per_host)
+    limiters = {host: HostLimiter(max_per_host=max_requests_per_host) for host in jobs_by_host}
+    circuit_breakers = {host: CircuitBreaker() for host in jobs_by_host}
+
+    failures = {}
+    lock = threading.Lock()
+
+    def run_host_jobs(host, host_jobs):
+        # Each of the host's job slots takes the next job not yet started
+        while True:
+            with lock:
+                if not host_jobs:
+                    return
+                job = host_jobs.pop(0)
+            print('Starting job: ' + job.name)
+            try:
+                run_job(job, directory=directory, num_workers=num_workers, delay=delay, session=session,
+                        limiter=limiters[host], circuit_breaker=circuit_breakers[host], **kwargs)
+            except Exception as e:
+                print('Job failed: ' + job.name + ' (' + repr(e) + ')')
+                with lock:
+                    failures[job] = e
+            else:
+                print('Job complete: ' + job.name)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, len(jobs_by_host) * max_jobs_per_host)) as executor:
+            futures = [executor.submit(run_host_jobs, host, host_jobs) for host, host_jobs in jobs_by_host.items()
+                       for _ in range(max_jobs_per_host)]
+            for future in futures:
+                future.result()
+    finally:
+        if owns_session:
+            session.close()
+
+    return failures
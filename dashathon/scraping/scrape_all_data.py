@@ -0,0 +1,27 @@
+from dashathon.scraping.queue_methods import get_worker_id
+from dashathon.scraping.scheduler_methods import get_job_matrix
+from dashathon.scraping.scheduler_methods import run_jobs
+from dashathon.scraping.telemetry_methods import ScrapeMetrics
+from dashathon.scraping.telemetry_methods import start_metrics_server
+
+# Port serving the run's metrics to Prometheus at /metrics, or None to only write the JSONL run log
+METRICS_PORT = None
+
+# Set to True to run this script on several hosts at once from a shared directory. The hosts then share each job's work
+# queue journal, and each writes its own output files, merged once the job is finished.
+SHARED = False
+
+# Scrape every race, year and gender of the scrape_*_data scripts, running the three races' websites in parallel.
+# Re-running this script resumes every unfinished job from its work queue journal.
+metrics = ScrapeMetrics(path_log='scrape_all_data_log.jsonl')
+metrics_server = start_metrics_server(metrics, port=METRICS_PORT) if METRICS_PORT is not None else None
+try:
+    failures = run_jobs(get_job_matrix(), directory='.', max_jobs_per_host=1, max_requests_per_host=4, num_workers=4,
+                        metrics=metrics, worker_id=get_worker_id() if SHARED else None)
+finally:
+    if metrics_server is not None:
+        metrics_server.shutdown()
+        metrics_server.server_close()
+
+for job, error in failures.items():
+    print('Failed: ' + job.name + ' (' + repr(error) + ')')
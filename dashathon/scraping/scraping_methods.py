@@ -1,14 +1,73 @@
 import mechanize
 import pandas as pd
-import bs4
 from bs4 import BeautifulSoup
 from bs4 import SoupStrainer
+from collections import deque
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from functools import lru_cache, partial
 from math import ceil
-from time import sleep
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from time import monotonic, sleep
 import re
 import os
-import sys
+import threading
 import unicodedata
+from dashathon.scraping.concurrency_methods import HostLimiter, AdaptiveLimiter, CircuitBreaker, get_backoff_delay, \
+    get_host, start_process_pool
+from dashathon.scraping.http_methods import SessionPool
+from dashathon.scraping.index_methods import RunnerIndex, get_runner_idp
+from dashathon.scraping.queue_methods import WorkQueue, PENDING
+from dashathon.scraping.output_methods import RecordWriter, read_records, get_worker_path, get_worker_paths, \
+    merge_worker_outputs
+from dashathon.scraping.telemetry_methods import ScrapeMetrics
+from dashathon.scraping.record_methods import ChicagoRunner, LondonRunner, BerlinRunner, select_split_times
+import dashathon.scraping.parsing_methods as parsing
+
+
+# Transliterations of the special latin characters kept by `strip_special_latin_char`
+LATIN_CHAR_MAP = {'Æ': 'AE', 'Ð': 'D', 'Ø': 'O', 'Þ': 'TH', 'ß': 'ss', 'æ': 'ae',
+                  'ð': 'd', 'ø': 'o', 'þ': 'th', 'Œ': 'OE', 'œ': 'oe', 'ƒ': 'f'}
+
+# Number of distinct strings whose conversion is remembered by `convert_to_ascii`. Cities and countries repeat heavily
+# across runners.
+CONVERT_TO_ASCII_CACHE_SIZE = 65536
+
+
+class _TranslationTable(dict):
+    # Table for str.translate mapping each character the first time it is met, so only the characters of the alphabets
+    # actually scraped are ever converted
+    def __init__(self, convert_char, code_points=()):
+        super().__init__()
+        self._convert_char = convert_char
+        for code_point in code_points:
+            self[code_point] = convert_char(chr(code_point))
+
+    def __missing__(self, code_point):
+        converted = self._convert_char(chr(code_point))
+        self[code_point] = converted
+        return converted
+
+
+def _strip_special_latin_char(char):
+    # Check if the character is ascii. If not ascii but a special latin character, transliterate. Otherwise, remove it.
+    return char if ord(char) < 128 else LATIN_CHAR_MAP.get(char, '')
+
+
+def _convert_char_to_ascii(char):
+    # NFD decomposes each character on its own, and strip_special_latin_char removes every combining mark that isn't
+    # removed by strip_accents, so converting a string character by character gives the same result
+    return ''.join(_strip_special_latin_char(c) for c in unicodedata.normalize('NFD', char)
+                   if unicodedata.category(c) != 'Mn')
+
+
+# Translation tables of `strip_special_latin_char` and `convert_to_ascii`, precompiled for the Latin-1 Supplement and
+# Latin Extended-A and B blocks, and extended on the fly with any other character met
+_SPECIAL_LATIN_CHAR_TABLE = _TranslationTable(_strip_special_latin_char, range(0x80, 0x250))
+_ASCII_TABLE = _TranslationTable(_convert_char_to_ascii, range(0x80, 0x250))
+
+# Any character outside ascii. Strings without one are already converted.
+_NON_ASCII_PATTERN = re.compile(r'[^\x00-\x7f]')
 
 
 def strip_special_latin_char(string):
@@ -23,20 +82,9 @@ def strip_special_latin_char(string):
     :return: String striped of special latin characters
     :rtype: str
     """
-    latin_char_map = {'Æ': 'AE', 'Ð': 'D', 'Ø': 'O', 'Þ': 'TH', 'ß': 'ss', 'æ': 'ae',
-                      'ð': 'd', 'ø': 'o', 'þ': 'th', 'Œ': 'OE', 'œ': 'oe', 'ƒ': 'f'}
-    string_ascii = ''
-    for s in string:
-        # Check if string character is ascii
-        if ord(s) < 128:
-            string_ascii += s
-        # If not ascii but is a special latin character, transliterate
-        elif s in latin_char_map.keys():
-            string_ascii += latin_char_map[s]
-        # Otherwise, remove the unexpected character
-        else:
-            string_ascii += ''
-    return string_ascii
+    if _NON_ASCII_PATTERN.search(string) is None:
+        return string
+    return string.translate(_SPECIAL_LATIN_CHAR_TABLE)
 
 
 def strip_accents(string):
@@ -57,11 +105,16 @@ def strip_accents(string):
                    if unicodedata.category(c) != 'Mn')
 
 
+@lru_cache(maxsize=CONVERT_TO_ASCII_CACHE_SIZE)
 def convert_to_ascii(string):
     """
     Method that ensures a given string object is converted into ascii format by removing accented characters
     and transliterating special latin characters.
 
+    The result is the same as `strip_special_latin_char(strip_accents(string))`, but each character is converted
+    once, by a translation table, and the conversions of the last `CONVERT_TO_ASCII_CACHE_SIZE` distinct strings are
+    remembered.
+
     Example::
 
         convert_to_ascii('thƝîš ƛìŝ ã tëśt: ÆæœƔþðßøÞĿØĳƧaÐŒƒ¿Ǣ')
@@ -70,9 +123,28 @@ def convert_to_ascii(string):
     :return: String converted into ascii
     :rtype: str
     """
-    string = strip_accents(string)
-    string = strip_special_latin_char(string)
-    return string
+    if _NON_ASCII_PATTERN.search(string) is None:
+        return string
+    return string.translate(_ASCII_TABLE)
+
+
+def convert_column_to_ascii(column):
+    """
+    Method to apply `convert_to_ascii` to a column of strings, converting each distinct value once. Values that aren't
+    strings, e.g. NaN, are kept.
+
+    Example::
+
+        convert_column_to_ascii(pd.Series(['Zürich', 'Zürich', 'Besançon', None]))
+        # ['Zurich', 'Zurich', 'Besancon', None]
+
+    :param pandas.Series column: Strings to be converted into ascii
+    :return: Strings converted into ascii, with the same index
+    :rtype: pandas.Series
+    """
+    converted = {value: convert_to_ascii(value) for value in column.unique() if isinstance(value, str)}
+    column_ascii = column.map(converted)
+    return column_ascii.where(column_ascii.notna(), column)
 
 
 def row_count_csv(input_file):
@@ -159,35 +231,641 @@ def delete_last_line_csv(input_file):
             file.truncate()
 
 
-def scrape_chicago_marathon_urls(url='http://chicago-history.r.mikatiming.de/2015/', year=2016,
-                                 event="MAR_999999107FA30900000000A1", gender='M', num_results_per_page=1000,
-                                 unit_test_ind=False):
+def fetch_runner_page(url, session=None, metrics=None):
     """
-    Method to scrape all URLs of each Chicago Marathon runner returned from a specified web form.
+    Method to download an individual runner's results page. Connection issues are reported to the console rather than
+    raised, since they are often random and can be retried later.
 
     Example::
 
-        scrape_chicago_marathon_urls(url='http://chicago-history.r.mikatiming.de/2015/', year=2017,
-                                          event="MAR_999999107FA30900000000A1", gender='M',
-                                          num_results_per_page=1000, unit_test_ind=True)
+        fetch_runner_page(url=('http://results.scc-events.com/2016/?content=detail&fpid=search&pid=search&idp='
+                               '99999905C9AF460000404FFD&lang=EN&event=MAL_99999905C9AF3F0000000945&search%5Bstart_no'
+                               '%5D=30529&search_sort=name&search_event=MAL_99999905C9AF3F0000000945'),
+                          session=SessionPool())
+
+    :param str url: URL for an individual runner's results
+    :param SessionPool session: Pool of keep-alive connections used to download the page. If None, a new
+                                mechanize.Browser is used.
+    :param ScrapeMetrics metrics: Metrics recording the latency, status, and size of the request
+    :return: Raw HTML of the page, or None if it could not be downloaded
+    :rtype: bytes
+    """
+    start = monotonic()
+    # Use try/except in case of unexpected internet/URL issues
+    try:
+        if session is not None:
+            html = session.fetch(url)
+        else:
+            br = mechanize.Browser()
+
+            # Ignore robots.txt
+            br.set_handle_robots(False)
+
+            br.open(url)
+            html = br.response().read()
+    except (mechanize.HTTPError, mechanize.URLError) as e:
+        if hasattr(e, 'code') and int(e.code) == 500:
+            print('Following URL has HTTP Error 500:')
+        else:
+            print('Following URL has unexpected connection issue:')
+        print(url)
+        if metrics is not None:
+            metrics.record_fetch(url, monotonic() - start, str(e.code) if hasattr(e, 'code') else 'connection')
+        return None
+    if metrics is not None:
+        metrics.record_fetch(url, monotonic() - start, '200', num_bytes=len(html))
+    return html
+
+
+def _parse_timed(parse_row, html, row_input):
+    # Parse a runner page, also returning the seconds spent and whether the fast path read it, so parsing in a separate
+    # process can be reported
+    start = monotonic()
+    runner_output = parse_row(html, row_input)
+    return runner_output, monotonic() - start, parsing.was_fast_path_hit()
+
+
+def get_page_url(page_url, page):
+    """
+    Method to address a page of a results list directly, from the URL of any other page of the same list. The results
+    websites number their pages with a 'page' parameter in the query string.
+
+    Example::
+
+        get_page_url('http://results.scc-events.com/2016/?page=2&event=MAL&num_results=100&pid=list', 7)
+        # 'http://results.scc-events.com/2016/?page=7&event=MAL&num_results=100&pid=list'
+
+    :param str page_url: URL of a page of the results list
+    :param int page: Number of the page to address, starting at 1
+    :return: URL of the page, or None if page_url has no 'page' parameter
+    :rtype: str
+    """
+    parts = urlsplit(page_url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if 'page' not in [name for name, _ in query]:
+        return None
+    query = [(name, str(page) if name == 'page' else value) for name, value in query]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def iter_results_pages(session, br, html, num_pages, num_page_workers=1):
+    """
+    Generator of the HTML of every page of a results list, in page order, starting from the page returned by the search
+    form.
+
+    With one worker, the '>' link of each page is followed, one round trip at a time. With more workers, the URL of
+    every remaining page is derived from the first '>' link and pages are downloaded concurrently, at most
+    `2 * num_page_workers` pages ahead of the page being yielded. Pages are always yielded in order.
+
+    Example::
+
+        resp = session.open(br.click())  # Submit the search form
+        br.set_response(resp)
+        for html in iter_results_pages(session, br, resp.read(), num_pages=40, num_page_workers=8):
+            ...
+
+    :param SessionPool session: Pool of keep-alive connections used to download the pages
+    :param mechanize.Browser br: Browser holding the submitted search form's response
+    :param bytes html: HTML of the first results page
+    :param int num_pages: Total number of results pages
+    :param int num_page_workers: Number of pages downloaded concurrently
+    :return: Generator of the raw HTML of each page
+    :rtype: generator
+    """
+    if num_pages < 1:
+        return
+    yield html
+    if num_pages < 2:
+        return
+
+    # The link with text ">" appears to always point to the next results page.
+    next_page_url = br.find_link(text='>').absolute_url
+    page_urls = [get_page_url(next_page_url, page) for page in range(2, num_pages + 1)]
+    if num_page_workers <= 1 or None in page_urls:
+        for _ in range(2, num_pages + 1):
+            resp = session.open(br.find_link(text='>').absolute_url)
+            br.set_response(resp)
+            yield resp.read()
+        return
+
+    with ThreadPoolExecutor(max_workers=num_page_workers) as executor:
+        pending_pages = deque()
+        for page_url in page_urls:
+            pending_pages.append(executor.submit(session.fetch, page_url))
+            if len(pending_pages) >= 2 * num_page_workers:
+                yield pending_pages.popleft().result()
+        while pending_pages:
+            yield pending_pages.popleft().result()
+
+
+# Numbers of results per page requested when probing a results website, largest first
+PAGE_SIZE_PROBES = [2500, 1000, 500, 250, 100]
+
+# Largest number of results per page returned by each results website, by (host, year), as found by the URL scrapers
+_page_sizes = {}
+_page_sizes_lock = threading.Lock()
+
+
+def submit_results_form(session, br, url, year, num_results_per_page=None):
+    """
+    Method to submit a filled-in search form, choosing the number of results per page.
+
+    If `num_results_per_page` is None, the page size found for the website's host and year by an earlier search is
+    requested. If there was none, each size of `PAGE_SIZE_PROBES` and of the form's drop-down is tried from the largest
+    down, until the website returns a page rather than an HTTP error. Sizes not offered by the form's
+    drop-down are added to it, as the websites accept them. Call `get_num_results_per_page` with the first page of
+    results to learn the size the website actually returned.
+
+    Example::
+
+        resp, num_requested = submit_results_form(session, br, url, year=2017)
+        html = resp.read()
+
+    :param SessionPool session: Pool of keep-alive connections used to submit the form
+    :param mechanize.Browser br: Browser holding the search form, with every field but 'num_results' filled in
+    :param str url: URL to the web form
+    :param int year: Year of marathon
+    :param int num_results_per_page: Number of results per page to request. If None, the size is probed.
+    :return: Response to the form, which is also set as the browser's response, and number of results per page
+             requested
+    :rtype: (mechanize.Response, int)
+    """
+    control = br.form.find_control(name='num_results')
+    if num_results_per_page is not None:
+        page_sizes = [num_results_per_page]
+    else:
+        with _page_sizes_lock:
+            page_size = _page_sizes.get((get_host(url), year))
+        offered_sizes = [int(item.name) for item in control.items if item.name.isdigit()]
+        page_sizes = [page_size] if page_size is not None else sorted(set(PAGE_SIZE_PROBES + offered_sizes),
+                                                                      reverse=True)
+
+    for page_size in page_sizes:
+        if str(page_size) not in [item.name for item in control.items]:
+            mechanize.Item(control, {'contents': str(page_size), 'value': str(page_size), 'label': str(page_size)})
+        br.form['num_results'] = [str(page_size)]
+        try:
+            resp = session.open(br.click())
+        except mechanize.HTTPError:
+            # The website rejects this size, so try the next one
+            if page_size == page_sizes[-1]:
+                raise
+            continue
+        br.set_response(resp)
+        return resp, page_size
+
+
+def get_num_results_per_page(url, year, num_requested, num_returned, num_total, probed=True):
+    """
+    Method to find the number of results per page returned by a results website, which may return fewer results than
+    requested, from the first page of results. Probed sizes are cached for the website's host and year, so later
+    searches by `submit_results_form` request them directly.
+
+    Example::
+
+        get_num_results_per_page('http://results.scc-events.com/2016/', 2016, num_requested=2500, num_returned=100,
+                                 num_total=40000)  # 100
+
+    :param str url: URL to the web form
+    :param int year: Year of marathon
+    :param int num_requested: Number of results per page requested
+    :param int num_returned: Number of results on the first page
+    :param int num_total: Total number of results of the search
+    :param bool probed: Whether the size requested was chosen by `submit_results_form`, rather than given
+    :return: Number of results on every page but the last
+    :rtype: int
+    """
+    page_size = num_returned if 0 < num_returned < min(num_requested, num_total) else num_requested
+    if probed:
+        with _page_sizes_lock:
+            _page_sizes[(get_host(url), year)] = page_size
+    return page_size
+
+
+def drop_seen_runners(runners, seen_urls):
+    """
+    Method to remove runners already found on an earlier results page, e.g. when results shift between pages while
+    they are downloaded. The URL of each kept runner is added to `seen_urls`.
+
+    Example::
+
+        seen_urls = set()
+        drop_seen_runners([('url_1',), ('url_2',)], seen_urls)  # [('url_1',), ('url_2',)]
+        drop_seen_runners([('url_2',), ('url_3',)], seen_urls)  # [('url_3',)]
+
+    :param list[tuple] runners: Runners of a results page, each starting with its URL
+    :param set seen_urls: URLs of the runners already found
+    :return: Runners not found before, in their original order
+    :rtype: list[tuple]
+    """
+    new_runners = []
+    for runner in runners:
+        if runner[0] not in seen_urls:
+            seen_urls.add(runner[0])
+            new_runners.append(runner)
+    return new_runners
+
+
+# Seconds between two checks of a shared journal by a worker waiting for the other workers to finish their runners
+SHARED_POLL_SECONDS = 0.25
+
+
+def get_queue_path(path_input):
+    """
+    Method to return the default path of the work queue journal that accompanies a scrape_*_marathon input file.
+
+    Example::
+
+        get_queue_path('chicago_marathon_2017_M_urls.csv')  # 'chicago_marathon_2017_M_urls.sqlite'
+
+    :param str path_input: Path for file containing exported results from a scrape_*_marathon_urls method
+    :return: Path of the work queue journal
+    :rtype: str
+    """
+    return os.path.splitext(path_input)[0] + '.sqlite'
+
+
+def _scrape_marathon(path_input, path_output, path_error, headers, df_urls, marathon_name, parse_row,
+                     num_workers=1, max_requests_per_host=None, delay=0.5, session=None, path_queue=None,
+                     flush_rows=100, flush_seconds=5.0, url_pages=None, max_retries=3, retry_delay=1.0,
+                     circuit_breaker=None, limiter=None, num_parse_processes=None, runner_index=None, top_up=False,
+                     metrics=None, worker_id=None, lease_seconds=None):
+    """
+    Method containing the scraping loop shared by `scrape_chicago_marathon`, `scrape_london_marathon`, and
+    `scrape_berlin_marathon`.
+
+    The rows of `path_input` are imported once into a `WorkQueue` journal stored at `path_queue`. Runners are then
+    claimed from the journal and scraped concurrently by a pool of worker threads. A runner is only logged as complete
+    in the journal once it has been written to `path_output` (or `path_error`), so an interrupted run can always be
+    resumed from the journal.
+
+    Runners whose page could not be downloaded are retried up to `max_retries` times with a growing, jittered delay,
+    and requests to a host that keeps failing are paused by a `CircuitBreaker`. Only runners that still fail are logged
+    in `path_error`. Once every runner has been tried, the runners in `path_error`, including any left by earlier runs,
+    are put back in the journal for one more round of retries.
+
+    If `url_pages` is given, the journal is instead filled by a producer thread walking the results pages, and workers
+    start scraping the runners of the first page while the following pages are downloaded. The journal records when
+    every page has been walked, so a resumed run only walks the pages again if the first run was interrupted early.
+
+    Runners already scraped are skipped using a `RunnerIndex` loaded from `path_output` and the journal: runners whose
+    idp was already completed are not fetched, and runners whose (year, bib) is already in `path_output` are not
+    written again. With `top_up`, the runners of path_input or url_pages are added to an existing journal, so a year
+    can be topped up after its results are amended without scraping its runners again.
+
+    If `num_parse_processes` is given, worker threads only download runner pages, and the pages are parsed by a pool
+    of processes instead, so parsing is not limited to one core by the GIL.
+
+    If `worker_id` is given, the journal is shared with other processes or hosts scraping the same job. Runners are
+    claimed in batches under a lease that the worker renews while it is alive, so the runners of a worker that crashed
+    are scraped by the others once its lease expires. Each worker writes its own output and error files (see
+    `get_worker_path`), and the worker that finds the journal finished merges every worker's output into path_output.
+
+    :param str path_input: Path for file containing exported results from a scrape_*_marathon_urls method
+    :param str path_output: Path for file containing exported results from a scrape_*_runner_details method
+    :param str path_error: Path for file containing a log of records from path_input that could not be processed due to
+                           a connectivity error
+    :param list[str] headers: List of strings representing expected headers for the scrape_*_runner_details method
+    :param pandas.DataFrame df_urls: DataFrame containing output from a scrape_*_marathon_urls method
+    :param str marathon_name: Name of marathon used when printing progress, e.g. 'Chicago'
+    :param parse_row: Function mapping the HTML of a runner's page and its (stripped) row of path_input to the output
+                      of a parse_*_runner_details method. It must be picklable, e.g. a `functools.partial` of a
+                      module-level function, to be used with num_parse_processes.
+    :param int num_workers: Number of runners scraped concurrently
+    :param int max_requests_per_host: Maximum number of requests in flight against a single host. Defaults to
+                                      num_workers.
+    :param float delay: Pause in seconds taken by a worker after each runner before it can reuse its host slot
+    :param SessionPool session: Pool of keep-alive connections shared by the workers. If None, a pool is created for
+                                the duration of the run.
+    :param str path_queue: Path of the work queue journal. Defaults to `get_queue_path(path_input)`.
+    :param int flush_rows: Number of rows buffered before they are written to path_output
+    :param float flush_seconds: Maximum number of seconds a scraped row is buffered before it is written
+    :param url_pages: Iterable of lists of runners, one list per results page, as yielded by an iter_*_marathon_urls
+                      method. If given, it is consumed by a separate thread that adds each page's runners to the
+                      journal as they are found, while workers scrape them. df_urls and path_input are then ignored.
+    :param int max_retries: Number of times a runner whose page could not be downloaded is retried before it is logged
+                            in path_error
+    :param float retry_delay: Wait in seconds before the first retry of a runner. The wait doubles with each retry, with
+                              random jitter.
+    :param CircuitBreaker circuit_breaker: Breaker pausing requests to a host that keeps failing. If None, a breaker
+                                           with default settings is used.
+    :param limiter: Bound on the requests in flight per host. If None, a HostLimiter with max_requests_per_host slots
+                    is used. An AdaptiveLimiter tunes the bound from observed latencies and errors, and the level it
+                    chose for each host is printed at the end of the run.
+    :type limiter: HostLimiter or AdaptiveLimiter
+    :param int num_parse_processes: Number of processes parsing runner pages. If None, pages are parsed by the worker
+                                    threads that downloaded them.
+    :param RunnerIndex runner_index: Index of runners already scraped, e.g. shared by several jobs. The runners of
+                                     path_output and of the journal are added to it. If None, a new index is used.
+    :param bool top_up: If True, runners of path_input (or url_pages) missing from an existing journal are added to it
+    :param ScrapeMetrics metrics: Metrics of the run, e.g. shared by several jobs. If None, new metrics are used, and
+                                  only reported to the console.
+    :param str worker_id: Name of this worker, unique across the processes and hosts sharing the journal, e.g.
+                          `get_worker_id()`. If None, the journal is used by this process only.
+    :param float lease_seconds: Seconds a worker sharing the journal holds the runners it claims before other workers
+                                can claim them, unless it renews them. Defaults to `DEFAULT_LEASE_SECONDS`.
+    """
+    shared = worker_id is not None
+    queue = WorkQueue(path_queue or get_queue_path(path_input), shared=shared, worker_id=worker_id,
+                      lease_seconds=lease_seconds)
+    race = marathon_name.lower()
+    if runner_index is None:
+        runner_index = RunnerIndex()
+    runner_index.load_output(path_output, race)
+    if shared:
+        for path_worker_output in get_worker_paths(path_output):
+            runner_index.load_output(path_worker_output, race)
+        path_merged_output = path_output
+        path_output, path_error = get_worker_path(path_output, worker_id), get_worker_path(path_error, worker_id)
+    runner_index.load_journal(queue, race)
+
+    if url_pages is None:
+        # Check if the expected input file of URLs exists or not.
+        check_file_input = os.path.isfile(path_input)
+
+        # Export df_urls if the input file doesn't exist, i.e., starting from scratch
+        if not check_file_input and df_urls is not None:
+            df_urls.to_csv(path_input, header=False, index=False, sep='|')
+
+        # Import the input file into the work queue journal the first time it is used. Later runs resume from the
+        # journal, unless topping it up with the rows it is missing. Workers sharing the journal may import it at the
+        # same time, so only one copy of each row is kept.
+        if queue.count() == 0:
+            queue.import_csv(path_input, unique=shared)
+        elif top_up and os.path.isfile(path_input):
+            queue.import_csv(path_input, unique=True)
+    elif queue.get_metadata('urls_complete') is not None and not top_up:
+        # Every results page was already walked by a prior run
+        url_pages = None
+    len_input = queue.count(PENDING)
+    num_discovered = 0
+
+    def discover_urls():
+        # Producer feeding the journal one results page at a time. Rows already in the journal, e.g. from an
+        # interrupted run, are skipped.
+        nonlocal num_discovered
+        for runners_page in url_pages:
+            rows = ['|'.join('' if value is None else str(value) for value in runner) for runner in runners_page]
+            num_discovered += queue.put(rows, unique=True)
+        queue.set_metadata('urls_complete', '1')
+
+    if limiter is None:
+        limiter = HostLimiter(max_per_host=max_requests_per_host or num_workers)
+    if circuit_breaker is None:
+        circuit_breaker = CircuitBreaker()
+    owns_session = session is None
+    if owns_session:
+        session = SessionPool(max_connections_per_host=limiter.max_per_host)
+    if metrics is None:
+        metrics = ScrapeMetrics()
+
+    def scrape_row_politely(row_input):
+        # The runner's URL is always the first field of a row in path_input. Requests wait while the host's circuit is
+        # open, i.e. while it keeps failing.
+        runner_url = row_input.split('|')[0]
+        circuit_breaker.wait(runner_url)
+        # The outcome is recorded even if the request raises, since the host's other requests wait for the outcome of
+        # its trial request
+        html = None
+        try:
+            with limiter.slot(runner_url):
+                start = monotonic()
+                html = fetch_runner_page(runner_url, session=session, metrics=metrics)
+                latency = monotonic() - start
+                sleep(delay)
+        finally:
+            circuit_breaker.record(runner_url, success=html is not None)
+        limiter.record(runner_url, latency=latency, success=html is not None)
+        if html is None:
+            return 'Connection error'
+        # Pages parsed by the process pool are handed back as they were downloaded
+        if parse_executor is not None:
+            return html
+        runner_output, parse_seconds, fast_path = _parse_timed(parse_row, html, row_input)
+        metrics.record_parse(runner_url, parse_seconds, fast_path=fast_path)
+        return runner_output
+
+    # Rows are buffered and written in batches. A runner is only logged as complete in the journal once its row has
+    # been flushed to path_output (or path_error).
+    output_writer = RecordWriter(path_output, headers=headers, flush_rows=flush_rows, flush_seconds=flush_seconds,
+                                 on_flush=queue.complete)
+    error_writer = RecordWriter(path_error, headers=['failed_urls'], flush_rows=flush_rows,
+                                flush_seconds=flush_seconds, on_flush=queue.fail)
+
+    # Worker processes are started before the worker threads, so no thread is running when they are forked
+    parse_executor = None
+    if num_parse_processes:
+        parse_executor = start_process_pool(num_parse_processes)
+
+    print('Starting to scrape ' + marathon_name + ' Marathon split times...')
+    scrape_count = 0
+    skip_count = 0
+    in_flight = {}
+    pending_parses = {}
+    discovery = None
+    error_log_drained = False
+    # Workers sharing the journal claim runners in batches, so the lock on the database file is taken less often
+    claimed = deque()
+    claim_batch_size = 2 * num_workers if shared else 1
+    finished = False
+    try:
+        with ThreadPoolExecutor(max_workers=num_workers) as executor, \
+                ThreadPoolExecutor(max_workers=1) as discovery_executor:
+            if url_pages is not None:
+                discovery = discovery_executor.submit(discover_urls)
+
+            while True:
+                # Keep every worker busy with a runner claimed from the journal, unless the parse processes are
+                # falling behind
+                if parse_executor is None or len(pending_parses) < 2 * (num_parse_processes + num_workers):
+                    if len(claimed) < num_workers - len(in_flight):
+                        claimed.extend(queue.claim(max(num_workers - len(in_flight) - len(claimed),
+                                                       claim_batch_size)))
+                    while claimed and len(in_flight) < num_workers:
+                        item_id, row_input = claimed.popleft()
+                        if runner_index.contains(race, idp=get_runner_idp(row_input.split('|')[0])):
+                            queue.complete([item_id])
+                            skip_count += 1
+                            len_input -= 1
+                            continue
+                        in_flight[executor.submit(scrape_row_politely, row_input)] = (item_id, row_input)
+
+                discovering = discovery is not None and not discovery.done()
+                if (not in_flight and not pending_parses and not claimed and not discovering
+                        and queue.count(PENDING) == 0):
+                    if shared:
+                        # Wait for the other workers to finish their runners, which are claimed again if their lease
+                        # expires
+                        output_writer.flush()
+                        error_writer.flush()
+                        lease_seconds_left = queue.get_lease_seconds()
+                        if lease_seconds_left is not None:
+                            sleep(min(flush_seconds, lease_seconds_left + 0.01, SHARED_POLL_SECONDS))
+                            metrics.log_if_due()
+                            continue
+
+                    # Give runners logged in path_error, by this run or earlier ones, one more round of retries
+                    if error_log_drained:
+                        finished = True
+                        break
+                    error_log_drained = True
+                    error_writer.flush()
+                    error_rows = read_records(path_error)[1]
+                    if not error_rows:
+                        finished = True
+                        break
+                    print('Retrying ' + str(len(error_rows)) + ' runners from the error log...')
+                    len_input += queue.put(['|'.join(row) for row in error_rows])
+                    error_writer.truncate()
+                    continue
+
+                # Idle workers wake up when the next retry is due and, while results pages are still being walked,
+                # poll the journal for new runners.
+                timeout = flush_seconds
+                if len(in_flight) < num_workers:
+                    retry_seconds = queue.get_retry_seconds()
+                    if retry_seconds is not None:
+                        timeout = min(timeout, retry_seconds)
+                    if discovering:
+                        timeout = min(timeout, 0.05)
+                waitables = list(in_flight) + list(pending_parses) + ([discovery] if discovering else [])
+                if waitables:
+                    done, _ = wait(waitables, timeout=timeout, return_when=FIRST_COMPLETED)
+                else:
+                    sleep(timeout)
+                    done = set()
+
+                for future in done:
+                    if future is discovery:
+                        continue
+                    if future in pending_parses:
+                        item_id, row_input = pending_parses.pop(future)
+                        runner_output, parse_seconds, fast_path = future.result()
+                        metrics.record_parse(row_input.split('|')[0], parse_seconds, fast_path=fast_path)
+                    else:
+                        item_id, row_input = in_flight.pop(future)
+                        runner_output = future.result()
+                        if type(runner_output).__name__ == 'bytes':
+                            pending_parses[parse_executor.submit(_parse_timed, parse_row, runner_output,
+                                                                 row_input)] = (item_id, row_input)
+                            continue
+
+                    # Handle cases where the scrape_*_runner_details method returns None. Skip the input record,
+                    # assuming the record is not relevant for this analysis.
+                    if runner_output is None:
+                        print('Reducing total number of runners...')
+                        len_input -= 1
+                        queue.complete([item_id])
+
+                    # Handle cases where the scrape_*_runner_details method has a connection issue. Often, these are
+                    # random, so the runner is retried later with a growing delay. Once its retries are exhausted, the
+                    # current path_input row is appended to an error log.
+                    elif type(runner_output).__name__ == 'str' and runner_output == 'Connection error':
+                        attempts = queue.get_attempts(item_id)
+                        if attempts < max_retries:
+                            retry_seconds = get_backoff_delay(attempts, base_delay=retry_delay)
+                            print('Retrying runner in ' + str(round(retry_seconds, 1)) + ' seconds...')
+                            queue.retry(item_id, delay=retry_seconds)
+                        else:
+                            error_writer.write(row_input.split('|'), token=item_id)
+                            print('Reducing total number of runners...')
+                            len_input -= 1
+
+                    # Skip runners already in path_output, e.g. when path_input was regenerated
+                    elif runner_index.contains(race, year=runner_output.year, bib=runner_output.bib):
+                        queue.complete([item_id])
+                        skip_count += 1
+                        len_input -= 1
+
+                    else:
+                        output_writer.write(runner_output, token=item_id)
+                        runner_index.add(race, year=runner_output.year, bib=runner_output.bib,
+                                         idp=get_runner_idp(row_input.split('|')[0]))
+                        scrape_count += 1
+                        metrics.set_progress(path_output, scrape_count, len_input + num_discovered)
+                        requests_per_second, eta_seconds = metrics.get_progress()
+                        print('Progress: ' + str(scrape_count) + ' of ' + str(len_input + num_discovered) + ' (' +
+                              str(round(requests_per_second, 1)) + ' requests/s, ETA ' +
+                              ('-' if eta_seconds is None else str(timedelta(seconds=round(eta_seconds)))) + ')',
+                              end='\r')
+
+                metrics.set_progress(path_output, scrape_count, len_input + num_discovered)
+                output_writer.flush_if_due()
+                error_writer.flush_if_due()
+                queue.renew_leases_if_due()
+                metrics.log_if_due()
+    finally:
+        output_writer.close()
+        error_writer.close()
+        queue.close()
+        if owns_session:
+            session.close()
+        if parse_executor is not None:
+            parse_executor.shutdown()
+        metrics.log()
+
+    # Raise any error met while walking the results pages. Runners found before the error have been scraped.
+    if discovery is not None:
+        discovery.result()
+
+    print('')
+    if skip_count:
+        print('Skipped ' + str(skip_count) + ' runners already scraped.')
+    if shared and finished:
+        print('Merged ' + str(merge_worker_outputs(path_merged_output, headers=headers)) + ' runners scraped by ' +
+              str(len(get_worker_paths(path_merged_output))) + ' workers.')
+    if isinstance(limiter, AdaptiveLimiter):
+        for host, level in limiter.get_levels().items():
+            print('Concurrent requests chosen for ' + host + ': ' + str(level))
+    summary = metrics.get_summary()
+    if summary['requests']:
+        print('Requests: ' + str(summary['requests']) + ' (' + str(round(summary['requests_per_second'], 1)) +
+              '/s), p50/p95/p99 fetch seconds: ' + '/'.join(str(round(summary['fetch_seconds'][percentile], 3))
+                                                           for percentile in ['p50', 'p95', 'p99']) +
+              ', bytes: ' + str(summary['bytes']) + ', errors by status: ' + str(summary['errors_by_status']))
+    if summary['fast_path_hit_rate'] is not None:
+        print('Pages parsed without building a tree: ' + str(round(100 * summary['fast_path_hit_rate'], 1)) + '%')
+    print('Scraping of split times complete!')
+
+
+def iter_chicago_marathon_urls(url='http://chicago-history.r.mikatiming.de/2015/', year=2016,
+                                event="MAR_999999107FA30900000000A1", gender='M', num_results_per_page=None,
+                                unit_test_ind=False, session=None, num_page_workers=1):
+    """
+    Generator to scrape the URLs of each Chicago Marathon runner returned from a specified web form, one results page
+    at a time. Each page's runners are yielded as soon as the page is parsed, so they can be scraped while the next
+    pages are still being downloaded.
+
+    Example::
+
+        for runners in iter_chicago_marathon_urls(url='http://chicago-history.r.mikatiming.de/2015/', year=2017,
+                                                  event="MAR_999999107FA30900000000A1", gender='M'):
+            ...
 
     :param str url: URL to Chicago Marathon web form
     :param int year: Year of marathon (supported values: 2014, 2015, 2016, 2017)
     :param str event: Internal label used to specify the type of marathon participants (varies by year)
     :param str gender: Gender of runner ('M' for male, 'W' for female)
-    :param int num_results_per_page: Number of results per page to return from the web form (use default value only)
+    :param int num_results_per_page: Number of results per page to request from the web form. If None, the largest
+                                     number the website returns is probed once per host and year, which minimizes the
+                                     number of results pages to walk.
     :param bool unit_test_ind: Logical value to specify if only the first URL should be returned (True) or all (False)
-    :return: DataFrame containing URLs, City, and State for all runners found in results page
-    :rtype: pandas.DataFrame
+    :param SessionPool session: Pool of keep-alive connections used to fill in the web form and page through its
+                                results. If None, a new pool is used. A pool with a PageCache in replay mode reads the
+                                form and results pages from the cache only.
+    :param int num_page_workers: Number of results pages downloaded concurrently. With more than 1, the URL of every
+                                 page is derived from the first results page instead of following each page's '>'
+                                 link. Runners are returned in page order either way, without duplicates.
+    :return: Generator of lists of (URL, City, State) tuples, one list per results page
+    :rtype: generator
     """
-    # Setup backend browser via mechanize package
-    br = mechanize.Browser()
-
-    # Ignore robots.txt
+    # Setup backend browser via mechanize package. Browsers created by SessionPool ignore robots.txt.
     # Note: I have not found any notice on the Chicago Marathon website that prohibits web scraping.
-    br.set_handle_robots(False)
+    if session is None:
+        session = SessionPool()
+    br = session.browser()
 
-    br.open(url)
+    br.set_response(session.open(url))
 
     # Select the overall results, not individual runner results
     br.select_form(nr=2)
@@ -211,11 +889,8 @@ def scrape_chicago_marathon_urls(url='http://chicago-history.r.mikatiming.de/201
     # Set age group
     br.form['search[age_class]'] = "%"
 
-    # Set number of results per page
-    br.form['num_results'] = [str(num_results_per_page)]
-
-    # Submit form
-    resp = br.submit()
+    # Submit form, probing the largest number of results per page the website returns unless a number is given
+    resp, num_requested = submit_results_form(session, br, url, year, num_results_per_page)
     
     # Retrieve selected tags via SoupStrainer
     html = resp.read()            
@@ -226,33 +901,29 @@ def scrape_chicago_marathon_urls(url='http://chicago-history.r.mikatiming.de/201
     # contain the total expected number of results
     first_list_group_item = soup.select_one('li.list-group-item').text
     total_expected_num_results = int(str.split(first_list_group_item)[0])
+    num_results_per_page = get_num_results_per_page(url, year, num_requested,
+                                                    len(soup.select('h4.type-fullname a[href]')),
+                                                    total_expected_num_results, probed=num_results_per_page is None)
     total_expected_num_pages = ceil(total_expected_num_results / num_results_per_page)
     print('Finding URLs for Year = ' + str(year) + ' and Gender = ' + str(gender))
     print('Total expected results: ' + str(total_expected_num_results))
     
-    # Define lists to store data
-    result_urls = []
-    result_cities = []
-    result_states = []
-    
     # Starting with 1 page returned since the form was submitted
     total_returned_num_pages = 1
     total_returned_num_results = 0
-    while total_returned_num_pages <= total_expected_num_pages:        
+    seen_urls = set()
+    # Note: No delay is included between pages because the current code takes longer than 1 second to complete per
+    # page. We feel that this is enough to avoid hammering the server and hogging resources.
+    for html in iter_results_pages(session, br, html, total_expected_num_pages, num_page_workers=num_page_workers):
         print('Progress: Page ' + str(total_returned_num_pages) + ' of ' + str(total_expected_num_pages), end='\r')
         if total_returned_num_pages > 1:
-            # Note: No delay is included here because the current code
-            # takes longer than 1 second to complete per page. We feel
-            # that this is enough to avoid hammering the server and hogging
-            # resources.
-                        
-            # The link with text ">" appears to always point to the next
-            # results page.
-            next_page_link = br.find_link(text='>')
-            resp = br.follow_link(next_page_link)
-            html = resp.read()
             soup = BeautifulSoup(html, "lxml", parse_only=strainer)
-        
+
+        # Define lists to store data of the current page
+        result_urls = []
+        result_cities = []
+        result_states = []
+
         # Store URLs for individual runners
         runner_links = soup.select('h4.type-fullname a[href]')
         result_per_page_count = 0
@@ -296,27 +967,58 @@ def scrape_chicago_marathon_urls(url='http://chicago-history.r.mikatiming.de/201
         total_returned_num_results += result_per_page_count
         total_returned_num_pages += 1
 
+        # Hand over the runners of this page that weren't found on an earlier page
+        yield drop_seen_runners(list(zip(result_urls, result_cities, result_states)), seen_urls)
+
         if unit_test_ind:
             break
     
     print('')
     print('URL scraping complete!')
-    
+
+
+def scrape_chicago_marathon_urls(url='http://chicago-history.r.mikatiming.de/2015/', year=2016,
+                                 event="MAR_999999107FA30900000000A1", gender='M', num_results_per_page=None,
+                                 unit_test_ind=False, session=None, num_page_workers=1):
+    """
+    Method to scrape all URLs of each Chicago Marathon runner returned from a specified web form.
+
+    Example::
+
+        scrape_chicago_marathon_urls(url='http://chicago-history.r.mikatiming.de/2015/', year=2017,
+                                          event="MAR_999999107FA30900000000A1", gender='M',
+                                          num_results_per_page=1000, unit_test_ind=True)
+
+    :param str url: URL to Chicago Marathon web form
+    :param int year: Year of marathon (supported values: 2014, 2015, 2016, 2017)
+    :param str event: Internal label used to specify the type of marathon participants (varies by year)
+    :param str gender: Gender of runner ('M' for male, 'W' for female)
+    :param int num_results_per_page: Number of results per page to request from the web form. If None, the largest
+                                     number the website returns is probed once per host and year, which minimizes the
+                                     number of results pages to walk.
+    :param bool unit_test_ind: Logical value to specify if only the first URL should be returned (True) or all (False)
+    :param SessionPool session: Pool of keep-alive connections used to fill in the web form and page through its
+                                results. If None, a new pool is used. A pool with a PageCache in replay mode reads the
+                                form and results pages from the cache only.
+    :param int num_page_workers: Number of results pages downloaded concurrently. With more than 1, the URL of every
+                                 page is derived from the first results page instead of following each page's '>'
+                                 link. Runners are returned in page order either way, without duplicates.
+    :return: DataFrame containing URLs, City, and State for all runners found in results page
+    :rtype: pandas.DataFrame
+    """
+    runners = [runner for runners_page in iter_chicago_marathon_urls(url=url, year=year, event=event, gender=gender,
+                                                                     num_results_per_page=num_results_per_page,
+                                                                     unit_test_ind=unit_test_ind, session=session,
+                                                                     num_page_workers=num_page_workers)
+               for runner in runners_page]
+
     # Combining all results into one pd.DataFrame.
-    dict_urls = {'urls': result_urls}
-    dict_city = {'city': result_cities}
-    dict_state = {'state': result_states}
-    dict_results = {}
-    for dictionary in [dict_urls, dict_city, dict_state]:
-        dict_results.update(dictionary)
-        
-    df = pd.DataFrame.from_dict(dict_results)
-    df = df.reindex(['urls', 'city', 'state'], axis='columns')
-    
+    df = pd.DataFrame(runners, columns=['urls', 'city', 'state'])
+
     return df
 
 
-def scrape_chicago_runner_details(url, gender, city, state):
+def scrape_chicago_runner_details(url, gender, city, state, session=None):
     """
     Method to scrape relevant information about a given runner in Chicago Marathon. The scraped details include:
 
@@ -353,132 +1055,101 @@ def scrape_chicago_runner_details(url, gender, city, state):
     :param str gender: Gender of runner ('M' for male, 'W' for female)
     :param str city: City specified by runner
     :param str state: State specified by runner
-    :return: DataFrame
-    :rtype: pandas.DataFrame
+    :param SessionPool session: Pool of keep-alive connections used to download the page. If None, a new
+                                mechanize.Browser is used. A pool with a PageCache in replay mode reads the page from
+                                the cache only.
+    :return: Record of the runner's details, None if the runner didn't run the marathon, or 'Connection error' if the
+             page could not be downloaded
+    :rtype: ChicagoRunner
     """
-    br = mechanize.Browser()
+    # Link to results of a single runner
+    html = fetch_runner_page(url, session)
+    if html is None:
+        return 'Connection error'
 
-    # Ignore robots.txt
-    br.set_handle_robots(False)
+    return parse_chicago_runner_details(html, gender=gender, city=city, state=state)
 
-    # Link to results of a single runner
-    # Use try/except in case of unexpected internet/URL issues
-    try:
-        br.open(url)
-    except (mechanize.HTTPError, mechanize.URLError) as e:
-        if hasattr(e, 'code'):
-            if int(e.code) == 500:
-                print('Following URL has HTTP Error 500:')
-                print(url)
-            else:
-                print('Following URL has unexpected connection issue:')
-                print(url)
-            return 'Connection error'
 
-    html = br.response().read()    
-    strainer = SoupStrainer(['tr', 'thead'])
-    soup = BeautifulSoup(html, "lxml", parse_only=strainer)
+def parse_chicago_runner_details(html, gender, city, state):
+    """
+    Method to parse the details described in `scrape_chicago_runner_details` out of a downloaded results page.
+
+    Example::
+
+        parse_chicago_runner_details(html=fetch_runner_page(url), gender='M', city='Portland', state='OR')
+
+    :param bytes html: Raw HTML of an individual runner's results page
+    :param str gender: Gender of runner ('M' for male, 'W' for female)
+    :param str city: City specified by runner
+    :param str state: State specified by runner
+    :return: Record of the runner's details, or None if the runner didn't run the marathon
+    :rtype: ChicagoRunner
+    """
+    return parsing.parse_page(html, partial(_parse_chicago_page, gender=gender, city=city, state=state))
+
 
+def _parse_chicago_page(root, gender, city, state):
+    # Read the details of a runner from their results page, scanned or parsed by parsing.parse_page
     # Only process runners having event = 'Marathon', for the purposes of this project.
     # Note: This is precautionary, as early exploration showed that non-runners were included among the results.
     # This issue no longer appears present.
-    event_name = soup.select('td.f-event_name')[0].text
+    event_name = parsing.get_info(root, 'event_name')
     if event_name != 'Marathon':
         return None
-    
+
     # Grab runner's info
-    marathon_year = int(soup.select('td.f-event_date')[0].text)
-    full_name = soup.select('td.f-__fullname')[0].text
-    age_group = soup.select('td.f-age_class')[0].text
-    bib_number = soup.select('td.f-start_no')[0].text
+    marathon_year = int(parsing.get_info(root, 'event_date'))
+    full_name = parsing.get_info(root, '__fullname')
+    age_group = parsing.get_info(root, 'age_class')
+    bib_number = parsing.get_info(root, 'start_no')
 
     # Derive country name from runner's name.
     # Modified from here:
     # https://stackoverflow.com/a/4894156/3905509
     country = convert_to_ascii(full_name[full_name.find("(")+1:full_name.find(")")])
 
-    rank_gender = soup.select('td.f-place_all')[0].text
-    rank_age_group = soup.select('td.f-place_age')[0].text
-    rank_overall = soup.select('td.f-place_nosex')[0].text
-
-    headers_index = ['year', 'bib', 'age_group', 'gender', 'city', 'state', 'country', 'overall', 'rank_gender',
-                     'rank_age_group']
-    headers = headers_index.copy()
-    cols_constant = [marathon_year, bib_number, age_group, gender, city, state, country, rank_overall, rank_gender,
-                     rank_age_group]
-    headers_splits = soup.select('thead th')
-    for header_split in headers_splits:
-        headers.append(header_split.text)
-
-    headers = [header.lower() for header in headers]    
-
-    df = pd.DataFrame(columns=headers)
-    split_string_bs4 = 'tr.f-time_'
-    splits = ['05', '10', '15', '20', '52', '25', '30', '35', '40', 'finish_netto']
-    splits_select_list = [split_string_bs4 + split for split in splits]
-    for split_select in splits_select_list:
-        splits_row = soup.select(split_select)
-
-        # Take union of text in each column of splits_row
-        splits_row_union = [cell.text for cell in splits_row]
-
-        # Expecting the 'Finish' split time to share CSS tag with 'Finish Time',
-        # which excludes other info. In this case, only keep the former data.
-        if len(splits_row_union) > 1:        
-            cols = cols_constant + splits_row_union[1].split('\n')[1:-1]
-        else:
-            cols = cols_constant + splits_row_union[0].split('\n')[1:-1]
-
-        # Convert results into a single row pd.DataFrame
-        cols = [dict(zip(headers, cols))]
-        df_row = pd.DataFrame(cols, columns=headers)
-        df = df.append(df_row)
-
-    # Reset index of dataframe since each row was individually appended
-    df.reset_index(drop=True, inplace=True)
-
-    # Only keep relevant fields
-    df = df[headers_index + ['split', 'time']]
-
-    # Convert split times into numeric seconds from strings.
-    # Modified from the following:
-    # https://stackoverflow.com/a/44445488/3905509
-    df['time'] = pd.to_timedelta(df['time']).dt.total_seconds()
-
-    # Convert split labels to lowercase
-    df['split'] = df['split'].str.lower()
-
-    # Pivot scraped data into 1 row for convenience
-    df = pd.pivot_table(
-        df,
-        index=headers_index,
-        columns='split',
-        values='time',
-        aggfunc='first'
-    ).reset_index()
-    
-    # Rename '05k' column to '5k'
-    df.rename(columns={'05k': '5k'}, inplace=True)
-    
-    # Reorder split times for convenience
-    headers = headers_index.copy() + ['5k', '10k', '15k', '20k', 'half', '25k', '30k', '35k', '40k', 'finish']
-    df = df.reindex(headers, axis='columns')
-    
-    return df
+    rank_gender = parsing.get_info(root, 'place_all')
+    rank_age_group = parsing.get_info(root, 'place_age')
+    rank_overall = parsing.get_info(root, 'place_nosex')
+
+    split_times = parsing.get_chicago_split_times(root)
 
+    # Rename '05k' split to '5k'
+    if '05k' in split_times:
+        split_times['5k'] = split_times.pop('05k')
 
-def scrape_chicago_marathon(path_input, path_output, path_error, gender, headers, df_urls=None):
+    split_labels = ['5k', '10k', '15k', '20k', 'half', '25k', '30k', '35k', '40k', 'finish']
+    return ChicagoRunner(marathon_year, bib_number, age_group, gender, city, state, country, rank_overall, rank_gender,
+                         rank_age_group, *select_split_times(split_times, split_labels))
+
+
+def _parse_chicago_row(html, row_input, gender):
+    # Rows of the Chicago input file hold the runner's URL, city and state
+    runner_input = row_input.split('|')
+    return parse_chicago_runner_details(html, gender=gender, city=runner_input[1], state=runner_input[2])
+
+
+def scrape_chicago_marathon(path_input, path_output, path_error, gender, headers, df_urls=None,
+                            num_workers=1, max_requests_per_host=None, delay=0.5, session=None,
+                            path_queue=None, url_pages=None, max_retries=3, retry_delay=1.0,
+                            circuit_breaker=None, limiter=None, num_parse_processes=None, runner_index=None,
+                            top_up=False, metrics=None, worker_id=None, lease_seconds=None):
     """
     Method to scrape all Chicago Marathon data for a given year and gender using output from
     `scrape_chicago_marathon_urls` and `scrape_chicago_runner_details`.
 
     * If running for first time, the input `df_urls` should be direct output from `scrape_chicago_marathon_urls`.
 
-    * If restarting a prior scraping run, leave `df_urls` as None or empty and specify the input caching file
-      `path_input`, which is a subset of output from `scrape_chicago_marathon_urls`.
+    * If restarting a prior scraping run, leave `df_urls` as None or empty and specify the same input caching file
+      `path_input`, which holds the output from `scrape_chicago_marathon_urls`.
+
+    On the first run, every row of `path_input` is imported into a work queue journal (`path_queue`). Each row is used
+    to scrape an individual runner's split times. The scraped data is inserted into the `path_output` file and then
+    the row is logged as completed in the journal, so a restarted run only scrapes the remaining runners. An existing
+    `path_input` file left by an older version of this method can be resumed the same way.
 
-    Each row of `path_input` is used to scrape an individual runner's split times. The scraped data is inserted into
-    the `path_output` file and then the row from `path_input` is deleted to log the completed scrape.
+    Runners can be scraped concurrently by setting `num_workers`. Runners whose page could not be downloaded are retried
+    automatically before they are logged in `path_error`.
 
     **Note**: The `headers` input is assumed to contain the same headers as returned by `scrape_chicago_runner_details`.
     If the code for this function changes, the input headers should be modified.
@@ -511,122 +1182,92 @@ def scrape_chicago_marathon(path_input, path_output, path_error, gender, headers
     :param list[str] headers: List of strings representing expected headers for scrape_chicago_runner_details.
     :param pandas.DataFrame df_urls: DataFrame containing output from scrape_chicago_marathon_urls. This should only be
                                      included when running the first scraping for that year & gender.
+    :param int num_workers: Number of runners scraped concurrently by a pool of worker threads. The default of 1
+                            matches the original serial scraping loop.
+    :param int max_requests_per_host: Politeness cap on the number of requests in flight against the results website
+                                      at any time. Defaults to num_workers.
+    :param float delay: Pause in seconds taken by each worker after scraping a runner and before its next request.
+    :param SessionPool session: Pool of keep-alive connections used to download runner pages. If None, a pool is
+                                created for the duration of the run. Pass a pool with a PageCache to cache the pages,
+                                or to scrape them again offline in replay mode.
+    :param str path_queue: Path of the work queue journal tracking which rows of path_input have been scraped.
+                           Defaults to path_input with its extension replaced by '.sqlite'.
+    :param url_pages: Output of `iter_chicago_marathon_urls`. If given, runners are added to the journal one results
+                      page at a time and scraped while the following pages are still being walked, instead of waiting
+                      for the whole df_urls. df_urls and path_input are then ignored, other than naming the journal.
+    :param int max_retries: Number of times a runner whose page could not be downloaded is retried, with a growing
+                            delay, before it is logged in path_error. Runners logged in path_error, including by earlier
+                            runs, are retried once more at the end of the run.
+    :param float retry_delay: Wait in seconds before the first retry of a runner, doubled with each retry
+    :param CircuitBreaker circuit_breaker: Breaker pausing every request to the results website after repeated
+                                           failures, e.g. HTTP 500 errors under load. If None, a breaker with default
+                                           settings is used.
+    :param AdaptiveLimiter limiter: Controller tuning the number of requests in flight against the results website from
+                                    its latencies and errors, up to its ceiling. The level it chose is printed at the
+                                    end of the run. If None, max_requests_per_host is used as a fixed bound.
+    :param int num_parse_processes: Number of processes parsing the downloaded runner pages, while worker threads keep
+                                    downloading. If None, each worker thread parses the pages it downloads.
+    :param RunnerIndex runner_index: Index of runners already scraped, which are skipped. The runners of path_output
+                                     and of the journal are always added to it. If None, a new index is used.
+    :param bool top_up: If True, runners of path_input (or url_pages) missing from an existing journal are added to
+                        it and scraped, e.g. after the results of a year are amended. Runners already in path_output
+                        are not scraped or written again.
+    :param ScrapeMetrics metrics: Metrics of the run, appended to its JSONL run log and served to Prometheus if
+                                  enabled (see `ScrapeMetrics`). If None, throughput and latencies are only printed.
+    :param str worker_id: Name of this worker when several processes or hosts scrape the same job from one journal on
+                          a shared disk, e.g. `get_worker_id()`. Each worker claims leased batches of runners and writes
+                          its own output and error files, merged into path_output once the journal is finished. If
+                          None, the journal is used by this process only.
+    :param float lease_seconds: Seconds runners claimed by a worker sharing the journal are held before other workers
+                                can claim them, e.g. after the worker crashed. Live workers renew their leases.
     """
-    # Assume headers is a list. Convert it to a flattened string.
-    headers = '|'.join(headers) + '\n'
-    
-    # Check if the expected input file of URLs exists or not.
-    check_file_input = os.path.isfile(path_input)    
-    
-    # Export df_urls if the input file doesn't exist, i.e., starting from scratch
-    if not check_file_input and df_urls is not None:
-        df_urls.to_csv(path_input, header=False, index=False, sep='|')
-
-        len_input = row_count_csv(path_input)
-        
-        # Need to remove blank line created by Pandas for Windows machines
-        # See the following link for details:
-        # https://github.com/pandas-dev/pandas/issues/20353#issuecomment-392302201
-        if sys.platform == 'win32' and len_input > 1:
-            delete_last_line_csv(path_input) 
-    else:
-        len_input = row_count_csv(path_input)
-
-    # Check if expected output file of scraped data exists or not
-    check_file_output = os.path.isfile(path_output)
-    
-    # Create output file and append expected header row if it doesn't exist.
-    if not check_file_output:
-        with open(path_output, 'w', encoding="utf-8") as output_file:
-            output_file.write(headers)
-
-    # Check if expected error log exists or not
-    check_file_error = os.path.isfile(path_error)
-    # Create output file and append expected header row if it doesn't exist.
-    if not check_file_error:
-        with open(path_error, 'w', encoding="utf-8") as error_file:
-            error_file.write('failed_urls\n')
-    
-    print('Starting to scrape Chicago Marathon split times...')
-    scrape_count = 0
-    while os.stat(path_input).st_size > 0:        
-        # Grab last line of input file and scrape its associated data
-        row_input = get_last_line_csv(path_input).strip()
-        runner_input = row_input.split('|')
-        url_input = runner_input[0]
-        city_input = runner_input[1]
-        state_input = runner_input[2]
-        
-        runner_output = scrape_chicago_runner_details(
-            url=url_input,
-            gender=gender,
-            city=city_input,
-            state=state_input
-        )
-        
-        # Handle cases where scrape_chicago_runner_details returns none. Remove the input record and continues,
-        # assuming the record is not relevant for this analysis.
-        if runner_output is None:
-            delete_last_line_csv(path_input)            
-            sleep(0.5)
-            print('Reducing total number of runners...')
-            len_input -= 1
-            continue
-        
-        # Handle cases where scrape_chicago_runner_details has a connection issue. Often, these are random and could be
-        # retried later. The current path_input row is appended to an error log.
-        if type(runner_output).__name__ == 'str' and runner_output == 'Connection error':            
-            with open(path_error, 'a', encoding="utf-8") as error_file:
-                error_file.write(row_input)
-                error_file.write('\n')
-            delete_last_line_csv(path_input)
-            sleep(0.5)
-            print('Reducing total number of runners...')
-            len_input -= 1
-            continue
-        
-        output_string = re.sub(' +', '|', runner_output.to_string(header=False, index=False))[1:] + '\n'
-
-        # Append scraped data to the output file path_output
-        with open(path_output, 'a', encoding="utf-8") as output_file:
-            output_file.write(output_string)
-
-        delete_last_line_csv(path_input)
-        scrape_count += 1
-        print('Progress: ' + str(scrape_count) + ' of ' + str(len_input), end='\r')
-        sleep(0.5)
-    
-    print('')
-    print('Scraping of split times complete!')
+    _scrape_marathon(path_input=path_input, path_output=path_output, path_error=path_error, headers=headers,
+                     df_urls=df_urls, marathon_name='Chicago',
+                     parse_row=partial(_parse_chicago_row, gender=gender),
+                     num_workers=num_workers,
+                     max_requests_per_host=max_requests_per_host, delay=delay, session=session,
+                     path_queue=path_queue, url_pages=url_pages, max_retries=max_retries, retry_delay=retry_delay,
+                     circuit_breaker=circuit_breaker, limiter=limiter, num_parse_processes=num_parse_processes,
+                     runner_index=runner_index, top_up=top_up, metrics=metrics, worker_id=worker_id,
+                     lease_seconds=lease_seconds)
 
 
 # London
-def scrape_london_marathon_urls(url, event='MAS', year=2017, gender='M', num_results_per_page=1000,
-                                unit_test_ind=False):
+def iter_london_marathon_urls(url, event='MAS', year=2017, gender='M', num_results_per_page=None,
+                               unit_test_ind=False, session=None, num_page_workers=1):
     """
-    Method to scrape all URLs of each London Marathon runner returned from a specified web form::
+    Generator to scrape the URLs of each London Marathon runner returned from a specified web form, one results page
+    at a time. Each page's runners are yielded as soon as the page is parsed, so they can be scraped while the next
+    pages are still being downloaded::
 
-        scrape_london_marathon_urls(url='http://results-2017.virginmoneylondonmarathon.com/2017/',
-                                         event='MAS', year=2017, gender='M', num_results_per_page=1000,
-                                         unit_test_ind=True)
+        for runners in iter_london_marathon_urls(url='http://results-2017.virginmoneylondonmarathon.com/2017/',
+                                                 event='MAS', year=2017, gender='M'):
+            ...
 
     :param str url: URL to London Marathon web form
     :param str event: Internal label used to specify the type of marathon participants (varies by year)
     :param int year: Year of marathon (supported values: 2014, 2015, 2016, 2017)
     :param str gender: Gender of runner ('M' for male, 'W' for female)
-    :param int num_results_per_page: Number of results per page to return from the web form (use default value only)
+    :param int num_results_per_page: Number of results per page to request from the web form. If None, the largest
+                                     number the website returns is probed once per host and year, which minimizes the
+                                     number of results pages to walk.
     :param bool unit_test_ind: Logical value to specify if only the first URL should be returned (True) or all (False)
-    :return: DataFrame containing URLs for all runners found in results page
-    :rtype: pandas.DataFrame
+    :param SessionPool session: Pool of keep-alive connections used to fill in the web form and page through its
+                                results. If None, a new pool is used. A pool with a PageCache in replay mode reads the
+                                form and results pages from the cache only.
+    :param int num_page_workers: Number of results pages downloaded concurrently. With more than 1, the URL of every
+                                 page is derived from the first results page instead of following each page's '>'
+                                 link. Runners are returned in page order either way, without duplicates.
+    :return: Generator of lists of (URL,) tuples, one list per results page
+    :rtype: generator
     """
-    # Setup backend browser via mechanize package
-    br = mechanize.Browser()
-
-    # Ignore robots.txt
+    # Setup backend browser via mechanize package. Browsers created by SessionPool ignore robots.txt.
     # Note: I have not found any notice on the London Marathon website that prohibits web scraping.
-    br.set_handle_robots(False)
+    if session is None:
+        session = SessionPool()
+    br = session.browser()
         
-    br.open(url)
+    br.set_response(session.open(url))
 
     # Select the overall results, not individual runner results
     br.select_form(nr=1)
@@ -640,11 +1281,8 @@ def scrape_london_marathon_urls(url, event='MAS', year=2017, gender='M', num_res
     # Set age group
     br.form['search[age_class]'] = "%"
 
-    # Set number of results per page
-    br.form['num_results'] = [str(num_results_per_page)]
-
-    # Submit form
-    resp = br.submit()
+    # Submit form, probing the largest number of results per page the website returns unless a number is given
+    resp, num_requested = submit_results_form(session, br, url, year, num_results_per_page)
     
     # Use bs4 package to find expected number of total results to facilitate retrieving URLs.
     html = resp.read()
@@ -652,28 +1290,26 @@ def scrape_london_marathon_urls(url, event='MAS', year=2017, gender='M', num_res
 
     num_results_div = soup.find_all('div', {'class': 'list-info-text'})[0]
     total_expected_num_results = int(str.split(num_results_div.text)[0])
+    num_results_per_page = get_num_results_per_page(url, year, num_requested, len(soup.find('tbody').find_all('tr')),
+                                                    total_expected_num_results, probed=num_results_per_page is None)
     total_expected_num_pages = ceil(total_expected_num_results / num_results_per_page)
     print('Finding URLs for Year = ' + str(year) + ' and Gender = ' + str(gender))
     print('Total expected results: ' + str(total_expected_num_results))
     
-    # Define lists to store data
-    result_urls = []
-    
     # Starting with 1 page returned since the form was submitted
     total_returned_num_pages = 1
     total_returned_num_results = 0
-    while total_returned_num_pages <= total_expected_num_pages:        
+    seen_urls = set()
+    # Note: No delay is included between pages because the current code takes longer than 1 second to complete per
+    # page. We feel that this is enough to avoid hammering the server and hogging resources.
+    for html in iter_results_pages(session, br, html, total_expected_num_pages, num_page_workers=num_page_workers):
         print('Progress: Page ' + str(total_returned_num_pages) + ' of ' + str(total_expected_num_pages), end='\r')
         if total_returned_num_pages > 1:
-            # Note: No delay is included here because the current code takes longer than 1 second to complete per page.
-            # We feel that this is enough to avoid hammering the server and hogging resources.
-            
-            # The link with text ">" appears to always point to the next results page.
-            next_page_link = br.find_link(text='>')
-            resp = br.follow_link(next_page_link)
-            html = resp.read()
             soup = BeautifulSoup(html, "html.parser")            
 
+        # Define list to store data of the current page
+        result_urls = []
+
         results_table = soup.find('tbody').find_all('tr')
         result_per_page_count = 0
         for results_row in results_table:
@@ -686,18 +1322,54 @@ def scrape_london_marathon_urls(url, event='MAS', year=2017, gender='M', num_res
 
         total_returned_num_results += result_per_page_count                                        
         total_returned_num_pages += 1
+
+        # Hand over the runners of this page that weren't found on an earlier page
+        yield drop_seen_runners([(result_url,) for result_url in result_urls], seen_urls)
+
         if unit_test_ind:
             break
     
     print('')
     print('URL scraping complete!')
-    dict_urls = {'urls': result_urls}        
-    df = pd.DataFrame.from_dict(dict_urls)
-    
+
+
+def scrape_london_marathon_urls(url, event='MAS', year=2017, gender='M', num_results_per_page=None,
+                                unit_test_ind=False, session=None, num_page_workers=1):
+    """
+    Method to scrape all URLs of each London Marathon runner returned from a specified web form::
+
+        scrape_london_marathon_urls(url='http://results-2017.virginmoneylondonmarathon.com/2017/',
+                                         event='MAS', year=2017, gender='M', num_results_per_page=1000,
+                                         unit_test_ind=True)
+
+    :param str url: URL to London Marathon web form
+    :param str event: Internal label used to specify the type of marathon participants (varies by year)
+    :param int year: Year of marathon (supported values: 2014, 2015, 2016, 2017)
+    :param str gender: Gender of runner ('M' for male, 'W' for female)
+    :param int num_results_per_page: Number of results per page to request from the web form. If None, the largest
+                                     number the website returns is probed once per host and year, which minimizes the
+                                     number of results pages to walk.
+    :param bool unit_test_ind: Logical value to specify if only the first URL should be returned (True) or all (False)
+    :param SessionPool session: Pool of keep-alive connections used to fill in the web form and page through its
+                                results. If None, a new pool is used. A pool with a PageCache in replay mode reads the
+                                form and results pages from the cache only.
+    :param int num_page_workers: Number of results pages downloaded concurrently. With more than 1, the URL of every
+                                 page is derived from the first results page instead of following each page's '>'
+                                 link. Runners are returned in page order either way, without duplicates.
+    :return: DataFrame containing URLs for all runners found in results page
+    :rtype: pandas.DataFrame
+    """
+    runners = [runner for runners_page in iter_london_marathon_urls(url=url, event=event, year=year, gender=gender,
+                                                                    num_results_per_page=num_results_per_page,
+                                                                    unit_test_ind=unit_test_ind, session=session,
+                                                                    num_page_workers=num_page_workers)
+               for runner in runners_page]
+    df = pd.DataFrame(runners, columns=['urls'])
+
     return df
 
 
-def scrape_london_runner_details(url, year, gender):
+def scrape_london_runner_details(url, year, gender, session=None):
     """
     Method to scrape relevant information about a given runner in London Marathon. The scraped details include:
 
@@ -730,122 +1402,101 @@ def scrape_london_runner_details(url, year, gender):
     :param str url: URL for an individual runner's results
     :param int year: Year of marathon (supported values: 2014, 2015, 2016, 2017)
     :param str gender: Gender of runner ('M' for male, 'W' for female)
-    :return: DataFrame
-    :rtype: pandas.DataFrame
+    :param SessionPool session: Pool of keep-alive connections used to download the page. If None, a new
+                                mechanize.Browser is used. A pool with a PageCache in replay mode reads the page from
+                                the cache only.
+    :return: Record of the runner's details, None if the runner has no split data, or 'Connection error' if the page
+             could not be downloaded
+    :rtype: LondonRunner
     """
-    br = mechanize.Browser()
+    # Link to results of a single runner
+    html = fetch_runner_page(url, session)
+    if html is None:
+        return 'Connection error'
 
-    # Ignore robots.txt
-    br.set_handle_robots(False)
+    return parse_london_runner_details(html, year=year, gender=gender)
 
-    # Link to results of a single runner. Use try/except in case of unexpected internet/URL issues.
-    try:
-        br.open(url)
-    except (mechanize.HTTPError, mechanize.URLError) as e:
-        if hasattr(e, 'code'):
-            if int(e.code) == 500:
-                print('Following URL has HTTP Error 500:')
-                print(url)
-            else:
-                print('Following URL has unexpected connection issue:')
-                print(url)
-            return 'Connection error'
 
-    html = br.response().read()
-    soup = BeautifulSoup(html, "html.parser")
+def parse_london_runner_details(html, year, gender):
+    """
+    Method to parse the details described in `scrape_london_runner_details` out of a downloaded results page.
+
+    Example::
+
+        parse_london_runner_details(html=fetch_runner_page(url), year=2017, gender='M')
+
+    :param bytes html: Raw HTML of an individual runner's results page
+    :param int year: Year of marathon (supported values: 2014, 2015, 2016, 2017)
+    :param str gender: Gender of runner ('M' for male, 'W' for female)
+    :return: Record of the runner's details, or None if the runner has no split data
+    :rtype: LondonRunner
+    """
+    return parsing.parse_page(html, partial(_parse_london_page, year=year, gender=gender))
+
+
+def _parse_london_page(root, year, gender):
+    # Read the details of a runner from their results page, scanned or parsed by parsing.parse_page
+    age_group = parsing.get_info(root, 'age_class')
+    bib_number = parsing.get_info(root, 'start_no_text')
+    full_name = parsing.get_info(root, '__fullname')
 
-    age_group = soup.find_all('td', {'class': 'f-age_class'})[0].text
-    bib_number = soup.find_all('td', {'class': 'f-start_no_text'})[0].text
-    full_name = soup.find_all('td', {'class': 'f-__fullname'})[0].text
-    
     # Modified from here:
     # https://stackoverflow.com/a/4894156/3905509
     country = convert_to_ascii(full_name[full_name.find("(")+1:full_name.find(")")])
 
-    rank_gender = soup.find_all('td', {'class': 'f-place_all'})[0].text
-    rank_age_group = soup.find_all('td', {'class': 'f-place_age'})[0].text
-    rank_overall = soup.find_all('td', {'class': 'f-place_nosex'})[0].text
+    rank_gender = parsing.get_info(root, 'place_all')
+    rank_age_group = parsing.get_info(root, 'place_age')
+    rank_overall = parsing.get_info(root, 'place_nosex')
 
     # Some runners have no split data at all. This can be found when the total number of "table" tabs is not equal to 5.
     # The expected split table is the 4th table when there are 5 total tables.
-    splits_table = soup.find_all('table', {'class': 'list-table'})
+    splits_table = parsing.get_list_tables(root)
     if len(splits_table) != 5:
         return None
     else:
         splits_table = splits_table[3]
 
-    headers_index = ['year', 'bib', 'age_group', 'gender', 'country', 'overall', 'rank_gender', 'rank_age_group']
-    headers = headers_index.copy()
-    cols_constant = [year, bib_number, age_group, gender, country, rank_overall, rank_gender, rank_age_group]
-    for header_name in splits_table.find_all('tr')[0]:
-        if type(header_name) is not bs4.element.NavigableString:        
-            headers.append(header_name.get_text())
-
-    # Ensure headers are lowercase for downstream convention
-    headers = [header.lower() for header in headers]
-
-    # Populate data
-    df = pd.DataFrame(columns=headers)
-    for split_row in splits_table.find_all('tr'):    
-        split_row_name = split_row.find_all('th')[0].text
-        cols = split_row.find_all('td')
-        cols = cols_constant + [split_row_name] + [cell.text.strip() for cell in cols]    
-        cols = [dict(zip(headers, cols))]
-        df_row = pd.DataFrame(cols, columns=headers)
-        # First element of split_row contains metadata that we don't want to scrap.
-        if split_row_name != 'Split':
-            df = df.append(df_row)
-
-    # Reset index of dataframe since each row was individually appended.
-    df.reset_index(drop=True, inplace=True)
-
-    # Only keep relevant fields
-    df = df[headers_index + ['split', 'time']]
-
-    # Convert split times into numeric seconds from strings.
-    # Modified from the following:
-    # https://stackoverflow.com/a/44445488/3905509
-    df['time'] = pd.to_timedelta(df['time']).dt.total_seconds()
-
-    # Convert split labels to lowercase
-    df['split'] = df['split'].str.lower()
-
-    # Pivot scraped data into 1 row for convenience
-    df = pd.pivot_table(
-        df,
-        index=headers_index,
-        columns='split',
-        values='time',
-        aggfunc='first'
-    ).reset_index()
-
-    # Rename '05k' column to '5k'
-    df.rename(columns={'05k': '5k'}, inplace=True)
+    split_times = parsing.get_table_split_times(splits_table, time_headers=['time'])
+
+    # Rename '05k' split to '5k'
+    if '05k' in split_times:
+        split_times['5k'] = split_times.pop('05k')
 
     # Reorder split times for convenience
     if year == 2014:
-        headers_splits = ['5k', '10k', '15k', '20k', 'half', '25k', '30k', '35k', '40k', 'finish time']
+        split_labels = ['5k', '10k', '15k', '20k', 'half', '25k', '30k', '35k', '40k', 'finish time']
     else:
-        headers_splits = ['5k', '10k', '15k', '20k', 'half', '25k', '30k', '35k', '40k', 'finish']
-    
-    headers = headers_index.copy() + headers_splits
-    df = df.reindex(headers, axis='columns')
+        split_labels = ['5k', '10k', '15k', '20k', 'half', '25k', '30k', '35k', '40k', 'finish']
 
-    return df
+    return LondonRunner(year, bib_number, age_group, gender, country, rank_overall, rank_gender, rank_age_group,
+                        *select_split_times(split_times, split_labels))
 
 
-def scrape_london_marathon(path_input, path_output, path_error, year, gender, headers, df_urls=None):
+def _parse_london_row(html, row_input, year, gender):
+    return parse_london_runner_details(html, year=year, gender=gender)
+
+
+def scrape_london_marathon(path_input, path_output, path_error, year, gender, headers, df_urls=None,
+                           num_workers=1, max_requests_per_host=None, delay=0.5, session=None,
+                           path_queue=None, url_pages=None, max_retries=3, retry_delay=1.0,
+                           circuit_breaker=None, limiter=None, num_parse_processes=None, runner_index=None,
+                           top_up=False, metrics=None, worker_id=None, lease_seconds=None):
     """
     Method to scrape all London Marathon data for a given year and gender using output from
     `scrape_london_marathon_urls` and `scrape_london_runner_details`.
 
     * If running for first time, the input `df_urls` should be direct output from `scrape_london_marathon_urls`.
 
-    * If restarting a prior scraping run, leave `df_urls` as None or empty and specify the input caching file
-      `path_input`, which is a subset of output from `scrape_london_marathon_urls`.
+    * If restarting a prior scraping run, leave `df_urls` as None or empty and specify the same input caching file
+      `path_input`, which holds the output from `scrape_london_marathon_urls`.
+
+    On the first run, every row of `path_input` is imported into a work queue journal (`path_queue`). Each row is used
+    to scrape an individual runner's split times. The scraped data is inserted into the `path_output` file and then
+    the row is logged as completed in the journal, so a restarted run only scrapes the remaining runners. An existing
+    `path_input` file left by an older version of this method can be resumed the same way.
 
-    Each row of `path_input` is used to scrape an individual runner's split times. The scraped data is inserted into
-    the `path_output` file and then the row from `path_input` is deleted to log the completed scrape.
+    Runners can be scraped concurrently by setting `num_workers`. Runners whose page could not be downloaded are retried
+    automatically before they are logged in `path_error`.
 
     **Note**: The `headers` input is assumed to contain the same headers as returned by `scrape_london_runner_details`.
     If the code for this function changes, the input headers should be modified.
@@ -882,119 +1533,91 @@ def scrape_london_marathon(path_input, path_output, path_error, year, gender, he
     :param list[str] headers: List of strings representing expected headers for scrape_london_runner_details.
     :param pandas.DataFrame df_urls: DataFrame containing output from scrape_london_marathon_urls. This should only be
                                      included when running the first scraping for that year & gender.
+    :param int num_workers: Number of runners scraped concurrently by a pool of worker threads. The default of 1
+                            matches the original serial scraping loop.
+    :param int max_requests_per_host: Politeness cap on the number of requests in flight against the results website
+                                      at any time. Defaults to num_workers.
+    :param float delay: Pause in seconds taken by each worker after scraping a runner and before its next request.
+    :param SessionPool session: Pool of keep-alive connections used to download runner pages. If None, a pool is
+                                created for the duration of the run. Pass a pool with a PageCache to cache the pages,
+                                or to scrape them again offline in replay mode.
+    :param str path_queue: Path of the work queue journal tracking which rows of path_input have been scraped.
+                           Defaults to path_input with its extension replaced by '.sqlite'.
+    :param url_pages: Output of `iter_london_marathon_urls`. If given, runners are added to the journal one results
+                      page at a time and scraped while the following pages are still being walked, instead of waiting
+                      for the whole df_urls. df_urls and path_input are then ignored, other than naming the journal.
+    :param int max_retries: Number of times a runner whose page could not be downloaded is retried, with a growing
+                            delay, before it is logged in path_error. Runners logged in path_error, including by earlier
+                            runs, are retried once more at the end of the run.
+    :param float retry_delay: Wait in seconds before the first retry of a runner, doubled with each retry
+    :param CircuitBreaker circuit_breaker: Breaker pausing every request to the results website after repeated
+                                           failures, e.g. HTTP 500 errors under load. If None, a breaker with default
+                                           settings is used.
+    :param AdaptiveLimiter limiter: Controller tuning the number of requests in flight against the results website from
+                                    its latencies and errors, up to its ceiling. The level it chose is printed at the
+                                    end of the run. If None, max_requests_per_host is used as a fixed bound.
+    :param int num_parse_processes: Number of processes parsing the downloaded runner pages, while worker threads keep
+                                    downloading. If None, each worker thread parses the pages it downloads.
+    :param RunnerIndex runner_index: Index of runners already scraped, which are skipped. The runners of path_output
+                                     and of the journal are always added to it. If None, a new index is used.
+    :param bool top_up: If True, runners of path_input (or url_pages) missing from an existing journal are added to
+                        it and scraped, e.g. after the results of a year are amended. Runners already in path_output
+                        are not scraped or written again.
+    :param ScrapeMetrics metrics: Metrics of the run, appended to its JSONL run log and served to Prometheus if
+                                  enabled (see `ScrapeMetrics`). If None, throughput and latencies are only printed.
+    :param str worker_id: Name of this worker when several processes or hosts scrape the same job from one journal on
+                          a shared disk, e.g. `get_worker_id()`. Each worker claims leased batches of runners and writes
+                          its own output and error files, merged into path_output once the journal is finished. If
+                          None, the journal is used by this process only.
+    :param float lease_seconds: Seconds runners claimed by a worker sharing the journal are held before other workers
+                                can claim them, e.g. after the worker crashed. Live workers renew their leases.
     """
-    # Assume headers is a list. Convert it to a flattened string.
-    headers = '|'.join(headers) + '\n'
-    
-    # Check if the expected input file of URLs exists or not
-    check_file_input = os.path.isfile(path_input)
-    
-    # Export df_urls if the input file doesn't exist, i.e., starting from scratch.
-    if not check_file_input and df_urls is not None:
-        df_urls.to_csv(path_input, header=False, index=False, sep='|')
-
-        len_input = row_count_csv(path_input)
-
-        # Need to remove blank line created by Pandas for Windows machines
-        # See the following link for details:
-        # https://github.com/pandas-dev/pandas/issues/20353#issuecomment-392302201
-        if sys.platform == 'win32' and len_input > 1:
-            delete_last_line_csv(path_input)
-    else:
-        len_input = row_count_csv(path_input)
-        
-    # Check if expected output file of scraped data exists or not.
-    check_file_output = os.path.isfile(path_output)
-    
-    # Create output file and append expected header row if it doesn't exist.
-    if not check_file_output:
-        with open(path_output, 'w', encoding="utf-8") as output_file:
-            output_file.write(headers)
-
-    # Check if expected error log exists or not
-    check_file_error = os.path.isfile(path_error)
-    
-    # Create output file and append expected header row if it doesn't exist.
-    if not check_file_error:
-        with open(path_error, 'w', encoding="utf-8") as error_file:
-            error_file.write('failed_urls\n')
-            
-    len_input = row_count_csv(path_input) 
-    
-    print('Starting to scrape London Marathon split times...')
-    scrape_count = 0
-    while os.stat(path_input).st_size > 0:        
-        # Grab last line of input file and scrape its associated data
-        row_input = get_last_line_csv(path_input).strip()
-        
-        runner_output = scrape_london_runner_details(
-            url=row_input,
-            year=year,
-            gender=gender
-        )
-        
-        # Handle cases where scrape_london_runner_details returns None, which occur when a runner's details page
-        # excludes split times.
-        if runner_output is None:
-            delete_last_line_csv(path_input)
-            sleep(0.5)
-            print('Runner has no split times.')
-            print('Reducing total number of runners...')
-            len_input -= 1
-            continue
-        
-        # Handle cases where scrape_london_runner_details has a connection issue. Often, these are random and could be
-        # retried later. The current path_input row is appended to an error log.
-        if type(runner_output).__name__ == 'str' and runner_output == 'Connection error':            
-            with open(path_error, 'a', encoding="utf-8") as error_file:
-                error_file.write(row_input)
-                error_file.write('\n')
-            delete_last_line_csv(path_input)
-            sleep(0.5)
-            print('Reducing total number of runners...')
-            len_input -= 1
-            continue
-        
-        output_string = re.sub(' +', '|', runner_output.to_string(header=False, index=False))[1:] + '\n'
-
-        # Append scraped data to the output file path_output
-        with open(path_output, 'a', encoding="utf-8") as output_file:
-            output_file.write(output_string)
-
-        delete_last_line_csv(path_input)
-        scrape_count += 1
-        print('Progress: ' + str(scrape_count) + ' of ' + str(len_input), end='\r')
-        sleep(0.5)
-    
-    print('')
-    print('Scraping of split times complete!')
-
-
-def scrape_berlin_marathon_urls(url, event='MAL', year=2017, gender='M', num_results_per_page=100, unit_test_ind=False):
+    _scrape_marathon(path_input=path_input, path_output=path_output, path_error=path_error, headers=headers,
+                     df_urls=df_urls, marathon_name='London',
+                     parse_row=partial(_parse_london_row, year=year, gender=gender),
+                     num_workers=num_workers,
+                     max_requests_per_host=max_requests_per_host, delay=delay, session=session,
+                     path_queue=path_queue, url_pages=url_pages, max_retries=max_retries, retry_delay=retry_delay,
+                     circuit_breaker=circuit_breaker, limiter=limiter, num_parse_processes=num_parse_processes,
+                     runner_index=runner_index, top_up=top_up, metrics=metrics, worker_id=worker_id,
+                     lease_seconds=lease_seconds)
+
+
+def iter_berlin_marathon_urls(url, event='MAL', year=2017, gender='M', num_results_per_page=None,
+                              unit_test_ind=False, session=None, num_page_workers=1):
     """
-    Method to scrape all URLs of each Berlin Marathon runner returned from a specified web form::
+    Generator to scrape the URLs of each Berlin Marathon runner returned from a specified web form, one results page at
+    a time. Each page's runners are yielded as soon as the page is parsed, so they can be scraped while the next pages
+    are still being downloaded::
 
-        scrape_berlin_marathon_urls(url='http://results.scc-events.com/2016/',
-                                         event='MAL_99999905C9AF3F0000000945', year=2016, gender='M',
-                                         num_results_per_page=100, unit_test_ind=True)
+        for runners in iter_berlin_marathon_urls(url='http://results.scc-events.com/2016/',
+                                                 event='MAL_99999905C9AF3F0000000945', year=2016, gender='M'):
+            ...
 
     :param str url: URL to Berlin Marathon web form
     :param str event: Internal label used to specify the type of marathon participants (varies by year)
     :param int year: Year of marathon (supported values: 2014, 2015, 2016, 2017)
     :param str gender: Gender of runner ('M' for male, 'W' for female)
-    :param int num_results_per_page: Number of results per page to return from the web form (use default value only)
+    :param int num_results_per_page: Number of results per page to request from the web form. If None, the largest
+                                     number the website returns is probed once per host and year, which minimizes the
+                                     number of results pages to walk.
     :param bool unit_test_ind: Logical value to specify if only the first URL should be returned (True) or all (False)
-    :return: DataFrame containing URLs for all runners found in results page
-    :rtype: pandas.DataFrame
+    :param SessionPool session: Pool of keep-alive connections used to fill in the web form and page through its
+                                results. If None, a new pool is used. A pool with a PageCache in replay mode reads the
+                                form and results pages from the cache only.
+    :param int num_page_workers: Number of results pages downloaded concurrently. With more than 1, the URL of every
+                                 page is derived from the first results page instead of following each page's '>'
+                                 link. Runners are returned in page order either way, without duplicates.
+    :return: Generator of lists of (URL,) tuples, one list per results page
+    :rtype: generator
     """
-    # Setup backend browser via mechanize package
-    br = mechanize.Browser()
-
-    # Ignore robots.txt
-    # Note: I have not found any notice on the London Marathon website that prohibits web scraping.
-    br.set_handle_robots(False)
+    # Setup backend browser via mechanize package. Browsers created by SessionPool ignore robots.txt.
+    # Note: I have not found any notice on the Berlin Marathon website that prohibits web scraping.
+    if session is None:
+        session = SessionPool()
+    br = session.browser()
         
-    br.open(url)
+    br.set_response(session.open(url))
 
     # Select the overall results, not individual runner results
     br.select_form(nr=1)
@@ -1014,11 +1637,8 @@ def scrape_berlin_marathon_urls(url, event='MAL', year=2017, gender='M', num_res
     else:
         br.form['ageclass'] = [""]        
 
-    # Set number of results per page
-    br.form['num_results'] = [str(num_results_per_page)]
-
-    # Submit form
-    resp = br.submit()
+    # Submit form, probing the largest number of results per page the website returns unless a number is given
+    resp, num_requested = submit_results_form(session, br, url, year, num_results_per_page)
     
     # Use bs4 package to find expected number of total results to facilitate retrieving URLs
     html = resp.read()
@@ -1027,24 +1647,22 @@ def scrape_berlin_marathon_urls(url, event='MAL', year=2017, gender='M', num_res
     # The first instance of ul with class = list-group appears to always contain the total expected number of results.
     num_results_div = soup.find_all('div', {'class': 'pages'})[0]
     total_expected_num_pages = int(num_results_div.find_all('a')[-2].text)
+    # A single page holds every result, however many were requested
+    num_returned = len(soup.find('tbody').find_all('tr'))
+    get_num_results_per_page(url, year, num_requested, num_returned,
+                             num_requested * total_expected_num_pages if total_expected_num_pages > 1 else num_returned,
+                             probed=num_results_per_page is None)
     print('Finding URLs for Year = ' + str(year) + ' and Gender = ' + str(gender))
     
-    # Define lists to store data
-    result_urls = []
-    
     # Starting with 1 page returned since the form was submitted
     total_returned_num_pages = 1
     total_returned_num_results = 0
-    while total_returned_num_pages <= total_expected_num_pages:        
+    seen_urls = set()
+    # Note: No delay is included between pages because the current code takes longer than 1 second to complete per
+    # page. We feel that this is enough to avoid hammering the server and hogging resources.
+    for html in iter_results_pages(session, br, html, total_expected_num_pages, num_page_workers=num_page_workers):
         print('Progress: Page ' + str(total_returned_num_pages) + ' of ' + str(total_expected_num_pages), end='\r')
         if total_returned_num_pages > 1:
-            # Note: No delay is included here because the current code takes longer than 1 second to complete per page.
-            # We feel that this is enough to avoid hammering the server and hogging resources.
-            
-            # The link with text ">" appears to always point to the next results page.
-            next_page_link = br.find_link(text='>')
-            resp = br.follow_link(next_page_link)
-            html = resp.read()
             soup = BeautifulSoup(html, "html.parser")
 
         result_per_page_urls = []
@@ -1059,24 +1677,57 @@ def scrape_berlin_marathon_urls(url, event='MAL', year=2017, gender='M', num_res
             if unit_test_ind:
                 break
             
-        # Store URLs
-        result_urls.extend(result_per_page_urls)
-        
         total_returned_num_results += result_per_page_count                                        
         total_returned_num_pages += 1
+
+        # Hand over the runners of this page that weren't found on an earlier page
+        yield drop_seen_runners([(result_url,) for result_url in result_per_page_urls], seen_urls)
+
         if unit_test_ind:
             break
     
     print('')
     print(str(total_returned_num_results) + ' results returned.')
     print('URL scraping complete!')
-    dict_urls = {'urls': result_urls}        
-    df = pd.DataFrame.from_dict(dict_urls)
-    
+
+
+def scrape_berlin_marathon_urls(url, event='MAL', year=2017, gender='M', num_results_per_page=None,
+                                unit_test_ind=False, session=None, num_page_workers=1):
+    """
+    Method to scrape all URLs of each Berlin Marathon runner returned from a specified web form::
+
+        scrape_berlin_marathon_urls(url='http://results.scc-events.com/2016/',
+                                         event='MAL_99999905C9AF3F0000000945', year=2016, gender='M',
+                                         num_results_per_page=100, unit_test_ind=True)
+
+    :param str url: URL to Berlin Marathon web form
+    :param str event: Internal label used to specify the type of marathon participants (varies by year)
+    :param int year: Year of marathon (supported values: 2014, 2015, 2016, 2017)
+    :param str gender: Gender of runner ('M' for male, 'W' for female)
+    :param int num_results_per_page: Number of results per page to request from the web form. If None, the largest
+                                     number the website returns is probed once per host and year, which minimizes the
+                                     number of results pages to walk.
+    :param bool unit_test_ind: Logical value to specify if only the first URL should be returned (True) or all (False)
+    :param SessionPool session: Pool of keep-alive connections used to fill in the web form and page through its
+                                results. If None, a new pool is used. A pool with a PageCache in replay mode reads the
+                                form and results pages from the cache only.
+    :param int num_page_workers: Number of results pages downloaded concurrently. With more than 1, the URL of every
+                                 page is derived from the first results page instead of following each page's '>'
+                                 link. Runners are returned in page order either way, without duplicates.
+    :return: DataFrame containing URLs for all runners found in results page
+    :rtype: pandas.DataFrame
+    """
+    runners = [runner for runners_page in iter_berlin_marathon_urls(url=url, event=event, year=year, gender=gender,
+                                                                    num_results_per_page=num_results_per_page,
+                                                                    unit_test_ind=unit_test_ind, session=session,
+                                                                    num_page_workers=num_page_workers)
+               for runner in runners_page]
+    df = pd.DataFrame(runners, columns=['urls'])
+
     return df
 
 
-def scrape_berlin_runner_details(url, year, gender):
+def scrape_berlin_runner_details(url, year, gender, session=None):
     """
     Method to scrape relevant information about a given runner in Berlin Marathon. The scraped details include:
 
@@ -1109,127 +1760,94 @@ def scrape_berlin_runner_details(url, year, gender):
     :param str url: URL for an individual runner's results
     :param int year: Year of marathon (supported values: 2014, 2015, 2016, 2017)
     :param str gender: Gender of runner ('M' for male, 'W' for female)
-    :return: DataFrame
-    :rtype: pandas.DataFrame
+    :param SessionPool session: Pool of keep-alive connections used to download the page. If None, a new
+                                mechanize.Browser is used. A pool with a PageCache in replay mode reads the page from
+                                the cache only.
+    :return: Record of the runner's details, or 'Connection error' if the page could not be downloaded
+    :rtype: BerlinRunner
     """
-    br = mechanize.Browser()
+    # Link to results of a single runner
+    html = fetch_runner_page(url, session)
+    if html is None:
+        return 'Connection error'
 
-    # Ignore robots.txt
-    br.set_handle_robots(False)
+    return parse_berlin_runner_details(html, year=year, gender=gender)
 
-    # Link to results of a single runner.
-    # Use try/except in case of unexpected internet/URL issues.
-    try:
-        br.open(url)
-    except (mechanize.HTTPError, mechanize.URLError) as e:
-        if hasattr(e, 'code'):
-            if int(e.code) == 500:
-                print('Following URL has HTTP Error 500:')
-                print(url)
-            else:
-                print('Following URL has unexpected connection issue:')
-                print(url)
-            return 'Connection error'
 
-    html = br.response().read()
-    soup = BeautifulSoup(html, "html.parser")
+def parse_berlin_runner_details(html, year, gender):
+    """
+    Method to parse the details described in `scrape_berlin_runner_details` out of a downloaded results page.
+
+    Example::
+
+        parse_berlin_runner_details(html=fetch_runner_page(url), year=2016, gender='M')
+
+    :param bytes html: Raw HTML of an individual runner's results page
+    :param int year: Year of marathon (supported values: 2014, 2015, 2016, 2017)
+    :param str gender: Gender of runner ('M' for male, 'W' for female)
+    :return: Record of the runner's details
+    :rtype: BerlinRunner
+    """
+    return parsing.parse_page(html, partial(_parse_berlin_page, year=year, gender=gender))
+
 
+def _parse_berlin_page(root, year, gender):
+    # Read the details of a runner from their results page, scanned or parsed by parsing.parse_page
     # Dropping first character of returned age group, which always appears to be gender.
-    age_group = soup.find_all('td', {'class': 'f-age_class'})[0].text[1:]
+    age_group = parsing.get_info(root, 'age_class')[1:]
 
     if age_group != 'H' and age_group != 'JA' and age_group != '':
-        # To have consistent formatting, express age_group as a range        
-        age_group = age_group + '-' + str(int(age_group) + 4)            
-    
-    bib_number = soup.find_all('td', {'class': 'f-start_no_text'})[0].text
-    full_name = soup.find_all('td', {'class': 'f-__fullname'})[0].text
-    
+        # To have consistent formatting, express age_group as a range
+        age_group = age_group + '-' + str(int(age_group) + 4)
+
+    bib_number = parsing.get_info(root, 'start_no_text')
+    full_name = parsing.get_info(root, '__fullname')
+
     # Modified from here:
     # https://stackoverflow.com/a/4894156/3905509
     country = convert_to_ascii(full_name[full_name.find("(")+1:full_name.find(")")])
 
-    rank_gender = soup.find_all('td', {'class': 'f-place_all'})[0].text
-    rank_age_group = soup.find_all('td', {'class': 'f-place_age'})[0].text
+    rank_gender = parsing.get_info(root, 'place_all')
+    rank_age_group = parsing.get_info(root, 'place_age')
 
     if year == 2014:
-        splits_table = soup.find_all('table', {'class': 'list-table'})[3]
+        splits_table = parsing.get_list_tables(root)[3]
     else:
-        splits_table = soup.find_all('table', {'class': 'list-table'})[4]
-
-    headers_index = ['year', 'bib', 'age_group', 'gender', 'country', 'rank_gender', 'rank_age_group']
-    headers = headers_index.copy()
-    cols_constant = [year, bib_number, age_group, gender, country, rank_gender, rank_age_group]
-    for header_name in splits_table.find_all('tr')[0]:
-        if type(header_name) is not bs4.element.NavigableString:        
-            headers.append(header_name.get_text())
-
-    # Ensure headers are lowercase for downstream convention
-    headers = [header.lower() for header in headers]
-
-    # Populate data
-    df = pd.DataFrame(columns=headers)
-    for split_row in splits_table.find_all('tr'):    
-        split_row_name = split_row.find_all('th')[0].text
-        cols = split_row.find_all('td')
-        cols = cols_constant + [split_row_name] + [cell.text.strip() for cell in cols]    
-        cols = [dict(zip(headers, cols))]
-        df_row = pd.DataFrame(cols, columns=headers)
-        # First element of split_row contains metadata that we don't want to scrap.
-        if split_row_name != 'Split':
-            df = df.append(df_row)
-
-    # Reset index of dataframe since each row was individually appended
-    df.reset_index(drop=True, inplace=True)
-    
-    # Only keep relevant fields
-    if 'zeit' in df.columns:
-        df = df[headers_index + ['split', 'zeit']]
-        df.rename(columns={'zeit': 'time'}, inplace=True)
-    elif 'time' in df.columns:
-        df = df[headers_index + ['split', 'time']]
-
-    # Convert split times into numeric seconds from strings.
-    # Modified from the following:
-    # https://stackoverflow.com/a/44445488/3905509
-    df['time'] = pd.to_timedelta(df['time']).dt.total_seconds()
-
-    # Convert split labels to lowercase
-    df['split'] = df['split'].str.lower()
-
-    # Pivot scraped data into 1 row for convenience
-    df = pd.pivot_table(
-        df,
-        index=headers_index,
-        columns='split',
-        values='time',
-        aggfunc='first'
-    ).reset_index()
+        splits_table = parsing.get_list_tables(root)[4]
 
-    # Reorder split times for convenience
-    headers_splits = ['5 km', '10 km', '15 km', '20 km', 'halb', '25 km', '30 km', '35 km', '40 km', 'finish']    
-    headers = headers_index.copy() + headers_splits
-    df = df.reindex(headers, axis='columns')
-    
-    df.rename(columns={'5 km': '5k', '10 km': '10k', '15 km': '15k', '20 km': '20k', 'halb': 'half', '25 km': '25k',
-                       '30 km': '30k', '35 km': '35k', '40 km': '40k'}, inplace=True)
-    
-    df = pd.DataFrame(df.to_records()).drop('index', axis='columns')
+    # Split times are headed 'Zeit' on the German version of the results page
+    split_times = parsing.get_table_split_times(splits_table, time_headers=['zeit', 'time'])
 
-    return df
+    split_labels = ['5 km', '10 km', '15 km', '20 km', 'halb', '25 km', '30 km', '35 km', '40 km', 'finish']
+    return BerlinRunner(year, bib_number, age_group, gender, country, rank_gender, rank_age_group,
+                        *select_split_times(split_times, split_labels))
+
+
+def _parse_berlin_row(html, row_input, year, gender):
+    return parse_berlin_runner_details(html, year=year, gender=gender)
 
 
-def scrape_berlin_marathon(path_input, path_output, path_error, year, gender, headers, df_urls=None):
+def scrape_berlin_marathon(path_input, path_output, path_error, year, gender, headers, df_urls=None,
+                           num_workers=1, max_requests_per_host=None, delay=0.5, session=None,
+                           path_queue=None, url_pages=None, max_retries=3, retry_delay=1.0,
+                           circuit_breaker=None, limiter=None, num_parse_processes=None, runner_index=None,
+                           top_up=False, metrics=None, worker_id=None, lease_seconds=None):
     """
     Method to scrape all Berlin Marathon data for a given year and gender using output from
     `scrape_berlin_marathon_urls` and `scrape_berlin_runner_details`.
 
     * If running for first time, the input `df_urls` should be direct output from `scrape_berlin_marathon_urls`.
 
-    * If restarting a prior scraping run, leave `df_urls` as None or empty and specify the input caching file
-      `path_input`, which is a subset of output from `scrape_berlin_marathon_urls`.
+    * If restarting a prior scraping run, leave `df_urls` as None or empty and specify the same input caching file
+      `path_input`, which holds the output from `scrape_berlin_marathon_urls`.
 
-    Each row of `path_input` is used to scrape an individual runner's split times. The scraped data is inserted into
-    the `path_output` file and then the row from `path_input` is deleted to log the completed scrape.
+    On the first run, every row of `path_input` is imported into a work queue journal (`path_queue`). Each row is used
+    to scrape an individual runner's split times. The scraped data is inserted into the `path_output` file and then
+    the row is logged as completed in the journal, so a restarted run only scrapes the remaining runners. An existing
+    `path_input` file left by an older version of this method can be resumed the same way.
+
+    Runners can be scraped concurrently by setting `num_workers`. Runners whose page could not be downloaded are retried
+    automatically before they are logged in `path_error`.
 
     **Note**: The `headers` input is assumed to contain the same headers as returned by `scrape_berlin_runner_details`.
     If the code for this function changes, the input headers should be modified.
@@ -1263,79 +1881,51 @@ def scrape_berlin_marathon(path_input, path_output, path_error, year, gender, he
     :param list[str] headers: List of strings representing expected headers for scrape_berlin_runner_details.
     :param pandas.DataFrame df_urls: DataFrame containing output from scrape_berlin_marathon_urls. This should only be
                                      included when running the first scraping for that year & gender.
+    :param int num_workers: Number of runners scraped concurrently by a pool of worker threads. The default of 1
+                            matches the original serial scraping loop.
+    :param int max_requests_per_host: Politeness cap on the number of requests in flight against the results website
+                                      at any time. Defaults to num_workers.
+    :param float delay: Pause in seconds taken by each worker after scraping a runner and before its next request.
+    :param SessionPool session: Pool of keep-alive connections used to download runner pages. If None, a pool is
+                                created for the duration of the run. Pass a pool with a PageCache to cache the pages,
+                                or to scrape them again offline in replay mode.
+    :param str path_queue: Path of the work queue journal tracking which rows of path_input have been scraped.
+                           Defaults to path_input with its extension replaced by '.sqlite'.
+    :param url_pages: Output of `iter_berlin_marathon_urls`. If given, runners are added to the journal one results
+                      page at a time and scraped while the following pages are still being walked, instead of waiting
+                      for the whole df_urls. df_urls and path_input are then ignored, other than naming the journal.
+    :param int max_retries: Number of times a runner whose page could not be downloaded is retried, with a growing
+                            delay, before it is logged in path_error. Runners logged in path_error, including by earlier
+                            runs, are retried once more at the end of the run.
+    :param float retry_delay: Wait in seconds before the first retry of a runner, doubled with each retry
+    :param CircuitBreaker circuit_breaker: Breaker pausing every request to the results website after repeated
+                                           failures, e.g. HTTP 500 errors under load. If None, a breaker with default
+                                           settings is used.
+    :param AdaptiveLimiter limiter: Controller tuning the number of requests in flight against the results website from
+                                    its latencies and errors, up to its ceiling. The level it chose is printed at the
+                                    end of the run. If None, max_requests_per_host is used as a fixed bound.
+    :param int num_parse_processes: Number of processes parsing the downloaded runner pages, while worker threads keep
+                                    downloading. If None, each worker thread parses the pages it downloads.
+    :param RunnerIndex runner_index: Index of runners already scraped, which are skipped. The runners of path_output
+                                     and of the journal are always added to it. If None, a new index is used.
+    :param bool top_up: If True, runners of path_input (or url_pages) missing from an existing journal are added to
+                        it and scraped, e.g. after the results of a year are amended. Runners already in path_output
+                        are not scraped or written again.
+    :param ScrapeMetrics metrics: Metrics of the run, appended to its JSONL run log and served to Prometheus if
+                                  enabled (see `ScrapeMetrics`). If None, throughput and latencies are only printed.
+    :param str worker_id: Name of this worker when several processes or hosts scrape the same job from one journal on
+                          a shared disk, e.g. `get_worker_id()`. Each worker claims leased batches of runners and writes
+                          its own output and error files, merged into path_output once the journal is finished. If
+                          None, the journal is used by this process only.
+    :param float lease_seconds: Seconds runners claimed by a worker sharing the journal are held before other workers
+                                can claim them, e.g. after the worker crashed. Live workers renew their leases.
     """
-    # Assume headers is a list. Convert it to a flattened string.
-    headers = '|'.join(headers) + '\n'
-    
-    # Check if the expected input file of URLs exists or not
-    check_file_input = os.path.isfile(path_input)
-    
-    # Export df_urls if the input file doesn't exist, i.e., starting from scratch.
-    if not check_file_input and df_urls is not None:
-        df_urls.to_csv(path_input, header=False, index=False, sep='|')
-
-        len_input = row_count_csv(path_input)
-
-        # Need to remove blank line created by Pandas for Windows machines
-        # See the following link for details:
-        # https://github.com/pandas-dev/pandas/issues/20353#issuecomment-392302201
-        if sys.platform == 'win32' and len_input > 1:
-            delete_last_line_csv(path_input)
-    else:
-        len_input = row_count_csv(path_input)
-        
-    # Check if expected output file of scraped data exists or not
-    check_file_output = os.path.isfile(path_output)
-    
-    # Create output file and append expected header row if it doesn't exist.
-    if not check_file_output:
-        with open(path_output, 'w', encoding="utf-8") as output_file:
-            output_file.write(headers)
-            
-    # Check if expected error log exists or not
-    check_file_error = os.path.isfile(path_error)
-    
-    # Create output file and append expected header row if it doesn't exist.
-    if not check_file_error:
-        with open(path_error, 'w', encoding="utf-8") as error_file:
-            error_file.write('failed_urls\n')
-
-    len_input = row_count_csv(path_input) 
-    
-    print('Starting to scrape Berlin Marathon split times...')
-    scrape_count = 0
-    while os.stat(path_input).st_size > 0:        
-        # Grab last line of input file and scrape its associated data
-        row_input = get_last_line_csv(path_input).strip()
-        
-        runner_output = scrape_berlin_runner_details(
-            url=row_input,
-            year=year,
-            gender=gender
-        )
-        
-        # Handle cases where scrape_london_runner_details has a connection issue. Often, these are random and could be
-        # retried later. The current path_input row is appended to an error log.
-        if type(runner_output).__name__ == 'str' and runner_output == 'Connection error':            
-            with open(path_error, 'a', encoding="utf-8") as error_file:
-                error_file.write(row_input)
-                error_file.write('\n')
-            delete_last_line_csv(path_input)
-            sleep(0.5)
-            print('Reducing total number of runners...')
-            len_input -= 1
-            continue
-        
-        output_string = re.sub(' +', '|', runner_output.to_string(header=False, index=False))[1:] + '\n'
-
-        # Append scraped data to the output file path_output
-        with open(path_output, 'a', encoding="utf-8") as output_file:
-            output_file.write(output_string)
-
-        delete_last_line_csv(path_input)
-        scrape_count += 1
-        print('Progress: ' + str(scrape_count) + ' of ' + str(len_input), end='\r')
-        sleep(0.5)
-    
-    print('')
-    print('Scraping of split times complete!')
+    _scrape_marathon(path_input=path_input, path_output=path_output, path_error=path_error, headers=headers,
+                     df_urls=df_urls, marathon_name='Berlin',
+                     parse_row=partial(_parse_berlin_row, year=year, gender=gender),
+                     num_workers=num_workers,
+                     max_requests_per_host=max_requests_per_host, delay=delay, session=session,
+                     path_queue=path_queue, url_pages=url_pages, max_retries=max_retries, retry_delay=retry_delay,
+                     circuit_breaker=circuit_breaker, limiter=limiter, num_parse_processes=num_parse_processes,
+                     runner_index=runner_index, top_up=top_up, metrics=metrics, worker_id=worker_id,
+                     lease_seconds=lease_seconds)
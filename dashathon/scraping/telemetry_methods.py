@@ -0,0 +1,304 @@
+import json
+import random
+import socketserver
+import threading
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from math import ceil
+from time import monotonic, time
+
+from dashathon.scraping.concurrency_methods import get_host
+
+# Upper bounds in seconds of the latency histogram buckets exported to Prometheus
+LATENCY_BUCKETS = [0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+# Number of latencies kept per host, as a uniform sample of all of them, to estimate percentiles. Percentiles are exact
+# until more requests than that are recorded.
+LATENCY_SAMPLE_SIZE = 1024
+
+
+def get_percentile(sorted_values, percentile):
+    """
+    Method to return a percentile of a sorted list of values, using the nearest-rank method.
+
+    Example::
+
+        get_percentile([0.1, 0.2, 0.3, 0.4], 50)  # 0.2
+
+    :param list[float] sorted_values: Values sorted in ascending order
+    :param float percentile: Percentile between 0 and 100
+    :return: Smallest value with at least `percentile` percent of the values at or below it, or None if there are no
+             values
+    :rtype: float
+    """
+    if not sorted_values:
+        return None
+    return sorted_values[max(ceil(len(sorted_values) * percentile / 100) - 1, 0)]
+
+
+class _LatencyStats:
+    # Count, sum, and histogram over LATENCY_BUCKETS of recorded latencies, with a reservoir sample of at most
+    # LATENCY_SAMPLE_SIZE of them, so memory and the work of a summary stay bounded however long the run
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.bucket_counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sample = []
+        self._random = random.Random()
+
+    def add(self, latency):
+        self.count += 1
+        self.total += latency
+        self.bucket_counts[bisect_left(LATENCY_BUCKETS, latency)] += 1
+        if len(self.sample) < LATENCY_SAMPLE_SIZE:
+            self.sample.append(latency)
+        else:
+            index = self._random.randrange(self.count)
+            if index < LATENCY_SAMPLE_SIZE:
+                self.sample[index] = latency
+
+    def summarize(self):
+        sorted_sample = sorted(self.sample)
+        return {'count': self.count, 'p50': get_percentile(sorted_sample, 50),
+                'p95': get_percentile(sorted_sample, 95), 'p99': get_percentile(sorted_sample, 99)}
+
+
+class ScrapeMetrics:
+    """
+    Collect the throughput, latency, and errors of a scraping run, per host.
+
+    `scrape_*_marathon` records every runner page fetched and parsed, and its progress through the runners of the
+    job. A summary with requests per second, p50/p95/p99 fetch and parse latencies, bytes downloaded, errors by HTTP
+    status, the share of pages parsed without building a tree, and the estimated time left is appended to `path_log`
+    as one JSON line every `log_seconds`, and once more when the run ends. Percentiles are estimated from a sample of
+    `LATENCY_SAMPLE_SIZE` latencies per host, so long runs use bounded memory. The same metrics can be served in the
+    Prometheus text format by `start_metrics_server`. A single instance can be shared by several jobs, e.g. every job
+    of `run_jobs`.
+
+    Example::
+
+        metrics = ScrapeMetrics(path_log='scrape_log.jsonl')
+        scrape_berlin_marathon(..., metrics=metrics)
+        metrics.get_summary()['requests_per_second']
+
+    :param str path_log: Path of the JSONL run log. If None, no log is written.
+    :param float log_seconds: Seconds between two lines of the run log
+    """
+
+    def __init__(self, path_log=None, log_seconds=10.0):
+        self.path_log = path_log
+        self.log_seconds = log_seconds
+        self._start = monotonic()
+        self._last_log = self._start
+        self._fetch_latencies = defaultdict(_LatencyStats)
+        self._parse_latencies = defaultdict(_LatencyStats)
+        self._all_fetch_latencies = _LatencyStats()
+        self._all_parse_latencies = _LatencyStats()
+        self._fast_path_counts = Counter()
+        self._bytes = Counter()
+        self._statuses = defaultdict(Counter)
+        self._progress = {}
+        self._lock = threading.Lock()
+
+    def record_fetch(self, url, latency, status, num_bytes=0):
+        """
+        Method to record a runner page request.
+
+        :param str url: URL that was requested
+        :param float latency: Seconds the request took
+        :param str status: HTTP status of the response, e.g. '200' or '500', or 'connection' if no response came back
+        :param int num_bytes: Size of the page downloaded
+        """
+        host = get_host(url)
+        with self._lock:
+            self._fetch_latencies[host].add(latency)
+            self._all_fetch_latencies.add(latency)
+            self._statuses[host][status] += 1
+            self._bytes[host] += num_bytes
+
+    def record_parse(self, url, latency, fast_path=None):
+        """
+        Method to record the parsing of a runner page.
+
+        :param str url: URL of the page
+        :param float latency: Seconds spent parsing the page
+        :param bool fast_path: Whether the page was read without building a tree (see `parsing_methods.parse_page`)
+        """
+        with self._lock:
+            self._parse_latencies[get_host(url)].add(latency)
+            self._all_parse_latencies.add(latency)
+            if fast_path is not None:
+                self._fast_path_counts[fast_path] += 1
+
+    def set_progress(self, job, num_done, num_total):
+        """
+        Method to record how many runners of a job have been handled, which is used to estimate the time left.
+
+        :param str job: Name of the job, e.g. its output file
+        :param int num_done: Number of runners scraped
+        :param int num_total: Number of runners to scrape, as known so far
+        """
+        with self._lock:
+            self._progress[job] = (num_done, num_total)
+
+    def get_progress(self):
+        """
+        Method to return the throughput and the estimated time left, without summarizing latencies.
+
+        :return: Requests per second since the metrics were created, and estimated seconds left, or None until a
+                 runner is done
+        :rtype: (float, float)
+        """
+        with self._lock:
+            elapsed = monotonic() - self._start
+            num_done = sum(done for done, _ in self._progress.values())
+            num_total = sum(total for _, total in self._progress.values())
+            num_requests = self._all_fetch_latencies.count
+        return num_requests / elapsed, (num_total - num_done) * elapsed / num_done if num_done else None
+
+    def get_summary(self):
+        """
+        Method to summarize the metrics recorded so far.
+
+        :return: Overall metrics, with the same metrics for each host under 'hosts'. The ETA is None until a runner is
+                 done, and the share of pages parsed by the fast path is None until a page is parsed.
+        :rtype: dict
+        """
+        with self._lock:
+            elapsed = monotonic() - self._start
+            num_done = sum(done for done, _ in self._progress.values())
+            num_total = sum(total for _, total in self._progress.values())
+            hosts = {}
+            for host in sorted(set(self._fetch_latencies) | set(self._parse_latencies)):
+                num_requests = self._fetch_latencies[host].count
+                hosts[host] = {'requests': num_requests, 'requests_per_second': num_requests / elapsed,
+                               'bytes': self._bytes[host],
+                               'errors_by_status': {status: count for status, count in self._statuses[host].items()
+                                                    if status != '200'},
+                               'fetch_seconds': self._fetch_latencies[host].summarize(),
+                               'parse_seconds': self._parse_latencies[host].summarize()}
+            errors_by_status = Counter()
+            for host_summary in hosts.values():
+                errors_by_status.update(host_summary['errors_by_status'])
+            num_requests = sum(host_summary['requests'] for host_summary in hosts.values())
+            return {'time': time(), 'elapsed_seconds': elapsed, 'requests': num_requests,
+                    'requests_per_second': num_requests / elapsed, 'bytes': sum(self._bytes.values()),
+                    'errors_by_status': dict(errors_by_status),
+                    'fetch_seconds': self._all_fetch_latencies.summarize(),
+                    'parse_seconds': self._all_parse_latencies.summarize(),
+                    'fast_path_hit_rate': (self._fast_path_counts[True] / sum(self._fast_path_counts.values())
+                                           if self._fast_path_counts else None),
+                    'runners_done': num_done, 'runners_total': num_total,
+                    'eta_seconds': (num_total - num_done) * elapsed / num_done if num_done else None,
+                    'hosts': hosts}
+
+    def log(self):
+        """
+        Method to append the current summary to the run log.
+        """
+        self._last_log = monotonic()
+        if self.path_log is not None:
+            with open(self.path_log, 'a') as f:
+                f.write(json.dumps(self.get_summary()) + '\n')
+
+    def log_if_due(self):
+        """
+        Method to append the current summary to the run log if `log_seconds` have passed since the last line.
+        """
+        if monotonic() - self._last_log >= self.log_seconds:
+            self.log()
+
+    def get_prometheus_text(self):
+        """
+        Method to export the metrics in the Prometheus text exposition format.
+
+        :return: Counters of requests by host and status and of bytes by host, histograms of fetch and parse latencies
+                 by host, and gauges of runners and of the estimated seconds left
+        :rtype: str
+        """
+        summary = self.get_summary()
+        with self._lock:
+            lines = ['# TYPE dashathon_requests_total counter']
+            for host, statuses in sorted(self._statuses.items()):
+                for status, count in sorted(statuses.items()):
+                    lines.append('dashathon_requests_total{host="%s",status="%s"} %d' % (host, status, count))
+            lines.append('# TYPE dashathon_bytes_total counter')
+            for host, num_bytes in sorted(self._bytes.items()):
+                lines.append('dashathon_bytes_total{host="%s"} %d' % (host, num_bytes))
+            for name, latencies_by_host in [('fetch', self._fetch_latencies), ('parse', self._parse_latencies)]:
+                lines.append('# TYPE dashathon_%s_seconds histogram' % name)
+                for host, latencies in sorted(latencies_by_host.items()):
+                    num_latencies = 0
+                    for bound, bucket_count in zip(LATENCY_BUCKETS, latencies.bucket_counts):
+                        num_latencies += bucket_count
+                        lines.append('dashathon_%s_seconds_bucket{host="%s",le="%s"} %d' %
+                                     (name, host, bound, num_latencies))
+                    lines.append('dashathon_%s_seconds_bucket{host="%s",le="+Inf"} %d' % (name, host, latencies.count))
+                    lines.append('dashathon_%s_seconds_sum{host="%s"} %r' % (name, host, latencies.total))
+                    lines.append('dashathon_%s_seconds_count{host="%s"} %d' % (name, host, latencies.count))
+        lines.append('# TYPE dashathon_runners_done gauge')
+        lines.append('dashathon_runners_done %d' % summary['runners_done'])
+        lines.append('# TYPE dashathon_runners_total gauge')
+        lines.append('dashathon_runners_total %d' % summary['runners_total'])
+        if summary['eta_seconds'] is not None:
+            lines.append('# TYPE dashathon_eta_seconds gauge')
+            lines.append('dashathon_eta_seconds %r' % summary['eta_seconds'])
+        return '\n'.join(lines) + '\n'
+
+
+class _ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    """
+    Threaded HTTP server, as http.server.ThreadingHTTPServer of Python 3.7, whose request threads don't keep the process
+    alive.
+    """
+    daemon_threads = True
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    """
+    Request handler serving the server's `ScrapeMetrics` in the Prometheus text format at `/metrics`.
+    """
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.server.metrics.get_prometheus_text().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Keep scraping output readable
+        pass
+
+
+def start_metrics_server(metrics, host='127.0.0.1', port=0):
+    """
+    Method to serve scraping metrics to a Prometheus server from a background thread.
+
+    Example::
+
+        metrics = ScrapeMetrics(path_log='scrape_log.jsonl')
+        server = start_metrics_server(metrics, port=9100)
+        run_jobs(get_job_matrix(), metrics=metrics)
+        server.shutdown()
+        server.server_close()
+
+    :param ScrapeMetrics metrics: Metrics to serve
+    :param str host: Interface to bind
+    :param int port: Port to bind. The default of 0 picks any free port.
+    :return: Running server, with the URL of its metrics stored as `metrics_url`
+    :rtype: http.server.HTTPServer
+    """
+    server = _ThreadingHTTPServer((host, port), MetricsRequestHandler)
+    server.metrics = metrics
+    server.metrics_url = 'http://%s:%d/metrics' % server.server_address[:2]
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
@@ -0,0 +1,256 @@
+import glob
+import os
+import random
+import re
+import shutil
+import socketserver
+import threading
+import unittest
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from math import ceil
+from string import Template
+from time import sleep
+from urllib.parse import urlsplit, parse_qs, urlencode
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+RACES = ['chicago', 'london', 'berlin']
+
+# Markup of one runner in a results list, mirroring each results website
+RESULTS_ROW_TEMPLATES = {
+    'chicago': Template('<li class="list-group-item"><h4 class="type-fullname"><a href="$href">Runner, Number $index'
+                        '</a></h4><div class="type-eval"><div class="list-label">City, State</div>$location</div></li>'),
+    'london': Template('<tr><td>$place</td><td>$place</td><td>$bib</td><td><a href="$href">Runner, Number $index</a>'
+                       '</td><td>02:14:49</td></tr>'),
+    'berlin': Template('<tr><td>$place</td><td>$bib</td><td><a href="$href">Runner, Number $index</a></td>'
+                       '<td>02:03:03</td></tr>'),
+}
+
+# Bib number shown on each recorded runner details page. The server replaces it with the bib of the runner requested.
+FIXTURE_BIBS = {'chicago': '54250', 'london': '1154', 'berlin': '30529'}
+
+# Locations listed for Chicago runners, including one without a state and one without any location
+CHICAGO_LOCATIONS = ['Portland, OR', 'New York, NY', 'Saint Paul, MN', 'Toronto, ON', 'Addis Ababa', '&ndash;']
+
+
+def read_fixture(file_name):
+    """
+    Method to read a recorded results page from the test fixtures directory.
+
+    :param str file_name: Name of the fixture file, e.g. 'chicago_runner_details.html'
+    :return: Raw content of the fixture
+    :rtype: bytes
+    """
+    with open(os.path.join(FIXTURE_DIR, file_name), 'rb') as f:
+        return f.read()
+
+
+def get_runner_idp(race, index):
+    """
+    Method to return the identifier used in the detail page URL of the fixture server's `index`-th runner of a race.
+
+    :param str race: One of `RACES`
+    :param int index: Position of the runner in the results list, starting at 0
+    :return: Runner identifier, e.g. '9999990C0000000000000007'
+    :rtype: str
+    """
+    return '9999990%X%016X' % (RACES.index(race), index)
+
+
+class _ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    """
+    Threaded HTTP server, as http.server.ThreadingHTTPServer of Python 3.7, whose request threads don't keep the process
+    alive.
+    """
+    daemon_threads = True
+
+
+class FixtureRequestHandler(BaseHTTPRequestHandler):
+    """
+    Request handler serving a stand-in for the results websites. The first path segment selects the race:
+
+    * `/<race>/` returns the recorded search form
+    * `/<race>/?...&num_results=N[&page=P]` returns page P of the results list, as submitted by the search form, with
+      a '>' link to the next page
+    * `/<race>/?content=detail&idp=...` returns the recorded runner details page. For a runner listed by the results
+      pages, its bib number is shown as 10000 + its position in the list, as in the results list.
+
+    Connections are kept alive between requests, and every new connection is counted in the server's
+    `connection_count`. Every response status is counted in `status_counts`. Runner pages requested while
+    `max_concurrent_requests` others are in progress fail with HTTP 500 errors.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    # Headers and body are written separately, so Nagle's algorithm would otherwise stall every kept-alive response
+    # until the client's delayed ACK.
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connection_count += 1
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        race = parts.path.strip('/').split('/')[0]
+        query = parse_qs(parts.query)
+        if race not in RACES:
+            self.send_page(404)
+        elif query.get('content') == ['detail']:
+            with self.server.lock:
+                fail = self.server.random.random() < self.server.error_rate
+                # Runner pages requested while too many others are being served fail, as on an overloaded server
+                if self.server.max_concurrent_requests is not None:
+                    fail = fail or self.server.detail_requests_in_flight >= self.server.max_concurrent_requests
+                self.server.detail_requests_in_flight += 1
+            try:
+                if fail:
+                    self.send_page(500)
+                else:
+                    self.send_page(200, self.get_details_page(race, query.get('idp', [''])[0]))
+            finally:
+                with self.server.lock:
+                    self.server.detail_requests_in_flight -= 1
+        elif 'num_results' in query:
+            self.send_page(200, self.get_results_page(race, query))
+        else:
+            self.send_page(200, self.server.pages[race + '_search_form.html'])
+
+    def get_details_page(self, race, idp):
+        page = self.server.pages[race + '_runner_details.html']
+        # Only runners listed by the results pages get their own bib. Any other idp returns the recorded page as is.
+        if not re.fullmatch('9999990%X[0-9A-F]{16}' % RACES.index(race), idp):
+            return page
+        index = int(idp[8:], 16)
+        return page.replace(('>' + FIXTURE_BIBS[race] + '<').encode('utf-8'),
+                            ('>' + str(10000 + index) + '<').encode('utf-8'))
+
+    def get_results_page(self, race, query):
+        num_results_per_page = int(query['num_results'][0])
+        if self.server.max_results_per_page is not None:
+            num_results_per_page = min(num_results_per_page, self.server.max_results_per_page)
+        num_pages = max(ceil(self.server.num_runners / num_results_per_page), 1)
+        page = min(int(query.get('page', ['1'])[0]), num_pages)
+
+        rows = []
+        for index in range((page - 1) * num_results_per_page, min(page * num_results_per_page,
+                                                                   self.server.num_runners)):
+            rows.append(RESULTS_ROW_TEMPLATES[race].substitute(
+                href='?content=detail&amp;idp=' + get_runner_idp(race, index) + '&amp;lang=EN_CAP',
+                index=index, place=index + 1, bib=10000 + index,
+                location=CHICAGO_LOCATIONS[index % len(CHICAGO_LOCATIONS)]))
+
+        # Links to every page, followed by a '>' link to the next page. The last page links to itself.
+        page_links = []
+        for page_link in list(range(1, num_pages + 1)) + [min(page + 1, num_pages)]:
+            page_query = dict(query, page=[str(page_link)])
+            page_links.append('<a href="?' + urlencode(page_query, doseq=True).replace('&', '&amp;') + '">' +
+                              (str(page_link) if len(page_links) < num_pages else '&gt;') + '</a>')
+
+        template = Template(self.server.pages[race + '_results_list.html'].decode('utf-8'))
+        return template.substitute(total=self.server.num_runners, rows='\n'.join(rows),
+                                   pages='\n'.join(page_links)).encode('utf-8')
+
+    def send_page(self, status, body=None):
+        sleep(self.server.latency)
+        with self.server.lock:
+            self.server.status_counts[status] += 1
+        if body is None:
+            self.send_error(status)
+            return
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Keep test and benchmark output readable
+        pass
+
+
+def start_fixture_server(latency=0.0, num_runners=25, error_rate=0.0, max_results_per_page=None, seed=0,
+                         host='127.0.0.1', port=0, max_concurrent_requests=None):
+    """
+    Method to start a local stand-in for the race results websites in a background thread.
+
+    Example::
+
+        server = start_fixture_server(latency=0.1, num_runners=500, error_rate=0.01)
+        df_urls = scrape_london_marathon_urls(url=server.base_url + 'london/', event='MAS', year=2017, gender='M')
+        ...
+        stop_fixture_server(server)
+
+    :param float latency: Delay in seconds added to every response to mimic a remote server
+    :param int num_runners: Number of runners listed in the results of every race
+    :param float error_rate: Probability that a runner details page returns an HTTP 500 error
+    :param int max_results_per_page: Largest number of results returned per page, whatever the form asks for. If None,
+                                     every page size is honoured.
+    :param int seed: Seed of the random draws used to inject errors
+    :param str host: Interface to bind
+    :param int port: Port to bind. The default of 0 picks any free port.
+    :param int max_concurrent_requests: Number of runner pages served at once above which further requests fail with
+                                        HTTP 500 errors. If None, the server never overloads.
+    :return: Running server, with its root URL stored as `base_url`
+    :rtype: http.server.HTTPServer
+    """
+    server = _ThreadingHTTPServer((host, port), FixtureRequestHandler)
+    server.latency = latency
+    server.num_runners = num_runners
+    server.error_rate = error_rate
+    server.max_results_per_page = max_results_per_page
+    server.max_concurrent_requests = max_concurrent_requests
+    server.detail_requests_in_flight = 0
+    server.random = random.Random(seed)
+    server.lock = threading.Lock()
+    server.connection_count = 0
+    server.status_counts = Counter()
+    server.pages = {race + page_name: read_fixture(race + page_name) for race in RACES
+                    for page_name in ['_runner_details.html', '_search_form.html', '_results_list.html']}
+    server.base_url = 'http://%s:%d/' % server.server_address[:2]
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def stop_fixture_server(server):
+    """
+    Method to stop a server started by `start_fixture_server` and close its listening socket.
+
+    :param http.server.HTTPServer server: Running server
+    """
+    server.shutdown()
+    server.server_close()
+
+
+class FixtureServerTestCase(unittest.TestCase):
+    """
+    Base class of the tests scraping fixture servers. Servers started by `start_server` are stopped, and the files and
+    directories matching `test_paths` are removed, once each test ends.
+    """
+    # Glob patterns of the files and directories written by the tests, relative to the working directory
+    test_paths = []
+
+    def setUp(self):
+        self.servers = []
+
+    def tearDown(self):
+        for server in self.servers:
+            stop_fixture_server(server)
+        self.remove_test_paths()
+
+    def start_server(self, **kwargs):
+        # Fixture server stopped once the test ends
+        server = start_fixture_server(**kwargs)
+        self.servers.append(server)
+        return server
+
+    def remove_test_paths(self):
+        for pattern in self.test_paths:
+            for path in glob.glob(pattern):
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
+                else:
+                    os.remove(path)
@@ -0,0 +1,36 @@
+import gzip
+import shutil
+import unittest
+
+import dashathon.scraping.cache_methods as cache_methods
+
+
+class CacheMethodsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = cache_methods.PageCache('test_page_cache')
+
+    def tearDown(self):
+        shutil.rmtree('test_page_cache')
+
+    def test_get_key(self):
+        key = self.cache.get_key('http://results.scc-events.com/2016/?content=detail&idp=1')
+        assert key == self.cache.get_key('http://results.scc-events.com/2016/?content=detail&idp=1', 'get')
+        assert key != self.cache.get_key('http://results.scc-events.com/2016/?content=detail&idp=2')
+        # Form submissions are keyed by their data as well as their URL
+        assert self.cache.get_key('http://a.test/', 'POST', 'sex=M') != self.cache.get_key('http://a.test/', 'POST',
+                                                                                          b'sex=W')
+
+
+    def test_put_get(self):
+        key = self.cache.get_key('http://a.test/')
+        assert self.cache.get(key) is None and key not in self.cache
+        body = b'<html>' + b'<tr><td>00:15:48</td></tr>' * 1000 + b'</html>'
+        self.cache.put(key, 'http://a.test/', [('Content-Type', 'text/html; charset=utf-8')], body)
+
+        assert key in self.cache and len(self.cache) == 1
+        assert self.cache.get(key) == ('http://a.test/', [('Content-Type', 'text/html; charset=utf-8')], body)
+        # Pages are stored compressed
+        with open(self.cache.get_path(key), 'rb') as f:
+            compressed = f.read()
+        assert len(compressed) < len(body) / 10 and gzip.decompress(compressed).endswith(body)
@@ -0,0 +1,117 @@
+import threading
+import unittest
+from time import sleep
+
+import dashathon.scraping.concurrency_methods as concurrency
+
+
+class ConcurrencyMethodsTest(unittest.TestCase):
+
+    def test_get_host(self):
+        assert concurrency.get_host('http://Results.scc-events.com/2016/?content=detail') == 'results.scc-events.com'
+        assert concurrency.get_host('http://127.0.0.1:8000/chicago/') == '127.0.0.1:8000'
+
+
+    def test_host_limiter(self):
+        limiter = concurrency.HostLimiter(max_per_host=2)
+        in_flight = {'a': 0, 'b': 0}
+        peak = {'a': 0, 'b': 0}
+        lock = threading.Lock()
+
+        def request(host):
+            with limiter.slot('http://' + host + '/'):
+                with lock:
+                    in_flight[host] += 1
+                    peak[host] = max(peak[host], in_flight[host])
+                sleep(0.02)
+                with lock:
+                    in_flight[host] -= 1
+
+        threads = [threading.Thread(target=request, args=(host,)) for host in ['a', 'b'] * 6]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert peak == {'a': 2, 'b': 2}
+
+
+    def test_host_limiter_invalid(self):
+        with self.assertRaises(ValueError):
+            concurrency.HostLimiter(max_per_host=0)
+
+
+    def test_get_backoff_delay(self):
+        delays = [concurrency.get_backoff_delay(attempt, base_delay=1.0, max_delay=10.0) for attempt in range(6)]
+        assert 0.5 <= delays[0] <= 1 and 2 <= delays[2] <= 4
+        assert all(5 <= delay <= 10 for delay in delays[4:])
+
+
+    def test_circuit_breaker(self):
+        breaker = concurrency.CircuitBreaker(max_failures=2, reset_seconds=0.1)
+        url = 'http://results.scc-events.com/2016/?content=detail'
+        breaker.record(url, success=False)
+        assert not breaker.is_open(url)
+        breaker.record(url, success=False)
+        assert breaker.is_open(url) and not breaker.is_open('http://127.0.0.1:8000/chicago/')
+
+        # The first request after the reset period is a trial. If it fails, the circuit opens again.
+        breaker.wait(url)
+        breaker.record(url, success=False)
+        assert breaker.is_open(url) and breaker.trip_count == 2
+        breaker.wait(url)
+        breaker.record(url, success=True)
+        assert not breaker.is_open(url)
+
+
+    def test_adaptive_limiter(self):
+        limiter = concurrency.AdaptiveLimiter(max_per_host=4, initial_per_host=1)
+        url = 'http://results.scc-events.com/2016/?content=detail'
+
+        # Fast successes raise the level by about one per round of requests, up to the ceiling
+        for _ in range(20):
+            with limiter.slot(url):
+                pass
+            limiter.record(url, latency=0.01, success=True)
+        assert limiter.get_levels() == {'results.scc-events.com': 4}
+
+        # A burst of failures within one round trip halves the level only once
+        limiter.record(url, latency=0.01, success=False)
+        limiter.record(url, latency=0.01, success=False)
+        assert limiter.get_levels() == {'results.scc-events.com': 2}
+
+        # Much slower responses count as overload too
+        sleep(0.05)
+        limiter.record(url, latency=0.04, success=True)
+        assert limiter.get_levels() == {'results.scc-events.com': 1}
+
+
+    def test_adaptive_limiter_slots(self):
+        limiter = concurrency.AdaptiveLimiter(max_per_host=4, initial_per_host=2)
+        url = 'http://results.scc-events.com/2016/?content=detail'
+        in_flight = []
+        max_in_flight = []
+        lock = threading.Lock()
+
+        def request():
+            with limiter.slot(url):
+                with lock:
+                    in_flight.append(1)
+                    max_in_flight.append(len(in_flight))
+                sleep(0.02)
+                with lock:
+                    in_flight.pop()
+
+        threads = [threading.Thread(target=request) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert max(max_in_flight) == 2
+
+
+    def test_start_process_pool(self):
+        with concurrency.start_process_pool(2) as executor:
+            # Every process is already running before any task of the caller is submitted
+            assert len(executor._processes) == 2
+            assert list(executor.map(abs, [-1, -2, -3])) == [1, 2, 3]
@@ -0,0 +1,71 @@
+import mechanize
+from dashathon.scraping.cache_methods import PageCache
+import dashathon.scraping.http_methods as http
+from dashathon.tests.fixture_server import FixtureServerTestCase, read_fixture, stop_fixture_server
+
+
+class FakeResponse:
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class HttpMethodsTest(FixtureServerTestCase):
+    test_paths = ['test_page_cache']
+
+    def setUp(self):
+        super().setUp()
+        self.server = self.start_server()
+        self.session = http.SessionPool(max_connections_per_host=2)
+
+    def tearDown(self):
+        self.session.close()
+        super().tearDown()
+
+    def test_bounded_history(self):
+        responses = [FakeResponse() for _ in range(3)]
+        history = http.BoundedHistory(max_length=2)
+        for response in responses:
+            history.add(None, response)
+        assert len(history._history) == 2 and responses[0].closed and not responses[2].closed
+
+
+    def test_session_pool_fetch(self):
+        url = self.server.base_url + 'berlin/?content=detail&idp=1'
+        pages = [self.session.fetch(url) for _ in range(3)]
+        assert pages == [read_fixture('berlin_runner_details.html')] * 3
+
+
+    def test_session_pool_keep_alive(self):
+        for idp in range(5):
+            self.session.fetch(self.server.base_url + 'london/?content=detail&idp=' + str(idp))
+        assert self.server.connection_count == 1
+
+
+    def test_session_pool_http_error(self):
+        with self.assertRaises(mechanize.HTTPError) as context:
+            self.session.fetch(self.server.base_url + 'boston/?content=detail')
+        assert context.exception.code == 404
+
+
+    def test_session_pool_browser(self):
+        br = self.session.browser()
+        for idp in range(3):
+            br.open(self.server.base_url + 'chicago/?content=detail&idp=' + str(idp))
+        assert len(br._history._history) == 1 and br.response().read() == read_fixture('chicago_runner_details.html')
+
+
+    def test_session_pool_cache_replay(self):
+        url = self.server.base_url + 'chicago/?content=detail&idp=1'
+        cached_session = http.SessionPool(cache=PageCache('test_page_cache'))
+        page = cached_session.fetch(url)
+        cached_session.close()
+        stop_fixture_server(self.server)
+
+        # Cached pages are replayed after the server is gone, and any other page is an error
+        replay_session = http.SessionPool(cache=PageCache('test_page_cache', replay=True))
+        assert replay_session.fetch(url) == page == read_fixture('chicago_runner_details.html')
+        self.assertRaises(mechanize.URLError, replay_session.fetch, url + '2')
@@ -0,0 +1,45 @@
+import dashathon.scraping.index_methods as index_methods
+from dashathon.scraping.queue_methods import WorkQueue
+from dashathon.tests.fixture_server import FixtureServerTestCase
+
+
+class IndexMethodsTest(FixtureServerTestCase):
+    test_paths = ['test_index_output.csv', 'test_index.sqlite']
+
+    def test_get_runner_idp(self):
+        assert index_methods.get_runner_idp('http://results.scc-events.com/2016/?content=detail&'
+                                            'idp=99999905C9AF460000404FFD&lang=EN') == '99999905C9AF460000404FFD'
+        assert index_methods.get_runner_idp('http://results.scc-events.com/2016/') is None
+
+
+    def test_contains(self):
+        index = index_methods.RunnerIndex()
+        index.add('berlin', year=2016, bib='30529', idp='1')
+        assert index.contains('berlin', year='2016', bib=' 30529') and index.contains('berlin', idp='1')
+        assert not index.contains('london', year=2016, bib='30529') and not index.contains('berlin', idp='2')
+        # Runners without a bib are only known by idp
+        index.add('berlin', year=2016, bib='', idp='3')
+        assert not index.contains('berlin', year=2016, bib='') and not index.contains('berlin')
+
+
+    def test_load_output(self):
+        with open('test_index_output.csv', 'w') as f:
+            f.write('year|bib|finish\n 2017|1154|8089.0\n 2017|1155\n2017||8100.0\n')
+        index = index_methods.RunnerIndex()
+        assert index.load_output('test_index_output.csv', race='london') == 2
+        assert index.contains('london', year=2017, bib='1154') and not index.contains('london', year=2017, bib='1155')
+        assert index.load_output('missing_output.csv', race='london') == 0
+
+
+    def test_load_journal(self):
+        queue = WorkQueue('test_index.sqlite')
+        queue.put(['url/?content=detail&idp=1|Portland|OR', 'url/?content=detail&idp=2|Ambo|',
+                   'url/?content=detail&idp=3|Toronto|ON'])
+        claimed = queue.claim(3)
+        queue.complete([claimed[0][0]])
+        queue.fail([claimed[1][0]])
+        index = index_methods.RunnerIndex()
+        assert index.load_journal(queue, race='chicago') == 1
+        queue.close()
+        assert index.contains('chicago', idp='1') and not index.contains('chicago', idp='2')
+        assert not index.contains('chicago', idp='3')
@@ -45,6 +45,24 @@ class MergeingMethodsTest(unittest.TestCase):
         assert merge.convert_string_to_seconds('00:41:41') == 2501
 
 
+    def test_convert_string_column_to_seconds(self):
+        test_times = pd.Series(['00:41:41', '-', '', None, '1:02', ' 2:00:00 ', '1:02:03.5', '0.124548611111111',
+                                'a:b:c', '1:02:03:04', '１:00:00', '3:00:00'], index=[5] * 12, name='official_time')
+        test_seconds = merge.convert_string_column_to_seconds(test_times)
+        assert test_seconds.equals(test_times.apply(merge.convert_string_to_seconds))
+        assert test_seconds.name == 'official_time'
+        assert str(test_seconds.tolist()) == '[2501.0, nan, nan, nan, nan, 7200.0, nan, nan, nan, nan, 3600.0, 10800.0]'
+
+        # Strings mixed with numbers, or with null characters, are converted one value at a time
+        test_mixed_times = pd.Series(['00:41:41', 5, '1:00:00\x00'])
+        assert merge.convert_string_column_to_seconds(test_mixed_times).equals(
+            test_mixed_times.apply(merge.convert_string_to_seconds))
+
+        test_valid_seconds = merge.convert_string_column_to_seconds(pd.Series(['00:41:41', '2:09:17']))
+        assert test_valid_seconds.dtype == 'int64'
+        assert test_valid_seconds.tolist() == [2501, 7757]
+
+
     def test_transform_rojour_boston_data(self):
         test_rojour = pd.read_csv('dashathon/data/external_data/rojour_boston_results_2015.csv', delimiter=',', nrows=1)
         test_transformed_rojour = merge.transform_rojour_boston_data(test_rojour, 2015)
@@ -79,6 +97,21 @@ class MergeingMethodsTest(unittest.TestCase):
         assert df_expected.equals(df_test_band_age)
 
 
+    def test_band_ages(self):
+        test_ages = pd.Series(list_test_ages + [-1, 19.5, 79.5, 120, pd.np.nan])
+        test_levels, test_bands = merge.band_ages(test_ages)
+        assert list(zip(test_levels, test_bands)) == [merge.band_age(age) for age in test_ages]
+
+        test_levels, test_bands = merge.band_ages(pd.Series([15, 42, 81]), merge.AGE_RANGE_LABELS)
+        assert test_levels.tolist() == [1, 6, 14]
+        assert test_bands.tolist() == ['<=19', '40-44', '80+']
+
+        # The age ranges of process_all_data are those of the age map
+        age_map = pd.read_csv('dashathon/merging/age_map.csv')
+        assert age_map['age'].tolist() == list(range(merge.AGE_RANGE_MIN_AGE, merge.AGE_RANGE_MAX_AGE + 1))
+        assert merge.band_ages(age_map['age'], merge.AGE_RANGE_LABELS)[1].tolist() == age_map['age_range'].tolist()
+
+
     def test_append_age_banding(self):
         df_age = pd.DataFrame().from_dict({'age': list_test_ages})
         df_test = merge.append_age_banding(df_age)
@@ -161,5 +194,13 @@ class MergeingMethodsTest(unittest.TestCase):
         assert merge.process_berlin_data().shape == (73547, 21)
 
 
+    def test_process_cities_data(self):
+        process_methods = [merge.process_chicago_data, merge.process_berlin_data]
+        test_results = merge.process_cities_data(num_processes=2, process_methods=process_methods)
+        expected_results = merge.process_cities_data(process_methods=process_methods)
+        assert [df.shape for df in test_results] == [(162914, 27), (73547, 21)]
+        assert all(df_test.equals(df_expected) for df_test, df_expected in zip(test_results, expected_results))
+
+
     def test_process_all_data(self):
         assert merge.process_all_data().shape == (716166, 26)
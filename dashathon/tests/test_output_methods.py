@@ -0,0 +1,85 @@
+import os
+import unittest
+
+import dashathon.scraping.output_methods as output_methods
+
+
+class OutputMethodsTest(unittest.TestCase):
+
+    def tearDown(self):
+        for file_to_remove in ['test_output.csv'] + output_methods.get_worker_paths('test_output.csv'):
+            if os.path.isfile(file_to_remove):
+                os.remove(file_to_remove)
+
+    def test_record_writer_flush_rows(self):
+        flushed_tokens = []
+        writer = output_methods.RecordWriter('test_output.csv', headers=['city', 'state', 'finish'], flush_rows=2,
+                                             flush_seconds=60, on_flush=flushed_tokens.append)
+        writer.write(['New York', 'NY', 1.0], token=1)
+        # Buffered rows aren't written, so their tokens aren't passed on yet
+        assert flushed_tokens == [] and output_methods.read_records('test_output.csv') == (['city', 'state', 'finish'],
+                                                                                           [])
+        writer.write(['Fort Worth', 'TX', float('nan')], token=2)
+        writer.write(['Portland', 'OR', 3.0], token=3)
+        assert flushed_tokens == [[1, 2]]
+        writer.close()
+        assert flushed_tokens == [[1, 2], [3]] and writer.rows_written == 3
+
+
+    def test_record_writer_flush_seconds(self):
+        flushed_tokens = []
+        writer = output_methods.RecordWriter('test_output.csv', flush_rows=100, flush_seconds=0,
+                                             on_flush=flushed_tokens.append)
+        writer.write(['Portland', 'OR'], token=1)
+        assert flushed_tokens == [[1]]
+
+
+    def test_record_writer_truncate(self):
+        writer = output_methods.RecordWriter('test_output.csv', headers=['failed_urls'], flush_rows=100)
+        writer.write(['url_1'])
+        writer.flush()
+        writer.write(['url_2'])
+        writer.truncate()
+        writer.write(['url_3'])
+        writer.close()
+        assert output_methods.read_records('test_output.csv') == (['failed_urls'], [['url_3']])
+
+
+    def test_read_records(self):
+        writer = output_methods.RecordWriter('test_output.csv', headers=['city', 'state', 'finish'])
+        writer.write(['New York', 'NY', 1.0])
+        writer.write(['Pipe|Town', '"Q"', float('nan')])
+        writer.write(['Line\nBreak', 'XX', 2.0])
+        writer.close()
+        # Rows are appended to an existing file, without repeating the header row
+        writer = output_methods.RecordWriter('test_output.csv', headers=['city', 'state', 'finish'])
+        writer.write(['Portland', 'OR', 3.0])
+        writer.close()
+
+        headers, rows = output_methods.read_records('test_output.csv')
+        assert headers == ['city', 'state', 'finish']
+        assert rows == [['New York', 'NY', '1.0'], ['Pipe|Town', '"Q"', 'NaN'], ['Line Break', 'XX', '2.0'],
+                        ['Portland', 'OR', '3.0']]
+
+
+    def test_split_record(self):
+        assert output_methods.split_record('2017|"Pipe|Town"|NY', num_fields=3) == ['2017', 'Pipe|Town', 'NY']
+        # Unescaped quotes left by older scrapers are kept as written
+        assert output_methods.split_record('2014|Torreon|"COAHUILA|MEX', num_fields=4) == ['2014', 'Torreon',
+                                                                                          '"COAHUILA', 'MEX']
+
+
+    def test_merge_worker_outputs(self):
+        assert output_methods.get_worker_path('test_output.csv', 'host-1:42') == 'test_output.worker-host-1_42.csv'
+        for worker_id, rows in [('1', [[2017, '10'], [2017, '11']]), ('2', [[2017, '11'], [2017, '12']])]:
+            writer = output_methods.RecordWriter(output_methods.get_worker_path('test_output.csv', worker_id),
+                                                 headers=['year', 'bib'])
+            for row in rows:
+                writer.write(row)
+            writer.close()
+
+        # A runner scraped by both workers is kept once, and merging again changes nothing
+        assert output_methods.merge_worker_outputs('test_output.csv') == 3
+        assert output_methods.merge_worker_outputs('test_output.csv') == 3
+        assert output_methods.read_records('test_output.csv') == (['year', 'bib'], [['2017', '10'], ['2017', '11'],
+                                                                                    ['2017', '12']])
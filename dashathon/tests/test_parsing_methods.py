@@ -0,0 +1,79 @@
+import unittest
+from math import isnan
+
+import dashathon.scraping.parsing_methods as parsing
+from dashathon.tests.fixture_server import read_fixture
+
+berlin_splits_html = ('<html><body><table class="list-table"><thead><tr><th>Split</th><th>Uhrzeit</th><th>Zeit</th>'
+                      '</tr></thead><tbody><tr><th class="desc">5 km</th><td>09:27:30</td><td> 00:39:34 </td></tr>'
+                      '<tr><th class="desc">10 km</th><td>-</td><td>-</td></tr>'
+                      '<tr><th class="desc">5 km</th><td>09:28:30</td><td>00:40:34</td></tr></tbody></table>'
+                      '</body></html>')
+
+
+class ParsingMethodsTest(unittest.TestCase):
+
+    def test_get_info(self):
+        root = parsing.parse_html(read_fixture('chicago_runner_details.html'))
+        assert parsing.get_info(root, '__fullname') == 'Doe, John (USA)'
+        assert parsing.get_info(root, 'event_date') == '2016' and parsing.get_info(root, 'place_nosex') == '40558'
+        self.assertRaises(IndexError, parsing.get_info, root, 'start_no_text')
+
+
+    def test_get_list_tables(self):
+        assert len(parsing.get_list_tables(parsing.parse_html(read_fixture('london_runner_details.html')))) == 5
+        assert len(parsing.get_list_tables(parsing.parse_html(read_fixture('chicago_runner_details.html')))) == 0
+
+
+    def test_get_table_split_times(self):
+        splits_table = parsing.get_list_tables(parsing.parse_html(berlin_splits_html))[0]
+        split_times = parsing.get_table_split_times(splits_table, time_headers=['zeit', 'time'])
+        # The first of repeated splits is kept, and missing times are NaN
+        assert list(split_times) == ['5 km', '10 km'] and split_times['5 km'] == 2374.0 and isnan(split_times['10 km'])
+        assert parsing.get_table_split_times(splits_table, time_headers=['time']) == {}
+
+
+    def test_get_chicago_split_times(self):
+        split_times = parsing.get_chicago_split_times(parsing.parse_html(read_fixture('chicago_runner_details.html')))
+        assert list(split_times) == ['05k', '10k', '15k', '20k', 'half', '25k', '30k', '35k', '40k', 'finish']
+        assert split_times['05k'] == 6160.0 and split_times['finish'] == 35276.0 and isnan(split_times['half'])
+
+
+    def test_parse_html_encoding(self):
+        html = '<html><body><table><tr><td class="f-__fullname">Müller, Jörg (AUT)</td></tr></table></body></html>'
+        assert parsing.get_info(parsing.parse_html(html.encode('utf-8')), '__fullname') == 'Müller, Jörg (AUT)'
+
+
+    def test_scan_page(self):
+        for race in ['chicago', 'london', 'berlin']:
+            html = read_fixture(race + '_runner_details.html')
+            page, root = parsing.scan_page(html), parsing.parse_html(html)
+            assert len(parsing.get_list_tables(page)) == len(parsing.get_list_tables(root))
+            assert parsing.get_info(page, '__fullname') == parsing.get_info(root, '__fullname')
+        html = read_fixture('chicago_runner_details.html')
+        assert (str(parsing.get_chicago_split_times(parsing.scan_page(html))) ==
+                str(parsing.get_chicago_split_times(parsing.parse_html(html))))
+        splits_table = parsing.get_list_tables(parsing.scan_page(berlin_splits_html))[0]
+        split_times = parsing.get_table_split_times(splits_table, time_headers=['zeit', 'time'])
+        assert list(split_times) == ['5 km', '10 km'] and split_times['5 km'] == 2374.0 and isnan(split_times['10 km'])
+        # Entities are decoded, and nested tables are left for the tree parser
+        html = '<table><tr><td class="f-__fullname">M&uuml;ller, J&ouml;rg</td></tr></table>'
+        assert parsing.get_info(parsing.scan_page(html), '__fullname') == 'Müller, Jörg'
+        assert parsing.scan_page('<table><tr><td><table><tr><td>1</td></tr></table></td></tr></table>') is None
+
+
+    def test_parse_page(self):
+        counts = parsing.get_fast_path_counts()
+        html = '<table><tr><td class="f-age_class">20-24</td></tr></table>'
+        assert parsing.parse_page(html, lambda root: parsing.get_info(root, 'age_class')) == '20-24'
+        assert parsing.was_fast_path_hit()
+        # A cell holding markup is read from the tree
+        html = '<table><tr><td class="f-age_class"><b>20-24</b></td></tr></table>'
+        assert parsing.parse_page(html, lambda root: parsing.get_info(root, 'age_class')) == '20-24'
+        assert not parsing.was_fast_path_hit()
+        assert parsing.get_fast_path_counts() - counts == {'hits': 1, 'misses': 1}
+        self.assertRaises(IndexError, parsing.parse_page, html, lambda root: parsing.get_info(root, 'start_no_text'))
+        # Other errors of the fast path are raised rather than hidden by the tree parser
+        html = '<table><tr><td class="f-age_class">20-24</td></tr></table>'
+        self.assertRaises(KeyError, parsing.parse_page, html,
+                          lambda root: root.info['start_no'] if isinstance(root, parsing.ScannedPage) else 'tree')
@@ -0,0 +1,134 @@
+import os
+import unittest
+from time import sleep
+
+import dashathon.scraping.queue_methods as queue_methods
+
+
+class QueueMethodsTest(unittest.TestCase):
+
+    def setUp(self):
+        with open('test_queue_input.csv', 'w') as f:
+            f.write('url_1|Portland|OR\nurl_2|Ambo|\n\nurl_3|Toronto|ON\n')
+        self.queue = queue_methods.WorkQueue('test_queue.sqlite')
+
+    def tearDown(self):
+        self.queue.close()
+        for file_to_remove in ['test_queue_input.csv', 'test_queue.sqlite', 'test_queue.sqlite-wal',
+                               'test_queue.sqlite-shm', 'test_shared_queue.sqlite']:
+            if os.path.isfile(file_to_remove):
+                os.remove(file_to_remove)
+
+    def test_import_csv(self):
+        assert self.queue.import_csv('test_queue_input.csv') == 3
+        # Rows are claimed from the end of the input file, like the original scraping loop
+        assert [row for _, row in self.queue.claim(3)] == ['url_3|Toronto|ON', 'url_2|Ambo|', 'url_1|Portland|OR']
+
+
+    def test_claim_complete(self):
+        self.queue.put(['a', 'b', 'c'])
+        first_claim = self.queue.claim(2)
+        second_claim = self.queue.claim(2)
+        assert [row for _, row in first_claim] == ['a', 'b'] and [row for _, row in second_claim] == ['c']
+        assert self.queue.claim(2) == []
+
+        self.queue.complete([item_id for item_id, _ in first_claim])
+        assert self.queue.count(queue_methods.DONE) == 2 and self.queue.count(queue_methods.CLAIMED) == 1
+        assert self.queue.count() == 3
+
+
+    def test_crash_recovery(self):
+        self.queue.put(['a', 'b', 'c'])
+        self.queue.complete([item_id for item_id, _ in self.queue.claim(1)])
+        self.queue.claim(1)
+        self.queue.close()
+
+        # Reopening the journal returns the claimed but uncompleted item to the queue
+        self.queue = queue_methods.WorkQueue('test_queue.sqlite')
+        assert [row for _, row in self.queue.claim(3)] == ['b', 'c']
+
+
+    def test_put_unique(self):
+        assert self.queue.put(['a', 'b']) == 2
+        self.queue.complete([item_id for item_id, _ in self.queue.claim(1)])
+
+        # Rows already in the journal are skipped, whatever their status
+        assert self.queue.put(['a', 'b', 'c'], unique=True) == 1
+        assert [row for _, row in self.queue.claim(3)] == ['b', 'c']
+
+
+    def test_metadata(self):
+        assert self.queue.get_metadata('urls_complete') is None
+        self.queue.set_metadata('urls_complete', '1')
+        self.queue.close()
+
+        self.queue = queue_methods.WorkQueue('test_queue.sqlite')
+        assert self.queue.get_metadata('urls_complete') == '1'
+
+
+    def test_retry(self):
+        self.queue.put(['a', 'b'])
+        [(item_id, _), _] = self.queue.claim(2)
+        self.queue.retry(item_id, delay=60)
+
+        # The retried item is pending, but can't be claimed before its delay has passed
+        assert self.queue.count(queue_methods.PENDING) == 1 and self.queue.claim(1) == []
+        assert self.queue.get_attempts(item_id) == 1 and 59 < self.queue.get_retry_seconds() <= 60
+        self.queue.retry(item_id)
+        assert self.queue.claim(1) == [(item_id, 'a')] and self.queue.get_retry_seconds() is None
+
+
+    def test_fail_get_rows(self):
+        self.queue.put(['a', 'b', 'c'])
+        [(first_id, _), (second_id, _)] = self.queue.claim(2)
+        self.queue.complete([first_id])
+        self.queue.fail([second_id])
+
+        assert self.queue.count(queue_methods.FAILED) == 1 and self.queue.claim(2) == [(3, 'c')]
+        assert self.queue.get_rows(queue_methods.DONE) == ['a'] and self.queue.get_rows() == ['a', 'b', 'c']
+        # Rows already in the journal are skipped when importing a regenerated input file
+        assert self.queue.import_csv('test_queue_input.csv', unique=True) == 3
+        assert self.queue.import_csv('test_queue_input.csv', unique=True) == 0
+
+
+    def test_compact_url(self):
+        template = ('http://chicago-history.r.mikatiming.de/2015/?content=detail&idp=999999107FA309000019D3BA&lang='
+                    'EN_CAP&event=MAR_999999107FA309000000008D&lang=EN_CAP&search%5Bstart_no%5D=54250')
+        url = template.replace('19D3BA', '19D3BB').replace('54250', '54251')
+        token = queue_methods.compact_url(url, template)
+        assert token == '?1=999999107FA309000019D3BB&5=54251' and queue_methods.expand_url(token, template) == url
+        assert queue_methods.expand_url(queue_methods.compact_url(template, template), template) == template
+        # URLs that don't fit the template are kept whole
+        assert queue_methods.compact_url(url + '&page=2', template) == url + '&page=2'
+        assert queue_methods.compact_url(url.replace('2015', '2016'), template) == url.replace('2015', '2016')
+
+
+    def test_put_compact_rows(self):
+        rows = ['http://host/?content=detail&idp=' + str(idp) + '&lang=EN|Portland|OR' for idp in range(3)]
+        self.queue.put(rows)
+        self.queue.close()
+
+        self.queue = queue_methods.WorkQueue('test_queue.sqlite')
+        assert [row for _, row in self.queue.claim(3)] == rows and self.queue.put(rows, unique=True) == 0
+        assert self.queue.get_metadata('url_template') == 'http://host/?content=detail&idp=0&lang=EN'
+
+
+    def test_shared_leases(self):
+        worker_1 = queue_methods.WorkQueue('test_shared_queue.sqlite', shared=True, worker_id='1', lease_seconds=0.2)
+        worker_2 = queue_methods.WorkQueue('test_shared_queue.sqlite', shared=True, worker_id='2', lease_seconds=0.2)
+        worker_1.put(['a', 'b', 'c', 'd'])
+        assert [row for _, row in worker_1.claim(2)] == ['a', 'b'] and [row for _, row in worker_2.claim(1)] == ['c']
+        assert worker_2.get_lease_seconds() <= 0.2 and worker_1.get_lease_seconds() <= 0.2
+
+        # Worker 1 stops renewing its leases, e.g. after a crash, while worker 2 keeps renewing its own
+        sleep(0.12)
+        assert worker_2.renew_leases() == 1
+        sleep(0.12)
+        assert [row for _, row in worker_2.claim(4)] == ['d', 'a', 'b'] and worker_2.get_lease_seconds() is None
+        worker_2.close()
+
+        # Reopening a shared queue only releases the items claimed by the same worker
+        worker_2 = queue_methods.WorkQueue('test_shared_queue.sqlite', shared=True, worker_id='2', lease_seconds=0.2)
+        assert worker_1.count(queue_methods.PENDING) == 4 and [row for _, row in worker_1.claim(1)] == ['a']
+        worker_2.close()
+        worker_1.close()
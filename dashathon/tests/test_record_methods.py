@@ -0,0 +1,24 @@
+import unittest
+from math import isnan
+
+import dashathon.scraping.record_methods as record_methods
+
+
+class RecordMethodsTest(unittest.TestCase):
+
+    def test_convert_time_to_seconds(self):
+        assert record_methods.convert_time_to_seconds('02:15:38') == 8138.0
+        assert record_methods.convert_time_to_seconds(' 00:15:48 ') == 948.0
+        assert all(isnan(record_methods.convert_time_to_seconds(time_string)) for time_string in ['-', '', '15:48',
+                                                                                                   'ab:cd:ef'])
+
+
+    def test_select_split_times(self):
+        split_times = record_methods.select_split_times({'5k': 1500.0, 'finish': 12000.0}, ['5k', '10k', 'finish'])
+        assert split_times[0] == 1500.0 and isnan(split_times[1]) and split_times[2] == 12000.0
+
+
+    def test_record_fields(self):
+        assert record_methods.ChicagoRunner._fields[-10:] == tuple('split_' + split for split in record_methods.SPLITS)
+        assert len(record_methods.LondonRunner._fields) == len(record_methods.HEADERS_LONDON) == 18
+        assert len(record_methods.BerlinRunner._fields) == len(record_methods.HEADERS_BERLIN) == 17
@@ -0,0 +1,62 @@
+import os
+import tempfile
+
+import dashathon.scraping.scheduler_methods as scheduler
+from dashathon.tests.fixture_server import FixtureServerTestCase
+from dashathon.scraping.output_methods import read_records
+
+
+class SchedulerMethodsTest(FixtureServerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.test_paths = [self.directory]
+
+    def test_get_job_matrix(self):
+        jobs = scheduler.get_job_matrix(years=[2017, 2016])
+        # London has an elite event on top of the mass event
+        assert len(jobs) == 2 * 2 * 4
+        assert jobs[0] == scheduler.ScrapeJob('chicago', 2017, 'M', 'MAR_999999107FA30900000000A1',
+                                              'http://chicago-history.r.mikatiming.de/2015/', None)
+        assert [job.name for job in jobs[1:3]] == ['london_marathon_2017_M', 'london_marathon_2017_M_elite']
+        assert jobs[2].url == 'http://results-2017.virginmoneylondonmarathon.com/2017/'
+        assert scheduler.get_job_paths(jobs[3], 'data') == (os.path.join('data', 'berlin_marathon_2017_M_urls.csv'),
+                                                            os.path.join('data', 'berlin_marathon_2017_M.csv'),
+                                                            os.path.join('data', 'berlin_marathon_2017_M_error_log.csv'))
+
+
+    def test_run_jobs(self):
+        # One server per race, so that every race has its own host
+        servers = {race: self.start_server(num_runners=30) for race in scheduler.RACES}
+        jobs = [scheduler.ScrapeJob('chicago', 2016, 'M', 'ALL_EVENT_GROUP_2016', num_results_per_page=25,
+                                    url=servers['chicago'].base_url + 'chicago/'),
+                scheduler.ScrapeJob('london', 2017, 'W', 'MAS', num_results_per_page=25,
+                                    url=servers['london'].base_url + 'london/'),
+                scheduler.ScrapeJob('berlin', 2016, 'M', 'MAL', num_results_per_page=25,
+                                    url=servers['berlin'].base_url + 'berlin/'),
+                scheduler.ScrapeJob('berlin', 2016, 'W', 'MAL', num_results_per_page=25,
+                                    url=servers['berlin'].base_url + 'berlin/')]
+        failures = scheduler.run_jobs(jobs, directory=self.directory, num_workers=2, delay=0)
+        num_rows = [len(read_records(scheduler.get_job_paths(job, self.directory)[1])[1]) for job in jobs]
+
+        # Running the jobs again resumes each one from its journal, so no runner is scraped twice
+        num_requests = [sum(server.status_counts.values()) for server in servers.values()]
+        failures_rerun = scheduler.run_jobs(jobs, directory=self.directory, num_workers=2, delay=0)
+        num_rerun_requests = [sum(server.status_counts.values()) for server in servers.values()]
+
+        assert failures == {} and failures_rerun == {}
+        assert num_rows == [30, 30, 30, 30]
+        assert num_rerun_requests == num_requests
+
+
+    def test_run_jobs_failure(self):
+        server = self.start_server(num_runners=5)
+        jobs = [scheduler.ScrapeJob('london', 2017, 'M', 'MAS', url=server.base_url + 'missing/'),
+                scheduler.ScrapeJob('london', 2017, 'W', 'MAS', num_results_per_page=25,
+                                    url=server.base_url + 'london/')]
+        failures = scheduler.run_jobs(jobs, directory=self.directory, delay=0)
+        num_rows = len(read_records(scheduler.get_job_paths(jobs[1], self.directory)[1])[1])
+
+        # The job whose web form doesn't exist fails without stopping the next job on the same host
+        assert list(failures) == [jobs[0]] and num_rows == 5
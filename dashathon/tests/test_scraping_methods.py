@@ -2,7 +2,17 @@ import unittest
 
 import pandas as pd
 import os
+import threading
+from math import nan
 import dashathon.scraping.scraping_methods as scrape
+import dashathon.merging.merging_methods as merge
+from dashathon.tests.fixture_server import FixtureServerTestCase, read_fixture, get_runner_idp
+from dashathon.scraping.cache_methods import PageCache
+from dashathon.scraping.concurrency_methods import CircuitBreaker, HostLimiter
+from dashathon.scraping.http_methods import SessionPool
+from dashathon.scraping.queue_methods import WorkQueue, PENDING
+from dashathon.scraping.output_methods import read_records, get_worker_path
+from dashathon.scraping.telemetry_methods import ScrapeMetrics
 
 headers_chicago = ['year', 'bib', 'age_group', 'gender', 'city', 'state', 'country', 'overall', 'rank_gender',
                    'rank_age_group', '5k', '10k', '15k', '20k', 'half', '25k', '30k', '35k', '40k', 'finish']
@@ -15,16 +25,30 @@ headers_berlin = headers_chicago.copy()
 for unavailable_column in ['city', 'state', 'overall']:
     headers_berlin.remove(unavailable_column)
 
+expected_chicago_record = (2016, '54250', '20-24', 'M', 'Portland', 'OR', 'USA', '40558', '22034', '1136', 6160.0,
+                           9775.0, 12867.0, nan, nan, 20341.0, nan, nan, nan, 35276.0)
+expected_london_record = (2017, '1154', '18-39', 'M', 'GBR', '1', '1', '1', 948.0, 1899.0, 2848.0, 3799.0, 4000.0,
+                          4742.0, 5698.0, 6670.0, 7653.0, 8089.0)
+expected_berlin_record = (2016, '30529', '50-54', 'M', 'AUT', '26771', '4084', 2374.0, 4975.0, 7774.0, 10743.0,
+                          11428.0, 14518.0, 18183.0, nan, nan, 26648.0)
 
-class ScrapingMethodsTest(unittest.TestCase):
+
+def records_equal(record, expected_record):
+    # NaN never equals itself, so missing split times are compared separately.
+    return len(record) == len(expected_record) and all(
+        (pd.isnull(value) and pd.isnull(expected_value)) or value == expected_value
+        for value, expected_value in zip(record, expected_record))
+
+
+class ScrapingMethodsTest(FixtureServerTestCase):
+    test_paths = ['test_file.txt', 'test_delete_last_line.txt', 'test_input_*', 'test_output_*', 'test_error_log_*',
+                  'test_page_cache']
 
     def setUp(self):
+        super().setUp()
         with open('test_file.txt', 'w') as f:
             f.write('this is the first line.\n')
 
-    def tearDown(self):
-        os.remove('test_file.txt')
-
     def test_strip_special_latin_char(self):
         test_string = 'thƝis ƛis a teōst: ÆæœƔþðßøÞĿØĳƧaÐŒƒ¿Ǣ'
         assert scrape.strip_special_latin_char(test_string) == 'this is a test: AEaeoethdssoTHOaDOEf'
@@ -38,6 +62,17 @@ class ScrapingMethodsTest(unittest.TestCase):
     def test_convert_to_ascii(self):
         test_string = 'thƝîš ƛìŝ ã tëśt: ÆæœƔþðßøÞĿØĳƧaÐŒƒ¿Ǣ'
         assert scrape.convert_to_ascii(test_string) == 'this is a test: AEaeoethdssoTHOaDOEfAE'
+        # Characters outside the precompiled Latin blocks are converted the same way as with the original methods
+        test_string = 'Ἀθῆναι, Ελλάδα ſ ǅ ﬁ ①'
+        assert scrape.convert_to_ascii(test_string) == scrape.strip_special_latin_char(
+            scrape.strip_accents(test_string)) == ',     '
+
+
+    def test_convert_column_to_ascii(self):
+        column = pd.Series(['Zürich', 'Besançon', 'Zürich', None, 'Portland'], index=[5, 4, 3, 2, 1])
+        column_ascii = scrape.convert_column_to_ascii(column)
+        assert column_ascii.tolist() == ['Zurich', 'Besancon', 'Zurich', None, 'Portland']
+        assert column_ascii.index.tolist() == [5, 4, 3, 2, 1]
 
 
     def test_row_count_csv(self):
@@ -57,6 +92,305 @@ class ScrapingMethodsTest(unittest.TestCase):
         assert original_row_count == 1 and deleted_row_count == 0
 
 
+    def test_get_queue_path(self):
+        assert scrape.get_queue_path('chicago_marathon_2017_M_urls.csv') == 'chicago_marathon_2017_M_urls.sqlite'
+
+
+    def test_scrape_chicago_marathon_concurrent(self):
+        server = self.start_server()
+        with open('test_input_chicago.csv', 'w') as f:
+            for idp in range(10):
+                f.write(server.base_url + 'chicago/?content=detail&idp=' + get_runner_idp('chicago', idp) +
+                        '|Portland|OR\n')
+        scrape.scrape_chicago_marathon(path_input='test_input_chicago.csv', path_output='test_output_chicago.csv',
+                                       path_error='test_error_log_chicago.csv', gender='M',
+                                       headers=headers_chicago, num_workers=4, delay=0)
+        scraped_df = pd.read_csv('test_output_chicago.csv', header=0, sep='|')
+        queue = WorkQueue('test_input_chicago.sqlite')
+        num_pending = queue.count(PENDING)
+        queue.close()
+
+        assert num_pending == 0 and scraped_df.shape == (10, 20)
+        assert sorted(scraped_df['bib'].tolist()) == list(range(10000, 10010))
+        assert scraped_df['finish'].tolist() == [35276.0] * 10
+
+
+    def test_scrape_chicago_marathon_city_with_spaces(self):
+        server = self.start_server()
+        with open('test_input_chicago.csv', 'w') as f:
+            url = server.base_url + 'chicago/?content=detail&idp='
+            f.write(url + get_runner_idp('chicago', 0) + '|New York|NY\n')
+            f.write(url + get_runner_idp('chicago', 1) + '|Saint Paul|\n')
+        scrape.scrape_chicago_marathon(path_input='test_input_chicago.csv', path_output='test_output_chicago.csv',
+                                       path_error='test_error_log_chicago.csv', gender='M',
+                                       headers=headers_chicago, delay=0)
+        scraped_df = merge.pipe_reader('test_output_chicago.csv')
+
+        assert sorted(scraped_df['city'].tolist()) == ['New York', 'Saint Paul'] and scraped_df.shape == (2, 20)
+
+
+    def test_scrape_london_marathon_resume(self):
+        server = self.start_server()
+        with open('test_input_london.csv', 'w') as f:
+            for idp in range(6):
+                f.write(server.base_url + 'london/?content=detail&idp=' + get_runner_idp('london', idp) + '\n')
+
+        # Simulate a prior run that completed 2 runners and crashed while scraping 2 more
+        queue = WorkQueue('test_input_london.sqlite')
+        queue.import_csv('test_input_london.csv')
+        queue.complete([item_id for item_id, _ in queue.claim(2)])
+        queue.claim(2)
+        queue.close()
+
+        scrape.scrape_london_marathon(path_input='test_input_london.csv', path_output='test_output_london.csv',
+                                      path_error='test_error_log_london.csv', year=2017, gender='M',
+                                      headers=headers_london, delay=0)
+        scraped_df = pd.read_csv('test_output_london.csv', header=0, sep='|')
+
+        assert scraped_df.shape == (4, 18)
+
+
+    def test_scrape_london_marathon_urls_replay(self):
+        url = 'http://london.test/2017/'
+        form_html = ('<html><body><form action="."></form><form action="." method="get"><select name="event">'
+                     '<option value="MAS">MAS</option></select><input type="text" name="search[sex]">'
+                     '<input type="text" name="search[age_class]"><select name="num_results"><option value="1000">1000'
+                     '</option></select></form></body></html>')
+        results_html = ('<html><body><div class="list-info-text">1 Results</div><table><tbody><tr><td>1</td><td>1</td>'
+                        '<td>1154</td><td><a href="?content=detail&amp;idp=9999990F5ECC85000024C3F9">Runner, Fast</a>'
+                        '</td></tr></tbody></table></body></html>')
+        cache = PageCache('test_page_cache', replay=True)
+        cache.put(cache.get_key(url), url, [('Content-Type', 'text/html')], form_html.encode('utf-8'))
+        results_url = url + '?event=MAS&search%5Bsex%5D=M&search%5Bage_class%5D=%25&num_results=1000'
+        cache.put(cache.get_key(results_url), results_url, [('Content-Type', 'text/html')],
+                  results_html.encode('utf-8'))
+
+        # Every page is replayed from the cache, without any network access
+        scraped_df = scrape.scrape_london_marathon_urls(url=url, event='MAS', year=2017, gender='M',
+                                                        num_results_per_page=1000,
+                                                        session=SessionPool(cache=cache))
+
+        assert scraped_df['urls'].tolist() == [url + '?content=detail&idp=9999990F5ECC85000024C3F9']
+
+
+    def test_scrape_marathon_urls_pagination(self):
+        server = self.start_server(num_runners=60)
+        df_chicago = scrape.scrape_chicago_marathon_urls(url=server.base_url + 'chicago/', year=2016,
+                                                         event='ALL_EVENT_GROUP_2016', gender='M',
+                                                         num_results_per_page=25)
+        df_london = scrape.scrape_london_marathon_urls(url=server.base_url + 'london/', event='MAS', year=2017,
+                                                       gender='M', num_results_per_page=25)
+        df_berlin = scrape.scrape_berlin_marathon_urls(url=server.base_url + 'berlin/', event='MAL', year=2016,
+                                                       gender='M', num_results_per_page=25)
+
+        # 3 pages of results per race, with every runner found once
+        assert [df['urls'].nunique() for df in [df_chicago, df_london, df_berlin]] == [60, 60, 60]
+        assert df_chicago['urls'][59] == (server.base_url + 'chicago/?content=detail&idp=' +
+                                          get_runner_idp('chicago', 59) + '&lang=EN_CAP')
+        assert df_chicago['city'][:6].tolist() == ['Portland', 'New York', 'Saint Paul', 'Toronto', 'Addis Ababa', None]
+        assert df_chicago['state'][:6].tolist() == ['OR', 'NY', 'MN', 'ON', None, None]
+
+
+    def test_scrape_marathon_urls_parallel_pagination(self):
+        server = self.start_server(num_runners=230)
+        dfs = [scrape.scrape_berlin_marathon_urls(url=server.base_url + 'berlin/', event='MAL', year=2016,
+                                                  gender='M', num_results_per_page=25,
+                                                  num_page_workers=num_page_workers)
+               for num_page_workers in [1, 4]]
+
+        # 10 pages fetched concurrently are merged back in page order, exactly as when following the '>' links
+        assert dfs[1]['urls'].tolist() == dfs[0]['urls'].tolist()
+        assert dfs[1].shape == (230, 1) and dfs[1]['urls'].is_unique
+
+
+    def test_scrape_marathon_urls_page_size_probe(self):
+        # The server returns at most 40 results per page, whatever the form asks for
+        server = self.start_server(num_runners=230, max_results_per_page=40)
+        df_urls = scrape.scrape_london_marathon_urls(url=server.base_url + 'london/', event='MAS', year=2017,
+                                                     gender='M')
+        num_first_requests = server.status_counts[200]
+        df_urls_cached = scrape.scrape_london_marathon_urls(url=server.base_url + 'london/', event='MAS',
+                                                            year=2017, gender='W')
+        df_urls_berlin = scrape.scrape_berlin_marathon_urls(url=server.base_url + 'berlin/', event='MAL',
+                                                            year=2016, gender='M', num_page_workers=4)
+
+        # The form, then 6 pages of 40 results. Every runner is found although 40 is less than the size requested.
+        assert num_first_requests == 7 and len(df_urls) == 230 and df_urls['urls'].is_unique
+        assert len(df_urls_cached) == 230 and len(df_urls_berlin) == 230
+        assert scrape.get_num_results_per_page(server.base_url + 'london/', 2017, 100, 40, 230) == 40
+        assert scrape.get_num_results_per_page(server.base_url + 'london/', 2017, 2500, 230, 230) == 2500
+
+
+    def test_drop_seen_runners(self):
+        seen_urls = set()
+        assert scrape.drop_seen_runners([('url_1', 'Ambo'), ('url_2', None)], seen_urls) == [('url_1', 'Ambo'),
+                                                                                             ('url_2', None)]
+        assert scrape.drop_seen_runners([('url_2', None), ('url_3', 'Ambo'), ('url_3', 'Ambo')],
+                                        seen_urls) == [('url_3', 'Ambo')]
+        assert scrape.get_page_url('http://a.com/2016/?page=2&event=MAL&pid=list', 7) == ('http://a.com/2016/?page=7'
+                                                                                           '&event=MAL&pid=list')
+        assert scrape.get_page_url('http://a.com/2016/?event=MAL', 7) is None
+
+
+    def test_scrape_london_marathon_pipelined(self):
+        server = self.start_server(num_runners=60)
+        url_pages = scrape.iter_london_marathon_urls(url=server.base_url + 'london/', event='MAS', year=2017,
+                                                     gender='M', num_results_per_page=25)
+        scrape.scrape_london_marathon(path_input='test_input_london.csv', path_output='test_output_london.csv',
+                                      path_error='test_error_log_london.csv', year=2017, gender='M',
+                                      headers=headers_london, url_pages=url_pages, num_workers=4, delay=0)
+        headers, rows = read_records('test_output_london.csv')
+        queue = WorkQueue('test_input_london.sqlite')
+        num_pending, urls_complete = queue.count(PENDING), queue.get_metadata('urls_complete')
+        queue.close()
+
+        # Every runner of the 3 results pages was scraped, without exporting the URLs to path_input first
+        assert headers == headers_london and len(rows) == 60
+        assert num_pending == 0 and urls_complete == '1'
+        assert not os.path.isfile('test_input_london.csv')
+
+
+    def test_scrape_chicago_marathon_parse_processes(self):
+        server = self.start_server(num_runners=12, error_rate=0.2)
+        df_urls = scrape.scrape_chicago_marathon_urls(url=server.base_url + 'chicago/', year=2016,
+                                                      event='ALL_EVENT_GROUP_2016', gender='M',
+                                                      num_results_per_page=25)
+        scrape.scrape_chicago_marathon(path_input='test_input_chicago.csv', path_output='test_output_chicago.csv',
+                                       path_error='test_error_log_chicago.csv', gender='M',
+                                       headers=headers_chicago, df_urls=df_urls, delay=0, num_workers=4,
+                                       retry_delay=0.01, max_retries=10, num_parse_processes=2)
+        _, rows = read_records('test_output_chicago.csv')
+
+        # Pages parsed in separate processes give the same records, with the city and state of each runner's row
+        assert len(rows) == 12
+        assert sorted(row[4] for row in rows) == sorted(df_urls['city'].fillna('').tolist())
+        assert all(row[-1] == str(expected_chicago_record[-1]) for row in rows)
+
+
+    def test_scrape_berlin_marathon_http_errors(self):
+        server = self.start_server(num_runners=5, error_rate=1.0)
+        df_urls = scrape.scrape_berlin_marathon_urls(url=server.base_url + 'berlin/', event='MAL', year=2016,
+                                                     gender='M', num_results_per_page=25)
+        scrape.scrape_berlin_marathon(path_input='test_input_berlin.csv', path_output='test_output_berlin.csv',
+                                      path_error='test_error_log_berlin.csv', year=2016, gender='M',
+                                      headers=headers_berlin, df_urls=df_urls, delay=0, max_retries=1,
+                                      retry_delay=0.01, circuit_breaker=CircuitBreaker(max_failures=100))
+        scraped_df = pd.read_csv('test_output_berlin.csv', header=0, sep='|')
+        error_df = pd.read_csv('test_error_log_berlin.csv', header=0, sep='|')
+
+        # Every runner page failed with HTTP 500, so every runner is logged for a later retry after 2 attempts, then
+        # 2 more attempts once the error log is drained
+        assert scraped_df.shape == (0, 17) and sorted(error_df['failed_urls']) == sorted(df_urls['urls'])
+        assert server.status_counts[500] == 20
+
+
+    def test_scrape_berlin_marathon_trial_request_error(self):
+        class FailingLimiter(HostLimiter):
+            def slot(self, url):
+                raise RuntimeError('No slot for ' + url)
+
+        server = self.start_server(num_runners=5)
+        # The host's circuit is open and due for a trial request
+        circuit_breaker = CircuitBreaker(max_failures=1, reset_seconds=0)
+        circuit_breaker.record(server.base_url, success=False)
+        df_urls = scrape.scrape_berlin_marathon_urls(url=server.base_url + 'berlin/', event='MAL', year=2016,
+                                                     gender='M', num_results_per_page=25)
+        with self.assertRaises(RuntimeError):
+            scrape.scrape_berlin_marathon(path_input='test_input_berlin.csv', path_output='test_output_berlin.csv',
+                                          path_error='test_error_log_berlin.csv', year=2016, gender='M',
+                                          headers=headers_berlin, df_urls=df_urls, delay=0,
+                                          circuit_breaker=circuit_breaker, limiter=FailingLimiter())
+
+        # The trial request raised, yet its failure was recorded, so requests to the host are not held up forever
+        waiter = threading.Thread(target=circuit_breaker.wait, args=(server.base_url,))
+        waiter.start()
+        waiter.join(timeout=2)
+        assert not waiter.is_alive()
+
+
+    def test_scrape_berlin_marathon_retries(self):
+        server = self.start_server(num_runners=20, error_rate=0.3)
+        circuit_breaker = CircuitBreaker(max_failures=3, reset_seconds=0.05)
+        metrics = ScrapeMetrics()
+        df_urls = scrape.scrape_berlin_marathon_urls(url=server.base_url + 'berlin/', event='MAL', year=2016,
+                                                     gender='M', num_results_per_page=25)
+        scrape.scrape_berlin_marathon(path_input='test_input_berlin.csv', path_output='test_output_berlin.csv',
+                                      path_error='test_error_log_berlin.csv', year=2016, gender='M',
+                                      headers=headers_berlin, df_urls=df_urls, delay=0, num_workers=4,
+                                      max_retries=10, retry_delay=0.01, circuit_breaker=circuit_breaker,
+                                      metrics=metrics)
+        _, rows = read_records('test_output_berlin.csv')
+        _, error_rows = read_records('test_error_log_berlin.csv')
+
+        # Failed runner pages were retried until every runner was scraped
+        assert len(rows) == 20 and error_rows == []
+        assert server.status_counts[500] > 0 and metrics.get_summary()['errors_by_status'] == {
+            '500': server.status_counts[500]}
+        assert metrics.get_summary()['runners_done'] == 20 and metrics.get_summary()['parse_seconds']['count'] == 20
+        assert metrics.get_summary()['fast_path_hit_rate'] == 1.0
+
+
+    def test_scrape_berlin_marathon_top_up(self):
+        server = self.start_server(num_runners=20)
+        kwargs = dict(path_input='test_input_berlin.csv', path_output='test_output_berlin.csv',
+                      path_error='test_error_log_berlin.csv', year=2016, gender='M', headers=headers_berlin, delay=0,
+                      num_workers=4)
+        scrape.scrape_berlin_marathon(url_pages=scrape.iter_berlin_marathon_urls(
+            url=server.base_url + 'berlin/', event='MAL', year=2016, gender='M', num_results_per_page=25),
+            **kwargs)
+        num_first_requests = server.status_counts[200]
+
+        # The results are amended with 10 more runners. Only the new runners are scraped.
+        server.num_runners = 30
+        scrape.scrape_berlin_marathon(url_pages=scrape.iter_berlin_marathon_urls(
+            url=server.base_url + 'berlin/', event='MAL', year=2016, gender='M', num_results_per_page=25),
+            top_up=True, **kwargs)
+        num_top_up_requests = server.status_counts[200] - num_first_requests
+
+        # Without its journal, runners are scraped again but not written twice
+        os.remove('test_input_berlin.sqlite')
+        df_urls = scrape.scrape_berlin_marathon_urls(url=server.base_url + 'berlin/', event='MAL', year=2016,
+                                                     gender='M', num_results_per_page=25)
+        scrape.scrape_berlin_marathon(df_urls=df_urls, **kwargs)
+        headers, rows = read_records('test_output_berlin.csv')
+
+        # The form and 2 results pages, then the 10 new runners
+        assert num_top_up_requests == 13
+        bibs = [row[headers.index('bib')] for row in rows]
+        assert len(rows) == 30 and sorted(bibs) == [str(bib) for bib in range(10000, 10030)]
+
+
+    def test_scrape_berlin_marathon_shared(self):
+        server = self.start_server(latency=0.01, num_runners=20)
+        kwargs = dict(path_input='test_input_berlin.csv', path_output='test_output_berlin.csv',
+                      path_error='test_error_log_berlin.csv', year=2016, gender='M', headers=headers_berlin, delay=0,
+                      num_workers=2, lease_seconds=0.5)
+        df_urls = scrape.scrape_berlin_marathon_urls(url=server.base_url + 'berlin/', event='MAL', year=2016,
+                                                     gender='M', num_results_per_page=25)
+        df_urls.to_csv('test_input_berlin.csv', header=False, index=False, sep='|')
+
+        # A worker claimed 3 runners, then crashed
+        queue = WorkQueue('test_input_berlin.sqlite', shared=True, worker_id='crashed', lease_seconds=0.5)
+        queue.import_csv('test_input_berlin.csv')
+        queue.claim(3)
+        queue.close()
+
+        workers = [threading.Thread(target=scrape.scrape_berlin_marathon, kwargs=dict(worker_id=worker_id, **kwargs))
+                   for worker_id in ['1', '2']]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        headers, rows = read_records('test_output_berlin.csv')
+        worker_rows = [read_records(get_worker_path('test_output_berlin.csv', worker_id))[1]
+                       for worker_id in ['1', '2']]
+
+        # Both workers scraped runners, including those of the crashed worker once its lease expired
+        assert all(worker_rows) and sum(len(rows) for rows in worker_rows) == 20
+        bibs = [row[headers.index('bib')] for row in rows]
+        assert len(rows) == 20 and sorted(bibs) == [str(bib) for bib in range(10000, 10020)]
+
+
     # noinspection PyTypeChecker
     def test_scrape_chicago_marathon_urls(self):
         scraped_df = scrape.scrape_chicago_marathon_urls(url='http://chicago-history.r.mikatiming.de/2015/', year=2017,
@@ -97,80 +431,48 @@ class ScrapingMethodsTest(unittest.TestCase):
                                                               expected_scraped_df.columns.values)
 
 
-    # noinspection PyTypeChecker
     def test_scrape_chicago_runner_details(self):
-        test_runner_info = [2016, '54250', '20-24', 'M', 'Portland', 'OR', 'USA', '40558', '22034', '1136']
-        test_runner_info = [[cell] * 10 for cell in test_runner_info]
-        test_split_times = [6160, 9775, 12867, None, None, 20341, None, None, None, 35276]
-        test_runner_dict = dict(zip(headers_chicago[:10], test_runner_info))
-        expected_scraped_df = pd.DataFrame()
-        expected_scraped_df['split'] = headers_chicago[10:]
-        expected_scraped_df['time'] = test_split_times
-        expected_scraped_df[headers_chicago[:10]] = pd.DataFrame.from_dict(test_runner_dict)
-        expected_scraped_df = pd.pivot_table(expected_scraped_df, index=headers_chicago[:10], columns='split',
-                                             values='time', aggfunc='first').reset_index()
-        expected_scraped_df = expected_scraped_df.reindex(headers_chicago, axis='columns')
+        scraped_record = scrape.scrape_chicago_runner_details(url=('http://chicago-history.r.mikatiming.de/2015/?content='
+                                                                   'detail&fpid=search&pid=search&idp=999999107FA309000019'
+                                                                   'D3BA&lang=EN_CAP&event=MAR_999999107FA309000000008D&'
+                                                                   'lang=EN_CAP&search%5Bstart_no%5D=54250&search_event='
+                                                                   'ALL_EVENT_GROUP_2016'), gender='M', city='Portland',
+                                                              state='OR')
+        assert records_equal(scraped_record, expected_chicago_record)
 
-        scraped_df = scrape.scrape_chicago_runner_details(url=('http://chicago-history.r.mikatiming.de/2015/?content=detail'
-                                                               '&fpid=search&pid=search&idp=999999107FA309000019D3BA&lang='
-                                                               'EN_CAP&event=MAR_999999107FA309000000008D&lang=EN_CAP&'
-                                                               'search%5Bstart_no%5D=54250&search_event=ALL_EVENT_GROUP_'
-                                                               '2016'), gender='M', city='Portland', state='OR')
 
-        assert scraped_df.equals(expected_scraped_df) and all(scraped_df.columns.values ==
-                                                              expected_scraped_df.columns.values)
+    def test_scrape_london_runner_details(self):
+        scraped_record = scrape.scrape_london_runner_details(url=('http://results-2017.virginmoneylondonmarathon.com/2017/'
+                                                                  '?content=detail&fpid=list&pid=list&idp=9999990F5ECC8500'
+                                                                  '0024C3F9&lang=EN_CAP&event=MAS&num_results=1000&search'
+                                                                  '%5Bage_class%5D=%25&search%5Bsex%5D=M&search_event=MAS'),
+                                                             year=2017, gender='M')
+        assert records_equal(scraped_record, expected_london_record)
 
 
-    # noinspection PyTypeChecker
-    def test_scrape_london_runner_details(self):
-        test_runner_info = [2017, '1154', '18-39', 'M', 'GBR', '1', '1', '1']
-        test_runner_info = [[cell] * 10 for cell in test_runner_info]
-        test_split_times = [948, 1899, 2848, 3799, 4000, 4742, 5698, 6670, 7653, 8089]
-        test_runner_dict = dict(zip(headers_london[:8], test_runner_info))
-        expected_scraped_df = pd.DataFrame()
-        expected_scraped_df['split'] = headers_london[8:]
-        expected_scraped_df['time'] = test_split_times
-        expected_scraped_df[headers_london[:8]] = pd.DataFrame.from_dict(test_runner_dict)
-        expected_scraped_df = pd.pivot_table(expected_scraped_df, index=headers_london[:8], columns='split', values='time',
-                                             aggfunc='first').reset_index()
-        expected_scraped_df = expected_scraped_df.reindex(headers_london, axis='columns')
+    def test_scrape_berlin_runner_details(self):
+        scraped_record = scrape.scrape_berlin_runner_details(url=('http://results.scc-events.com/2016/?content=detail&'
+                                                                  'fpid=search&pid=search&idp=99999905C9AF460000404FFD&'
+                                                                  'lang=EN&event=MAL_99999905C9AF3F0000000945&search%5B'
+                                                                  'start_no%5D=30529&search_sort=name&search_event='
+                                                                  'MAL_99999905C9AF3F0000000945'), year=2016, gender='M')
+        assert records_equal(scraped_record, expected_berlin_record)
 
-        scraped_df = scrape.scrape_london_runner_details(url=('http://results-2017.virginmoneylondonmarathon.com/2017/'
-                                                              '?content=detail&fpid=list&pid=list&idp=9999990F5ECC85000024C'
-                                                              '3F9&lang=EN_CAP&event=MAS&num_results=1000&search%5B'
-                                                              'age_class%5D=%25&search%5Bsex%5D=M&search_event=MAS'),
-                                                         year=2017, gender='M')
-        # pd.DataFrame.equals is behaving strangely. For ease, casting the scraped values as integers, which they are
-        # anyway.
-        for split_time in headers_london[8:]:
-            scraped_df[split_time] = scraped_df[split_time].astype('int64')
 
-        assert scraped_df.equals(expected_scraped_df) and all(scraped_df.columns.values ==
-                                                              expected_scraped_df.columns.values)
+    def test_parse_chicago_runner_details(self):
+        html = read_fixture('chicago_runner_details.html')
+        assert records_equal(scrape.parse_chicago_runner_details(html, gender='M', city='Portland', state='OR'),
+                             expected_chicago_record)
 
 
-    # noinspection PyTypeChecker
-    def test_scrape_berlin_runner_details(self):
-        test_runner = [2016, '30529', '50-54', 'M', 'AUT', '26771', '4084', 2374, 4975, 7774, 10743, 11428, 14518, 18183,
-                       None, None, 26648]
-        test_runner = [[cell] for cell in test_runner]
-        test_runner_dict = dict(zip(headers_berlin, test_runner))
-        expected_scraped_df = pd.DataFrame.from_dict(test_runner_dict)
-        expected_scraped_df = expected_scraped_df.reindex(headers_berlin, axis='columns')
+    def test_parse_london_runner_details(self):
+        html = read_fixture('london_runner_details.html')
+        assert records_equal(scrape.parse_london_runner_details(html, year=2017, gender='M'), expected_london_record)
 
-        scraped_df = scrape.scrape_berlin_runner_details(url=('http://results.scc-events.com/2016/?content=detail&fpid='
-                                                              'search&pid=search&idp=99999905C9AF460000404FFD&lang=EN&event'
-                                                              '=MAL_99999905C9AF3F0000000945&search%5Bstart_no%5D=30529'
-                                                              '&search_sort=name&search_event='
-                                                              'MAL_99999905C9AF3F0000000945'), year=2016, gender='M')
-        # pd.DataFrame.equals is behaving strangely. For ease, casting the scraped values as integers, which they are
-        # anyway.
-        for split_time in headers_berlin[7:]:
-            scraped_df[split_time] = scraped_df[split_time].astype('int64', errors='ignore')
-        scraped_df = scraped_df.replace({pd.np.nan: None})
 
-        assert scraped_df.equals(expected_scraped_df) and all(scraped_df.columns.values ==
-                                                              expected_scraped_df.columns.values)
+    def test_parse_berlin_runner_details(self):
+        html = read_fixture('berlin_runner_details.html')
+        assert records_equal(scrape.parse_berlin_runner_details(html, year=2016, gender='M'), expected_berlin_record)
 
 
     # noinspection PyTypeChecker
@@ -187,7 +489,7 @@ class ScrapingMethodsTest(unittest.TestCase):
         for split_time in headers_chicago[10:]:
             scraped_df[split_time] = scraped_df[split_time].astype('int64')
 
-        remove_list = ['test_input_chicago.csv', 'test_output_chicago.csv',
+        remove_list = ['test_input_chicago.csv', 'test_input_chicago.sqlite', 'test_output_chicago.csv',
                        'test_error_log_chicago.csv']
         for file_to_remove in remove_list:
             os.remove(file_to_remove)
@@ -222,7 +524,7 @@ class ScrapingMethodsTest(unittest.TestCase):
         for split_time in headers_london[8:]:
             scraped_df[split_time] = scraped_df[split_time].astype('int64')
 
-        remove_list = ['test_input_london.csv', 'test_output_london.csv',
+        remove_list = ['test_input_london.csv', 'test_input_london.sqlite', 'test_output_london.csv',
                        'test_error_log_london.csv']
         for file_to_remove in remove_list:
             os.remove(file_to_remove)
@@ -257,7 +559,7 @@ class ScrapingMethodsTest(unittest.TestCase):
         for split_time in headers_berlin[7:]:
             scraped_df[split_time] = scraped_df[split_time].astype('int64')
 
-        remove_list = ['test_input_berlin.csv', 'test_output_berlin.csv',
+        remove_list = ['test_input_berlin.csv', 'test_input_berlin.sqlite', 'test_output_berlin.csv',
                        'test_error_log_berlin.csv']
         for file_to_remove in remove_list:
             os.remove(file_to_remove)
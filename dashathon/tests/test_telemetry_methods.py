@@ -0,0 +1,85 @@
+import json
+import os
+import unittest
+import urllib.request
+
+import dashathon.scraping.telemetry_methods as telemetry
+
+
+class TelemetryMethodsTest(unittest.TestCase):
+
+    def tearDown(self):
+        if os.path.isfile('test_scrape_log.jsonl'):
+            os.remove('test_scrape_log.jsonl')
+
+    def test_get_percentile(self):
+        values = [0.1 * i for i in range(1, 101)]
+        assert telemetry.get_percentile(values, 50) == values[49] and telemetry.get_percentile(values, 99) == values[98]
+        assert telemetry.get_percentile(values, 0) == values[0] and telemetry.get_percentile([], 50) is None
+
+
+    def test_get_summary(self):
+        metrics = telemetry.ScrapeMetrics()
+        for i in range(1, 11):
+            metrics.record_fetch('http://a.test/?idp=' + str(i), latency=0.01 * i, status='200', num_bytes=100)
+        metrics.record_fetch('http://a.test/?idp=11', latency=1.0, status='500')
+        metrics.record_fetch('http://b.test/?idp=1', latency=2.0, status='connection')
+        metrics.record_parse('http://a.test/?idp=1', latency=0.002, fast_path=True)
+        metrics.set_progress('job_1', 10, 40)
+        metrics.set_progress('job_2', 0, 10)
+        summary = metrics.get_summary()
+
+        assert summary['requests'] == 12 and summary['bytes'] == 1000
+        assert summary['errors_by_status'] == {'500': 1, 'connection': 1}
+        assert summary['hosts']['a.test']['fetch_seconds']['p50'] == 0.06 and summary['fetch_seconds']['p99'] == 2.0
+        assert summary['parse_seconds']['count'] == 1 and summary['hosts']['b.test']['parse_seconds']['p50'] is None
+        assert summary['fast_path_hit_rate'] == 1.0
+        # 10 of 50 runners are done, so the rest should take 4 times as long as the run so far
+        assert summary['runners_total'] == 50 and 3.9 < summary['eta_seconds'] / summary['elapsed_seconds'] < 4.1
+
+
+    def test_latencies_are_bounded(self):
+        metrics = telemetry.ScrapeMetrics()
+        num_requests = 3 * telemetry.LATENCY_SAMPLE_SIZE
+        for i in range(num_requests):
+            metrics.record_fetch('http://a.test/?idp=' + str(i), latency=0.1 if i % 2 else 1.0, status='200')
+        summary = metrics.get_summary()
+        text = metrics.get_prometheus_text()
+
+        assert len(metrics._fetch_latencies['a.test'].sample) == telemetry.LATENCY_SAMPLE_SIZE
+        assert summary['requests'] == num_requests and summary['fetch_seconds']['count'] == num_requests
+        assert summary['fetch_seconds']['p99'] == 1.0
+        # Buckets and the sum count every latency, not only the sample
+        assert 'dashathon_fetch_seconds_bucket{host="a.test",le="0.1"} %d' % (num_requests // 2) in text
+        assert 'dashathon_fetch_seconds_bucket{host="a.test",le="+Inf"} %d' % num_requests in text
+        assert 'dashathon_fetch_seconds_count{host="a.test"} %d' % num_requests in text
+
+
+    def test_log(self):
+        metrics = telemetry.ScrapeMetrics(path_log='test_scrape_log.jsonl', log_seconds=60)
+        metrics.record_fetch('http://a.test/', latency=0.1, status='200', num_bytes=10)
+        metrics.log_if_due()
+        metrics.log()
+        metrics.log()
+        with open('test_scrape_log.jsonl') as f:
+            lines = [json.loads(line) for line in f]
+
+        # The first line is only due after log_seconds
+        assert len(lines) == 2 and lines[0]['requests'] == 1 and lines[0]['eta_seconds'] is None
+
+
+    def test_metrics_server(self):
+        metrics = telemetry.ScrapeMetrics()
+        metrics.record_fetch('http://a.test/', latency=0.03, status='200', num_bytes=10)
+        metrics.record_fetch('http://a.test/', latency=0.3, status='500')
+        server = telemetry.start_metrics_server(metrics)
+        try:
+            text = urllib.request.urlopen(server.metrics_url).read().decode('utf-8')
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert 'dashathon_requests_total{host="a.test",status="500"} 1' in text
+        assert 'dashathon_fetch_seconds_bucket{host="a.test",le="0.05"} 1' in text
+        assert 'dashathon_fetch_seconds_bucket{host="a.test",le="+Inf"} 2' in text
+        assert 'dashathon_bytes_total{host="a.test"} 10' in text